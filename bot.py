@@ -1,9 +1,14 @@
 import asyncio
 import logging
 from aiogram import Bot, Dispatcher
+import config
 from config import BOT_TOKEN
-from db import init_db
-from handlers import routers
+from db import init_db, close_db, DB_READERS
+from whitelist import init_whitelist, close_whitelist, SCREEN_BINARY, SCREEN_SESSION, COMMAND_TIMEOUT, RCON_PORT, SYNC_INTERVAL, BEDROCK_PREFIX
+from fsm_storage import SQLiteStorage, FSM_TTL
+from notifications import notifier, ticket_digest, TICKET_DIGEST_WINDOW
+from questions import question_catalog, QUESTIONS_FILE
+from handlers import routers, navigation_stats
 
 logging.basicConfig(
     level=logging.INFO,
@@ -17,15 +22,39 @@ logger = logging.getLogger(__name__)
 
 async def main():
     logger.info("Starting bot...")
-    await init_db()
+    await init_db(
+        readers=getattr(config, "DB_READERS", DB_READERS),
+        profile=getattr(config, "DB_PROFILE", "default")
+    )
+    init_whitelist(
+        binary=getattr(config, "WHITELIST_SCREEN_BINARY", SCREEN_BINARY),
+        session=getattr(config, "WHITELIST_SCREEN_SESSION", SCREEN_SESSION),
+        timeout=getattr(config, "WHITELIST_TIMEOUT", COMMAND_TIMEOUT),
+        rcon_host=getattr(config, "RCON_HOST", None),
+        rcon_port=getattr(config, "RCON_PORT", RCON_PORT),
+        rcon_password=getattr(config, "RCON_PASSWORD", ""),
+        sync_interval=getattr(config, "WHITELIST_SYNC_INTERVAL", SYNC_INTERVAL),
+        bedrock_prefix=getattr(config, "WHITELIST_BEDROCK_PREFIX", BEDROCK_PREFIX)
+    )
     bot = Bot(token=BOT_TOKEN)
-    dp = Dispatcher()
+    question_catalog.path = getattr(config, "QUESTIONS_FILE", QUESTIONS_FILE)
+    question_catalog.refresh()
+    ticket_digest.window = getattr(config, "TICKET_DIGEST_WINDOW", TICKET_DIGEST_WINDOW)
+    storage = SQLiteStorage(ttl=getattr(config, "FSM_TTL", FSM_TTL))
+    storage.start()
+    dp = Dispatcher(storage=storage)
     for router in routers:
         dp.include_router(router)
     try:
         await dp.start_polling(bot)
     finally:
+        logger.info(navigation_stats.summary())
+        ticket_digest.flush_all()
+        await notifier.drain()
         await bot.session.close()
+        await close_whitelist()
+        await storage.close()
+        await close_db()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
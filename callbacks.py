@@ -0,0 +1,129 @@
+"""Callback-данные кнопок: типизированный кодек и таблица обработчиков"""
+
+import inspect
+import logging
+
+logger = logging.getLogger(__name__)
+
+SEPARATOR = "_"
+
+class CallbackAction:
+    """
+    Тип callback-данных: префикс и аргументы с типами, разделенные "_".
+
+    CallbackAction("view_ticket", ticket_id=int).pack(12) == "view_ticket_12"
+    """
+
+    def __init__(self, prefix: str, **fields):
+        self.prefix = prefix
+        self.fields = fields
+
+    @property
+    def arity(self) -> int:
+        return len(self.fields)
+
+    def pack(self, *values) -> str:
+        if len(values) != self.arity:
+            raise ValueError(f"{self.prefix}: ожидается аргументов {self.arity}, передано {len(values)}")
+        return SEPARATOR.join([self.prefix, *map(str, values)])
+
+    def unpack(self, data: str) -> dict:
+        """Аргументы из data по именам полей; ValueError, если data не подходит"""
+        if not self.fields:
+            if data != self.prefix:
+                raise ValueError(f"{data} не является {self.prefix}")
+            return {}
+        if not data.startswith(self.prefix + SEPARATOR):
+            raise ValueError(f"{data} не начинается с {self.prefix}")
+        values = data[len(self.prefix) + 1:].split(SEPARATOR)
+        if len(values) != self.arity:
+            raise ValueError(f"{data}: ожидается аргументов {self.arity}")
+        return {name: field_type(value) for (name, field_type), value in zip(self.fields.items(), values)}
+
+# Кнопки с аргументами
+VIEW_APPLICATION = CallbackAction("view_application", application_id=int)
+APPROVE = CallbackAction("approve", application_id=int)
+REJECT = CallbackAction("reject", application_id=int)
+COMMENT = CallbackAction("comment", application_id=int)
+DELETE = CallbackAction("delete", application_id=int)
+APPS_PAGE = CallbackAction("apps_page", status=str, direction=str, cursor=int)
+TICKETS_PAGE = CallbackAction("tickets_page", direction=str, cursor=int)
+VIEW_TICKET = CallbackAction("view_ticket", ticket_id=int)
+CHAT_TICKET = CallbackAction("chat_ticket", ticket_id=int)
+ADMIN_CHAT_TICKET = CallbackAction("admin_chat_ticket", ticket_id=int)
+ADMIN_CLOSE_TICKET = CallbackAction("admin_close_ticket", ticket_id=int)
+VIEW_MY_TICKET = CallbackAction("view_my_ticket", ticket_id=int)
+PLATFORM = CallbackAction("platform", platform=str)
+CONTINUE_FROM = CallbackAction("continue_from", step=str)
+
+class CallbackRoute:
+    def __init__(self, action: CallbackAction, handler, states=None):
+        self.action = action
+        self.handler = handler
+        # Параметры обработчика считываются один раз при регистрации
+        self.params = set(inspect.signature(handler).parameters)
+        self.states = {state.state for state in states} if states is not None else None
+
+class CallbackRouter:
+    """
+    Таблица обработчиков callback-кнопок роутера.
+
+    Обработчик ищется в словаре по data целиком, затем по data без одного,
+    двух и т.д. последних аргументов — не больше, чем у самого длинного
+    действия, поэтому поиск не зависит от числа кнопок. Аргументы разбираются
+    кодеком действия и передаются обработчику именованными параметрами,
+    как и callback, state и bot, — только те, что есть в его сигнатуре.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._routes = {}
+        self._max_arity = 0
+
+    def route(self, *actions, states=None):
+        """
+        Декоратор: регистрирует обработчик для действий.
+
+        :param actions: строки для кнопок без аргументов или CallbackAction
+        :param states: если указаны, обработчик вызывается только в этих состояниях FSM
+        """
+        def decorator(handler):
+            for action in actions:
+                if isinstance(action, str):
+                    action = CallbackAction(action)
+                if action.prefix in self._routes:
+                    raise ValueError(f"Callback {action.prefix} уже зарегистрирован в {self.name}")
+                self._routes[action.prefix] = CallbackRoute(action, handler, states)
+                self._max_arity = max(self._max_arity, action.arity)
+            return handler
+        return decorator
+
+    def resolve(self, data: str):
+        """(маршрут, аргументы) для data или (None, None)"""
+        prefix = data
+        for arity in range(self._max_arity + 1):
+            route = self._routes.get(prefix)
+            if route is not None and route.action.arity == arity:
+                try:
+                    return route, route.action.unpack(data)
+                except ValueError as e:
+                    logger.warning(f"Некорректный callback {data}: {e}")
+                    return None, None
+            prefix, separator, _ = prefix.rpartition(SEPARATOR)
+            if not separator:
+                break
+        return None, None
+
+    async def dispatch(self, callback, **context) -> bool:
+        """
+        Вызывает обработчик кнопки. Возвращает False, если обработчика нет
+        или он не действует в текущем состоянии
+        """
+        route, args = self.resolve(callback.data or "")
+        if route is None:
+            return False
+        if route.states is not None and await context["state"].get_state() not in route.states:
+            return False
+        values = {"callback": callback, **context, **args}
+        await route.handler(**{name: value for name, value in values.items() if name in route.params})
+        return True
@@ -24,15 +24,8 @@ MEDIA_UNKNOWN = "unknown"
 # Максимальное количество редактирований заявки
 MAX_EDIT_COUNT = 3
 
-# Префиксы callback-данных
-CALLBACK_VIEW_APPLICATION = "view_application"
-CALLBACK_APPROVE = "approve"
-CALLBACK_REJECT = "reject"
-CALLBACK_COMMENT = "comment"
-CALLBACK_DELETE = "delete"
-CALLBACK_CHAT_TICKET = "chat_ticket"
-CALLBACK_CLOSE_TICKET = "close_ticket"
-CALLBACK_VIEW_TICKET = "view_ticket"
+# Количество строк на странице списков админ-панели
+PAGE_SIZE = 10
 
 # Сообщения
 MSG_NO_RIGHTS = "🚫 У вас нет прав для выполнения этого действия"
@@ -1,155 +1,623 @@
 import aiosqlite
+import asyncio
 import logging
+import os
+import tempfile
+from contextlib import asynccontextmanager
 from datetime import datetime
+from cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
-async def init_db():
-    logger.info("Initializing database...")
-    async with aiosqlite.connect('data/bot.db') as db:
-        # Таблица users
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY,
-                username TEXT NOT NULL,
-                created_at TIMESTAMP
-            )
-        ''')
-        async with db.execute('PRAGMA table_info(users)') as cursor:
-            columns = [col[1] for col in await cursor.fetchall()]
-            if 'created_at' not in columns:
-                logger.info("Adding created_at column to users table")
-                await db.execute('ALTER TABLE users ADD COLUMN created_at TIMESTAMP')
-                await db.execute('UPDATE users SET created_at = ? WHERE created_at IS NULL', (datetime.now().isoformat(),))
-                logger.info("Updated created_at for existing users")
-
-        # Таблица applications
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS applications (
-                application_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                status TEXT DEFAULT 'pending',
-                description TEXT,
-                comment TEXT,
-                created_at TIMESTAMP,
-                edit_count INTEGER DEFAULT 0,
-                player_name TEXT,
-                player_age TEXT,
-                player_about TEXT,
-                player_plans TEXT,
-                player_community TEXT,
-                player_platform TEXT,
-                player_nickname_java TEXT,
-                player_nickname_bedrock TEXT,
-                player_referral TEXT,
-                FOREIGN KEY (user_id) REFERENCES users (user_id)
-            )
-        ''')
-        async with db.execute('PRAGMA table_info(applications)') as cursor:
-            columns = [col[1] for col in await cursor.fetchall()]
-            if 'edit_count' not in columns:
-                logger.info("Adding edit_count column to applications table")
-                await db.execute('ALTER TABLE applications ADD COLUMN edit_count INTEGER')
-                await db.execute('UPDATE applications SET edit_count = 0 WHERE edit_count IS NULL')
-                logger.info("Updated edit_count for existing applications")
-            
-            # Добавление новых столбцов для анкеты, если их ещё нет
-            new_columns = [
-                'player_name', 'player_age', 'player_about', 'player_plans',
-                'player_community', 'player_platform', 'player_nickname_java',
-                'player_nickname_bedrock', 'player_referral'
-            ]
-            
-            for col in new_columns:
-                if col not in columns:
-                    logger.info(f"Adding {col} column to applications table")
-                    await db.execute(f'ALTER TABLE applications ADD COLUMN {col} TEXT')
-                    logger.info(f"Added {col} column to applications table")
+DB_PATH = 'data/bot.db'
+DB_READERS = 4
+WRITE_BATCH_SIZE = 64
+# Максимум параметров в одном IN (...) запросе
+SQL_BATCH_SIZE = 500
+# Направления keyset-пагинации списков
+PAGE_NEXT = "next"
+PAGE_PREV = "prev"
+USER_CACHE_SIZE = 4096
+USER_CACHE_TTL = 600
+PLAYERS_FILE = 'data/players.txt'
 
-        # Таблица application_media
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS application_media (
-                media_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                application_id INTEGER,
-                file_id TEXT NOT NULL,
-                media_type TEXT NOT NULL,
-                media_category TEXT DEFAULT 'general',
-                FOREIGN KEY (application_id) REFERENCES applications (application_id)
-            )
-        ''')
+# Профили хранилища. "default" оставляет базу в режиме rollback-журнала,
+# "wal" включает WAL, подстраивает PRAGMA и пропускает все записи через
+# одну задачу-писателя с групповым коммитом.
+STORAGE_PROFILES = {
+    "default": {
+        "pragmas": {},
+        "write_queue": False,
+    },
+    "wal": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "mmap_size": 268435456,
+            "cache_size": -65536,
+            "busy_timeout": 5000,
+        },
+        "write_queue": True,
+    },
+}
+
+async def _apply_pragmas(connection, pragmas: dict, persistent: bool = True):
+    for name, value in pragmas.items():
+        # journal_mode хранится в самом файле базы, его достаточно выставить один раз
+        if name == "journal_mode" and not persistent:
+            continue
+        async with connection.execute(f"PRAGMA {name} = {value}") as cursor:
+            await cursor.fetchall()
+
+class _WriteJob:
+    def __init__(self):
+        loop = asyncio.get_running_loop()
+        self.ready = loop.create_future()
+        self.finished = loop.create_future()
+        self.committed = loop.create_future()
+        self.error = None
+
+def _resolve(future, error=None):
+    if future.done():
+        return
+    if error is None:
+        future.set_result(None)
+    else:
+        future.set_exception(error)
+
+def _fail_job(job, error):
+    """Сообщает об ошибке туда, где вызывающая сторона её ждёт"""
+    if not job.ready.done():
+        _resolve(job.ready, error)
+    elif job.error is None:
+        _resolve(job.committed, error)
+
+class WriteQueue:
+    """
+    Очередь записей с одной задачей-писателем.
+
+    Каждый блок записи выполняется внутри собственного SAVEPOINT, а подряд
+    идущие блоки объединяются в одну транзакцию с единственным COMMIT.
+    Ошибка в блоке откатывает только его savepoint. Если задача-писатель
+    всё же завершится, все ожидающие блоки получают ошибку, а не висят.
+    """
+
+    def __init__(self, connection, batch_size: int = WRITE_BATCH_SIZE):
+        self._connection = connection
+        self.batch_size = max(1, batch_size)
+        self._jobs = asyncio.Queue()
+        self._batch = []
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        if not self._task.done():
+            await self._jobs.put(None)
+        try:
+            await self._task
+        except Exception as e:
+            logger.error(f"Задача записи завершилась с ошибкой: {e}")
+        self._task = None
+
+    @asynccontextmanager
+    async def transaction(self):
+        if self._task is None or self._task.done():
+            raise RuntimeError("Очередь записи не запущена")
+        job = _WriteJob()
+        await self._jobs.put(job)
+        try:
+            await job.ready
+        except BaseException as e:
+            # Писатель мог успеть открыть savepoint под этот блок
+            job.error = e
+            _resolve(job.finished)
+            raise
+        try:
+            yield self._connection
+        except BaseException as e:
+            job.error = e
+            _resolve(job.finished)
+            raise
+        _resolve(job.finished)
+        await job.committed
+
+    async def _run(self):
+        error = RuntimeError("Очередь записи остановлена")
+        try:
+            while True:
+                job = await self._jobs.get()
+                if job is None:
+                    break
+                if await self._run_batch(job):
+                    break
+        except BaseException as e:
+            logger.error(f"Задача записи остановлена аварийно: {e!r}")
+            error = RuntimeError(f"Очередь записи остановлена: {e!r}")
+            raise
+        finally:
+            self._fail_pending(error)
+
+    def _fail_pending(self, error):
+        """Завершает ошибкой текущую пачку и все блоки, оставшиеся в очереди"""
+        jobs = self._batch
+        self._batch = []
+        while not self._jobs.empty():
+            job = self._jobs.get_nowait()
+            if job is not None:
+                jobs.append(job)
+        for job in jobs:
+            _fail_job(job, error)
+
+    async def _run_batch(self, job) -> bool:
+        db = self._connection
+        batch = self._batch = []
+        stopping = False
+        failed = None
+        try:
+            await db.execute("BEGIN IMMEDIATE")
+        except Exception as e:
+            logger.error(f"Не удалось начать транзакцию записи: {e}")
+            _resolve(job.ready, e)
+            return False
+        while job is not None:
+            # Блок числится в пачке с момента запуска, чтобы при аварийной
+            # остановке писателя его вызывающая сторона не осталась ждать
+            batch.append(job)
+            try:
+                if not await self._run_job(job):
+                    batch.pop()
+            except Exception as e:
+                batch.pop()
+                # Savepoint в неизвестном состоянии: откатываем всю пачку
+                logger.error(f"Ошибка блока записи: {e}")
+                _fail_job(job, e)
+                failed = e
+                break
+            job = None
+            if len(batch) < self.batch_size and not self._jobs.empty():
+                job = self._jobs.get_nowait()
+                if job is None:
+                    stopping = True
+        if failed is None:
+            try:
+                await db.execute("COMMIT")
+            except Exception as e:
+                logger.error(f"Ошибка группового коммита ({len(batch)} записей): {e}")
+                failed = e
+        if failed is not None:
+            try:
+                await db.execute("ROLLBACK")
+            except Exception as rollback_error:
+                logger.error(f"Ошибка отката транзакции записи: {rollback_error}")
+        self._batch = []
+        for done in batch:
+            _resolve(done.committed, failed)
+        return stopping
+
+    async def _run_job(self, job) -> bool:
+        db = self._connection
+        if job.ready.done():
+            # Вызывающая сторона уже отменила ожидание
+            return False
+        await db.execute("SAVEPOINT write_job")
+        if job.ready.done():
+            # Ожидание отменили, пока открывался savepoint
+            await db.execute("RELEASE write_job")
+            return False
+        job.ready.set_result(None)
+        await job.finished
+        if job.error is not None:
+            await db.execute("ROLLBACK TO write_job")
+            await db.execute("RELEASE write_job")
+            return False
+        await db.execute("RELEASE write_job")
+        return True
+
+class ConnectionPool:
+    """
+    Пул долгоживущих соединений с базой данных.
+
+    Читающие запросы получают одно из reader-соединений, все записи идут через
+    единственное writer-соединение: под блокировкой, которое коммитит транзакцию
+    при выходе из контекста, либо через WriteQueue, если её включает профиль.
+    """
+
+    def __init__(self, path: str = DB_PATH, readers: int = DB_READERS, profile: str = "default"):
+        if profile not in STORAGE_PROFILES:
+            raise ValueError(f"Неизвестный профиль хранилища: {profile}")
+        self.path = path
+        self.readers = max(1, readers)
+        self.profile = profile
+        self._idle = asyncio.Queue()
+        self._connections = []
+        self._writer = None
+        self._write_lock = asyncio.Lock()
+        self._queue = None
+
+    async def open(self):
+        settings = STORAGE_PROFILES[self.profile]
+        if settings["write_queue"]:
+            # Транзакциями писателя управляет WriteQueue
+            self._writer = await aiosqlite.connect(self.path, isolation_level=None)
+        else:
+            self._writer = await aiosqlite.connect(self.path)
+        self._connections.append(self._writer)
+        await _apply_pragmas(self._writer, settings["pragmas"])
+        for _ in range(self.readers):
+            connection = await aiosqlite.connect(self.path)
+            await _apply_pragmas(connection, settings["pragmas"], persistent=False)
+            self._connections.append(connection)
+            self._idle.put_nowait(connection)
+        if settings["write_queue"]:
+            self._queue = WriteQueue(self._writer)
+            self._queue.start()
+        logger.info(
+            f"Открыт пул соединений с {self.path} (профиль {self.profile}): "
+            f"{self.readers} на чтение, 1 на запись"
+        )
+
+    async def close(self):
+        if self._queue is not None:
+            await self._queue.stop()
+            self._queue = None
+        for connection in self._connections:
+            try:
+                await connection.close()
+            except Exception as e:
+                logger.warning(f"Ошибка при закрытии соединения с базой: {e}")
+        self._connections.clear()
+        self._writer = None
+        logger.info("Пул соединений с базой данных закрыт")
+
+    @asynccontextmanager
+    async def reader(self):
+        connection = await self._idle.get()
+        try:
+            yield connection
+        finally:
+            self._idle.put_nowait(connection)
+
+    def writer(self):
+        if self._queue is not None:
+            return self._queue.transaction()
+        return self._locked_writer()
+
+    @asynccontextmanager
+    async def _locked_writer(self):
+        async with self._write_lock:
+            try:
+                yield self._writer
+            except BaseException:
+                await self._writer.rollback()
+                raise
+            await self._writer.commit()
+
+# Вторичные индексы под горячие запросы: заявка пользователя, списки по
+# статусу, открытые тикеты, история тикета и медиа заявки по категории
+INDEXES = [
+    'CREATE INDEX IF NOT EXISTS idx_applications_user_created ON applications (user_id, created_at)',
+    'CREATE INDEX IF NOT EXISTS idx_applications_status_created ON applications (status, created_at)',
+    'CREATE INDEX IF NOT EXISTS idx_tickets_status ON tickets (status, created_at)',
+    'CREATE INDEX IF NOT EXISTS idx_tickets_user_status ON tickets (user_id, status, created_at)',
+    'CREATE INDEX IF NOT EXISTS idx_ticket_messages_ticket_created ON ticket_messages (ticket_id, created_at)',
+    'CREATE INDEX IF NOT EXISTS idx_application_media_app_category ON application_media (application_id, media_category)',
+]
+
+_pool = None
+_user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+# Есть ли у пользователя отправленная заявка — от этого зависит главное меню
+_has_application_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+def _get_pool() -> ConnectionPool:
+    if _pool is None:
+        raise RuntimeError("База данных не инициализирована: сначала вызовите init_db()")
+    return _pool
+
+def _read():
+    """Соединение из пула для чтения"""
+    return _get_pool().reader()
+
+def _write():
+    """Пишущее соединение; транзакция коммитится при выходе из блока"""
+    return _get_pool().writer()
+
+async def close_db():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+async def _migrate_base_schema(db):
+    """Базовая схема; дозаполняет столбцы в базах, созданных до миграций"""
+    # Таблица users
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            username TEXT NOT NULL,
+            created_at TIMESTAMP
+        )
+    ''')
+    async with db.execute('PRAGMA table_info(users)') as cursor:
+        columns = [col[1] for col in await cursor.fetchall()]
+        if 'created_at' not in columns:
+            logger.info("Adding created_at column to users table")
+            await db.execute('ALTER TABLE users ADD COLUMN created_at TIMESTAMP')
+            await db.execute('UPDATE users SET created_at = ? WHERE created_at IS NULL', (datetime.now().isoformat(),))
+            logger.info("Updated created_at for existing users")
+
+    # Таблица applications
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS applications (
+            application_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            status TEXT DEFAULT 'pending',
+            description TEXT,
+            comment TEXT,
+            created_at TIMESTAMP,
+            edit_count INTEGER DEFAULT 0,
+            player_name TEXT,
+            player_age TEXT,
+            player_about TEXT,
+            player_plans TEXT,
+            player_community TEXT,
+            player_platform TEXT,
+            player_nickname_java TEXT,
+            player_nickname_bedrock TEXT,
+            player_referral TEXT,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    ''')
+    async with db.execute('PRAGMA table_info(applications)') as cursor:
+        columns = [col[1] for col in await cursor.fetchall()]
+        if 'edit_count' not in columns:
+            logger.info("Adding edit_count column to applications table")
+            await db.execute('ALTER TABLE applications ADD COLUMN edit_count INTEGER')
+            await db.execute('UPDATE applications SET edit_count = 0 WHERE edit_count IS NULL')
+            logger.info("Updated edit_count for existing applications")
+        
+        # Добавление новых столбцов для анкеты, если их ещё нет
+        new_columns = [
+            'player_name', 'player_age', 'player_about', 'player_plans',
+            'player_community', 'player_platform', 'player_nickname_java',
+            'player_nickname_bedrock', 'player_referral'
+        ]
         
-        async with db.execute('PRAGMA table_info(application_media)') as cursor:
-            columns = [col[1] for col in await cursor.fetchall()]
-            if 'media_category' not in columns:
-                logger.info("Adding media_category column to application_media table")
-                await db.execute('ALTER TABLE application_media ADD COLUMN media_category TEXT DEFAULT "general"')
+        for col in new_columns:
+            if col not in columns:
+                logger.info(f"Adding {col} column to applications table")
+                await db.execute(f'ALTER TABLE applications ADD COLUMN {col} TEXT')
+                logger.info(f"Added {col} column to applications table")
 
-        # Таблица tickets
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS tickets (
-                ticket_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                status TEXT DEFAULT 'open',
-                admin_id INTEGER,
-                created_at TIMESTAMP,
-                FOREIGN KEY (user_id) REFERENCES users (user_id)
-            )
-        ''')
+    # Таблица application_media
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS application_media (
+            media_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            application_id INTEGER,
+            file_id TEXT NOT NULL,
+            media_type TEXT NOT NULL,
+            media_category TEXT DEFAULT 'general',
+            FOREIGN KEY (application_id) REFERENCES applications (application_id)
+        )
+    ''')
+    
+    async with db.execute('PRAGMA table_info(application_media)') as cursor:
+        columns = [col[1] for col in await cursor.fetchall()]
+        if 'media_category' not in columns:
+            logger.info("Adding media_category column to application_media table")
+            await db.execute('ALTER TABLE application_media ADD COLUMN media_category TEXT DEFAULT "general"')
 
-        # Таблица ticket_messages
-        await db.execute('''
-            CREATE TABLE IF NOT EXISTS ticket_messages (
-                message_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                ticket_id INTEGER,
-                user_id INTEGER,
-                telegram_message_id INTEGER,
-                message_type TEXT,
-                content TEXT,
-                sender_type TEXT,
-                username TEXT,
-                created_at TIMESTAMP,
-                FOREIGN KEY (ticket_id) REFERENCES tickets (ticket_id),
-                FOREIGN KEY (user_id) REFERENCES users (user_id)
-            )
+    # Таблица tickets
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS tickets (
+            ticket_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            status TEXT DEFAULT 'open',
+            admin_id INTEGER,
+            created_at TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    ''')
+
+    # Таблица ticket_messages
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS ticket_messages (
+            message_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ticket_id INTEGER,
+            user_id INTEGER,
+            telegram_message_id INTEGER,
+            message_type TEXT,
+            content TEXT,
+            sender_type TEXT,
+            username TEXT,
+            created_at TIMESTAMP,
+            FOREIGN KEY (ticket_id) REFERENCES tickets (ticket_id),
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    ''')
+    async with db.execute('PRAGMA table_info(ticket_messages)') as cursor:
+        columns = [col[1] for col in await cursor.fetchall()]
+        if 'sender_type' not in columns:
+            logger.info("Adding sender_type column to ticket_messages table")
+            await db.execute('ALTER TABLE ticket_messages ADD COLUMN sender_type TEXT')
+            await db.execute('UPDATE ticket_messages SET sender_type = "user" WHERE sender_type IS NULL')
+            logger.info("Updated sender_type for existing ticket_messages")
+
+async def _migrate_hot_indexes(db):
+    """Индексы для частых выборок"""
+    for statement in INDEXES:
+        await db.execute(statement)
+
+async def _migrate_players(db):
+    """
+    Реестр игроков: один никнейм на платформу. Уникальность проверяется по
+    нормализованному никнейму, заполняется из уже поданных заявок
+    """
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS players (
+            player_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nickname TEXT NOT NULL,
+            platform TEXT NOT NULL,
+            user_id INTEGER,
+            username TEXT,
+            application_id INTEGER,
+            created_at TIMESTAMP,
+            nickname_normalized TEXT GENERATED ALWAYS AS (lower(trim(nickname))) VIRTUAL,
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )
+    ''')
+    await db.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_players_nickname
+        ON players (nickname_normalized, platform)
+    ''')
+    await db.execute('CREATE INDEX IF NOT EXISTS idx_players_application ON players (application_id)')
+    # Более поздние заявки в приоритете: при совпадении никнейма остается последняя
+    for platform, column in (("java", "player_nickname_java"), ("bedrock", "player_nickname_bedrock")):
+        await db.execute(f'''
+            INSERT OR IGNORE INTO players (nickname, platform, user_id, username, application_id, created_at)
+            SELECT trim(a.{column}), ?, a.user_id, u.username, a.application_id, a.created_at
+            FROM applications a
+            LEFT JOIN users u ON u.user_id = a.user_id
+            WHERE a.player_platform IN (?, 'both') AND trim(a.{column}) != ''
+            ORDER BY a.application_id DESC
+        ''', (platform, platform))
+
+# Статусы заявок, за которыми закреплены их никнеймы
+ACTIVE_APPLICATION_STATUSES = ('pending', 'approved')
+
+# Нормализованные столбцы никнеймов заявок для проверки занятости
+NICKNAME_COLUMNS = {
+    "java": ("player_nickname_java", "player_nickname_java_normalized"),
+    "bedrock": ("player_nickname_bedrock", "player_nickname_bedrock_normalized"),
+}
+
+async def _migrate_nickname_lookup(db):
+    """
+    Вычисляемые столбцы lower(trim(ник)) в заявках и индексы по ним, чтобы
+    поиск занятого никнейма не зависел от регистра и размера таблицы
+    """
+    for platform, (column, normalized) in NICKNAME_COLUMNS.items():
+        await db.execute(f'''
+            ALTER TABLE applications ADD COLUMN {normalized} TEXT
+            GENERATED ALWAYS AS (lower(trim({column}))) VIRTUAL
+        ''')
+        await db.execute(f'''
+            CREATE INDEX IF NOT EXISTS idx_applications_{platform}_nickname
+            ON applications ({normalized})
         ''')
-        async with db.execute('PRAGMA table_info(ticket_messages)') as cursor:
-            columns = [col[1] for col in await cursor.fetchall()]
-            if 'sender_type' not in columns:
-                logger.info("Adding sender_type column to ticket_messages table")
-                await db.execute('ALTER TABLE ticket_messages ADD COLUMN sender_type TEXT')
-                await db.execute('UPDATE ticket_messages SET sender_type = "user" WHERE sender_type IS NULL')
-                logger.info("Updated sender_type for existing ticket_messages")
 
-        await db.commit()
-    logger.info("Database tables created successfully")
+async def _migrate_fsm_storage(db):
+    """Состояния и данные FSM aiogram, чтобы анкеты и чаты переживали перезапуск"""
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS fsm_storage (
+            key TEXT PRIMARY KEY,
+            state TEXT,
+            data TEXT NOT NULL DEFAULT '{}',
+            updated_at REAL NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    await db.execute('CREATE INDEX IF NOT EXISTS idx_fsm_storage_updated ON fsm_storage (updated_at)')
+
+# Упорядоченный реестр миграций: (версия, название, функция)
+MIGRATIONS = [
+    (1, "base schema", _migrate_base_schema),
+    (2, "hot lookup indexes", _migrate_hot_indexes),
+    (3, "players registry", _migrate_players),
+    (4, "normalized nickname lookup", _migrate_nickname_lookup),
+    (5, "fsm storage", _migrate_fsm_storage),
+]
+
+async def _get_schema_version(db) -> int:
+    try:
+        async with db.execute('SELECT MAX(version) FROM schema_version') as cursor:
+            row = await cursor.fetchone()
+            return row[0] or 0
+    except aiosqlite.OperationalError:
+        # Таблицы schema_version ещё нет: база новая или создана до миграций
+        return 0
+
+async def migrate(db):
+    """Применяет недостающие миграции в одной транзакции"""
+    current = await _get_schema_version(db)
+    pending = [migration for migration in MIGRATIONS if migration[0] > current]
+    if not pending:
+        return current
+    if not db.in_transaction:
+        await db.execute('BEGIN')
+    await db.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP
+        )
+    ''')
+    for version, name, apply in pending:
+        logger.info(f"Applying migration {version}: {name}")
+        await apply(db)
+        await db.execute(
+            'INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)',
+            (version, name, datetime.now().isoformat())
+        )
+    return pending[-1][0]
+
+async def init_db(path: str = DB_PATH, readers: int = DB_READERS, profile: str = "default"):
+    global _pool
+    logger.info("Initializing database...")
+    if _pool is None:
+        _pool = ConnectionPool(path, readers, profile)
+        await _pool.open()
+    async with _read() as db:
+        current = await _get_schema_version(db)
+    if current >= MIGRATIONS[-1][0]:
+        logger.info(f"Database schema is up to date (version {current})")
+        return
+    async with _write() as db:
+        version = await migrate(db)
+    logger.info(f"Database schema migrated to version {version}")
 
 async def add_user(user_id: int, username: str):
-    async with aiosqlite.connect('data/bot.db') as db:
+    async with _write() as db:
         await db.execute('''
             INSERT OR REPLACE INTO users (user_id, username, created_at)
             VALUES (?, ?, ?)
         ''', (user_id, username, datetime.now().isoformat()))
-        await db.commit()
+    _user_cache.invalidate(user_id)
 
 async def get_user(user_id: int):
-    async with aiosqlite.connect('data/bot.db') as db:
+    user = _user_cache.get(user_id)
+    if user is not None:
+        return user
+    async with _read() as db:
         async with db.execute('''
             SELECT user_id, username, created_at
             FROM users
             WHERE user_id = ?
         ''', (user_id,)) as cursor:
-            return await cursor.fetchone()
+            user = await cursor.fetchone()
+    if user:
+        _user_cache.set(user_id, user)
+    return user
 
-async def add_application(user_id: int):
-    async with aiosqlite.connect('data/bot.db') as db:
-        await db.execute('''
-            INSERT INTO applications (user_id, status, created_at, edit_count)
-            VALUES (?, 'pending', ?, 0)
-        ''', (user_id, datetime.now().isoformat()))
-        await db.commit()
+async def has_application(user_id: int) -> bool:
+    """Есть ли у пользователя заявка; ответ кэшируется"""
+    cached = _has_application_cache.get(user_id)
+    if cached is not None:
+        return cached
+    async with _read() as db:
+        async with db.execute('''
+            SELECT 1 FROM applications
+            WHERE user_id = ?
+            LIMIT 1
+        ''', (user_id,)) as cursor:
+            result = await cursor.fetchone() is not None
+    _has_application_cache.set(user_id, result)
+    return result
 
 async def get_application_by_user_id(user_id: int):
-    async with aiosqlite.connect('data/bot.db') as db:
+    async with _read() as db:
         async with db.execute('''
             SELECT application_id, user_id, status, description, comment, created_at, edit_count
             FROM applications
@@ -160,7 +628,7 @@ async def get_application_by_user_id(user_id: int):
             return await cursor.fetchone()
 
 async def get_application_by_id(application_id: int):
-    async with aiosqlite.connect('data/bot.db') as db:
+    async with _read() as db:
         async with db.execute('''
             SELECT application_id, user_id, status, description, comment, created_at, edit_count
             FROM applications
@@ -168,56 +636,29 @@ async def get_application_by_id(application_id: int):
         ''', (application_id,)) as cursor:
             return await cursor.fetchone()
 
-async def update_application(application_id: int, description: str, edit_count: int, status: str):
-    async with aiosqlite.connect('data/bot.db') as db:
-        await db.execute('''
-            UPDATE applications
-            SET description = ?, edit_count = ?, status = ?
-            WHERE application_id = ?
-        ''', (description, edit_count, status, application_id))
-        await db.commit()
-
 async def update_application_status(application_id: int, status: str, comment: str):
-    async with aiosqlite.connect('data/bot.db') as db:
+    async with _write() as db:
         await db.execute('''
             UPDATE applications
             SET status = ?, comment = ?
             WHERE application_id = ?
         ''', (status, comment, application_id))
-        await db.commit()
+        released = 0
+        if status not in ACTIVE_APPLICATION_STATUSES:
+            released = await _release_players(db, application_id)
+    if released:
+        await export_players()
 
 async def update_application_comment(application_id: int, comment: str):
-    async with aiosqlite.connect('data/bot.db') as db:
+    async with _write() as db:
         await db.execute('''
             UPDATE applications
             SET comment = ?
             WHERE application_id = ?
         ''', (comment, application_id))
-        await db.commit()
-
-async def add_application_media(application_id: int, file_id: str, media_type: str):
-    async with aiosqlite.connect('data/bot.db') as db:
-        await db.execute('''
-            INSERT INTO application_media (application_id, file_id, media_type)
-            VALUES (?, ?, ?)
-        ''', (application_id, file_id, media_type))
-        await db.commit()
-        logger.info(f"Медиа добавлено для заявки #{application_id}: {media_type}")
-
-async def delete_application_media(application_id: int):
-    try:
-        async with aiosqlite.connect('data/bot.db') as db:
-            await db.execute('''
-                DELETE FROM application_media
-                WHERE application_id = ?
-            ''', (application_id,))
-            await db.commit()
-        logger.info(f"Все медиа для заявки #{application_id} удалены")
-    except Exception as e:
-        logger.error(f"Ошибка удаления медиа для заявки #{application_id}: {e}")
 
 async def get_application_media(application_id: int):
-    async with aiosqlite.connect('data/bot.db') as db:
+    async with _read() as db:
         async with db.execute('''
             SELECT media_id, application_id, file_id, media_type
             FROM application_media
@@ -225,18 +666,69 @@ async def get_application_media(application_id: int):
         ''', (application_id,)) as cursor:
             return await cursor.fetchall()
 
-async def get_pending_applications():
-    async with aiosqlite.connect('data/bot.db') as db:
-        async with db.execute('''
-            SELECT application_id, user_id, status, description, comment, created_at, edit_count
-            FROM applications
-            WHERE status = 'pending'
-            ORDER BY created_at
-        ''') as cursor:
-            return await cursor.fetchall()
+def _keyset_clause(table: str, id_column: str, cursor, direction: str):
+    """
+    Условие и порядок для keyset-пагинации по (created_at, id).
+
+    cursor — id граничной строки предыдущей страницы; страница "prev" читается
+    в обратном порядке, запрос возвращает ее строки в прямом, а лишнюю строку
+    отрезает split_page.
+    """
+    if cursor is None:
+        return "", f"created_at, {id_column}", ()
+    if direction == PAGE_PREV:
+        operator, order = "<", f"created_at DESC, {id_column} DESC"
+    else:
+        operator, order = ">", f"created_at, {id_column}"
+    condition = (
+        f"AND (created_at, {id_column}) {operator} "
+        f"(SELECT created_at, {id_column} FROM {table} WHERE {id_column} = ?)"
+    )
+    return condition, order, (cursor,)
+
+def split_page(rows: list, cursor, direction: str, page_size: int):
+    """
+    Отрезает лишнюю строку, запрошенную сверх page_size, и определяет,
+    есть ли соседние страницы: (строки, has_prev, has_next)
+    """
+    has_more = len(rows) > page_size
+    if direction == PAGE_PREV:
+        return rows[-page_size:], has_more, cursor is not None
+    return rows[:page_size], cursor is not None, has_more
+
+async def get_application_list(status: str, cursor: int = None, direction: str = PAGE_NEXT, limit: int = None):
+    """
+    Готовые к показу строки списка заявок для админ-панели одним запросом:
+    (application_id, user_id, username, status, media_count, created_at,
+     description, comment, edit_count)
+    """
+    keyset, order, keyset_params = _keyset_clause('applications', 'application_id', cursor, direction)
+    try:
+        async with _read() as db:
+            # Сначала выбираем страницу по индексу, затем присоединяем к ней
+            # пользователей и медиа, чтобы стоимость не росла с размером таблицы
+            async with db.execute(f'''
+                SELECT a.application_id, a.user_id, u.username, a.status,
+                       COUNT(m.media_id) AS media_count, a.created_at,
+                       a.description, a.comment, a.edit_count
+                FROM (
+                    SELECT * FROM applications
+                    WHERE status = ? {keyset}
+                    ORDER BY {order}
+                    LIMIT ?
+                ) a
+                LEFT JOIN users u ON u.user_id = a.user_id
+                LEFT JOIN application_media m ON m.application_id = a.application_id
+                GROUP BY a.application_id
+                ORDER BY a.created_at, a.application_id
+            ''', (status, *keyset_params, limit or -1)) as rows:
+                return await rows.fetchall()
+    except Exception as e:
+        logger.error(f"Ошибка при получении списка заявок со статусом {status}: {e}")
+        return []
 
 async def delete_application(application_id: int):
-    async with aiosqlite.connect('data/bot.db') as db:
+    async with _write() as db:
         async with db.execute('SELECT user_id FROM applications WHERE application_id = ?', (application_id,)) as cursor:
             user_id = await cursor.fetchone()
         await db.execute('''
@@ -247,39 +739,30 @@ async def delete_application(application_id: int):
             DELETE FROM applications
             WHERE application_id = ?
         ''', (application_id,))
-        await db.commit()
-        return user_id[0] if user_id else None
+        released = await _release_players(db, application_id)
+    if user_id:
+        _has_application_cache.invalidate(user_id[0])
+    if released:
+        await export_players()
+    return user_id[0] if user_id else None
 
 async def add_ticket(user_id: int):
     try:
-        async with aiosqlite.connect('data/bot.db') as db:
-            await db.execute('''
+        async with _write() as db:
+            cursor = await db.execute('''
                 INSERT INTO tickets (user_id, status, created_at)
                 VALUES (?, 'open', ?)
             ''', (user_id, datetime.now().isoformat()))
-            await db.commit()
-                
-            async with db.execute('''
-                SELECT ticket_id
-                FROM tickets
-                WHERE user_id = ?
-                ORDER BY created_at DESC
-                LIMIT 1
-            ''', (user_id,)) as cursor:
-                ticket = await cursor.fetchone()
-                if ticket:
-                    logger.info(f"Создан новый тикет #{ticket[0]} от пользователя {user_id}")
-                    return ticket[0]
-                else:
-                    logger.error(f"Ошибка создания тикета: не удалось получить ticket_id")
-                    return None
+        ticket_id = cursor.lastrowid
+        logger.info(f"Создан новый тикет #{ticket_id} от пользователя {user_id}")
+        return ticket_id
     except Exception as e:
         logger.error(f"Ошибка при создании тикета для пользователя {user_id}: {e}")
         return None
 
 async def get_ticket_by_id(ticket_id: int):
     try:
-        async with aiosqlite.connect('data/bot.db') as db:
+        async with _read() as db:
             async with db.execute('''
                 SELECT ticket_id, user_id, status, admin_id, created_at, 
                        CASE WHEN status = 'open' THEN 1 ELSE 0 END as is_active
@@ -296,20 +779,21 @@ async def get_ticket_by_id(ticket_id: int):
 
 async def assign_admin_to_ticket(ticket_id: int, admin_id: int):
     try:
-        async with aiosqlite.connect('data/bot.db') as db:
+        async with _write() as db:
             await db.execute('''
                 UPDATE tickets
                 SET admin_id = ?
                 WHERE ticket_id = ?
             ''', (admin_id, ticket_id))
-            await db.commit()
             logger.info(f"Админ {admin_id} назначен на тикет #{ticket_id}")
     except Exception as e:
         logger.error(f"Ошибка при назначении админа {admin_id} на тикет #{ticket_id}: {e}")
 
 async def add_ticket_message(ticket_id: int, user_id: int, telegram_message_id: int, message_type: str, content: str, sender_type: str):
     try:
-        async with aiosqlite.connect('data/bot.db') as db:
+        user = await get_user(user_id)
+        username = user[1] if user else str(user_id)
+        async with _write() as db:
             # Проверяем, что тикет существует и открыт
             async with db.execute('SELECT status FROM tickets WHERE ticket_id = ?', (ticket_id,)) as cursor:
                 ticket = await cursor.fetchone()
@@ -320,9 +804,6 @@ async def add_ticket_message(ticket_id: int, user_id: int, telegram_message_id:
                     logger.warning(f"Попытка добавить сообщение в закрытый тикет #{ticket_id}")
                     return False
             
-            user = await get_user(user_id)
-            username = user[1] if user else str(user_id)
-            
             await db.execute('''
                 INSERT INTO ticket_messages (
                     ticket_id, user_id, telegram_message_id, 
@@ -335,7 +816,6 @@ async def add_ticket_message(ticket_id: int, user_id: int, telegram_message_id:
                 message_type, content, sender_type, 
                 username, datetime.now().isoformat()
             ))
-            await db.commit()
             logger.info(f"Добавлено сообщение в тикет #{ticket_id} от {sender_type} {username}")
             return True
     except Exception as e:
@@ -344,7 +824,7 @@ async def add_ticket_message(ticket_id: int, user_id: int, telegram_message_id:
 
 async def get_ticket_messages(ticket_id: int):
     try:
-        async with aiosqlite.connect('data/bot.db') as db:
+        async with _read() as db:
             async with db.execute('''
                 SELECT 
                     message_id, ticket_id, user_id, 
@@ -364,7 +844,7 @@ async def get_ticket_messages(ticket_id: int):
 
 async def close_ticket(ticket_id: int):
     try:
-        async with aiosqlite.connect('data/bot.db') as db:
+        async with _write() as db:
             # Проверяем, что тикет существует и открыт
             async with db.execute('SELECT status FROM tickets WHERE ticket_id = ?', (ticket_id,)) as cursor:
                 ticket = await cursor.fetchone()
@@ -380,33 +860,56 @@ async def close_ticket(ticket_id: int):
                 SET status = 'closed'
                 WHERE ticket_id = ?
             ''', (ticket_id,))
-            await db.commit()
             logger.info(f"Тикет #{ticket_id} закрыт")
             return True
     except Exception as e:
         logger.error(f"Ошибка при закрытии тикета #{ticket_id}: {e}")
         return False
 
-async def get_open_tickets():
+async def get_open_ticket_list(cursor: int = None, direction: str = PAGE_NEXT, limit: int = None):
+    """
+    Готовые к показу строки списка открытых тикетов одним запросом:
+    (ticket_id, user_id, username, status, admin_id, message_count, created_at)
+    """
+    keyset, order, keyset_params = _keyset_clause('tickets', 'ticket_id', cursor, direction)
+    try:
+        async with _read() as db:
+            async with db.execute(f'''
+                SELECT t.ticket_id, t.user_id, u.username, t.status, t.admin_id,
+                       COUNT(m.message_id) AS message_count, t.created_at
+                FROM (
+                    SELECT * FROM tickets
+                    WHERE status = 'open' {keyset}
+                    ORDER BY {order}
+                    LIMIT ?
+                ) t
+                LEFT JOIN users u ON u.user_id = t.user_id
+                LEFT JOIN ticket_messages m ON m.ticket_id = t.ticket_id
+                GROUP BY t.ticket_id
+                ORDER BY t.created_at, t.ticket_id
+            ''', (*keyset_params, limit or -1)) as rows:
+                return await rows.fetchall()
+    except Exception as e:
+        logger.error(f"Ошибка при получении списка открытых тикетов: {e}")
+        return []
+
+async def get_approved_nicknames():
+    """Платформа и никнеймы всех одобренных заявок для сверки whitelist"""
     try:
-        async with aiosqlite.connect('data/bot.db') as db:
+        async with _read() as db:
             async with db.execute('''
-                SELECT ticket_id, user_id, status, admin_id, created_at,
-                       CASE WHEN status = 'open' THEN 1 ELSE 0 END as is_active
-            FROM tickets
-            WHERE status = 'open'
-            ORDER BY created_at
-        ''') as cursor:
-                tickets = await cursor.fetchall()
-                logger.info(f"Получено {len(tickets)} открытых тикетов")
-                return tickets
+                SELECT player_platform, player_nickname_java, player_nickname_bedrock
+                FROM applications
+                WHERE status = 'approved'
+            ''') as cursor:
+                return await cursor.fetchall()
     except Exception as e:
-        logger.error(f"Ошибка при получении открытых тикетов: {e}")
+        logger.error(f"Ошибка при получении одобренных никнеймов: {e}")
         return []
 
 async def get_open_tickets_by_user(user_id: int):
     try:
-        async with aiosqlite.connect('data/bot.db') as db:
+        async with _read() as db:
             async with db.execute('''
                 SELECT ticket_id, user_id, status, admin_id, created_at,
                        CASE WHEN status = 'open' THEN 1 ELSE 0 END as is_active
@@ -421,109 +924,49 @@ async def get_open_tickets_by_user(user_id: int):
         logger.error(f"Ошибка при получении открытых тикетов пользователя {user_id}: {e}")
         return []
 
-async def update_application_field(application_id: int, field_name: str, value: str):
-    """Обновляет конкретное поле заявки"""
-    try:
-        async with aiosqlite.connect('data/bot.db') as db:
-            await db.execute(f'''
-                UPDATE applications
-                SET {field_name} = ?
-                WHERE application_id = ?
-            ''', (value, application_id))
-            await db.commit()
-            logger.info(f"Обновлено поле {field_name} для заявки #{application_id}")
-            return True
-    except Exception as e:
-        logger.error(f"Ошибка при обновлении поля {field_name} для заявки #{application_id}: {e}")
-        return False
+# Поля анкеты, которые можно записать при отправке заявки
+APPLICATION_FORM_FIELDS = (
+    'player_name', 'player_age', 'player_about', 'player_plans', 'player_community',
+    'player_platform', 'player_nickname_java', 'player_nickname_bedrock', 'player_referral'
+)
 
-async def add_application_with_platform(user_id: int, platform: str):
-    """Создает новую заявку с указанной платформой"""
-    try:
-        async with aiosqlite.connect('data/bot.db') as db:
-            await db.execute('''
-                INSERT INTO applications (user_id, status, created_at, edit_count, player_platform)
-                VALUES (?, 'pending', ?, 0, ?)
-            ''', (user_id, datetime.now().isoformat(), platform))
-            await db.commit()
-            
-            async with db.execute('''
-                SELECT application_id
-                FROM applications
-                WHERE user_id = ?
-                ORDER BY created_at DESC
-                LIMIT 1
-            ''', (user_id,)) as cursor:
-                application = await cursor.fetchone()
-                if application:
-                    logger.info(f"Создана новая заявка #{application[0]} от пользователя {user_id} с платформой {platform}")
-                    return application[0]
-                else:
-                    logger.error(f"Ошибка создания заявки: не удалось получить application_id")
-                    return None
-    except Exception as e:
-        logger.error(f"Ошибка при создании заявки для пользователя {user_id}: {e}")
-        return None
-
-async def save_players_to_file(application_id: int):
+async def submit_application(user_id: int, form: dict, media: list):
     """
-    Сохраняет никнеймы игроков в файл data/players.txt в формате:
-    username,platform,nickname_java,nickname_bedrock
-    """
-    try:
-        async with aiosqlite.connect('data/bot.db') as db:
-            async with db.execute('''
-                SELECT u.username, a.player_platform, a.player_nickname_java, a.player_nickname_bedrock
-                FROM applications a
-                JOIN users u ON a.user_id = u.user_id
-                WHERE a.application_id = ?
-            ''', (application_id,)) as cursor:
-                player_data = await cursor.fetchone()
-                
-                if player_data:
-                    username, platform, nickname_java, nickname_bedrock = player_data
-                    with open('data/players.txt', 'a', encoding='utf-8') as f:
-                        f.write(f"{username},{platform},{nickname_java or ''},{nickname_bedrock or ''}\n")
-                    logger.info(f"Никнеймы игрока {username} сохранены в файл")
-    except Exception as e:
-        logger.error(f"Ошибка при сохранении никнеймов в файл: {e}")
+    Сохраняет заявку целиком одной транзакцией.
 
-async def execute_whitelist_command(nickname: str, platform: str):
-    """
-    Выполняет команду whitelist/fwhitelist через screen
-    
-    :param nickname: Никнейм игрока
-    :param platform: Платформа (java/bedrock)
+    :param form: значения полей анкеты по именам столбцов из APPLICATION_FORM_FIELDS
+    :param media: список кортежей (file_id, media_type, media_category)
+    :return: application_id новой заявки или None при ошибке
     """
-    import subprocess
-    
     try:
-        if platform == "java":
-            command = f"screen -DD -RR server -X stuff 'whitelist add {nickname}\n'"
-        elif platform == "bedrock":
-            command = f"screen -DD -RR server -X stuff 'fwhitelist add {nickname}\n'"
-        else:
-            logger.error(f"Неизвестная платформа для whitelist: {platform}")
-            return False
-        
-        # Выполняем команду
-        result = subprocess.run(command, shell=True, capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            logger.info(f"Успешно выполнена команда whitelist для {nickname} ({platform})")
-            return True
-        else:
-            logger.error(f"Ошибка выполнения команды whitelist: {result.stderr}")
-            return False
-            
+        unknown = set(form) - set(APPLICATION_FORM_FIELDS)
+        if unknown:
+            raise ValueError(f"неизвестные поля анкеты: {', '.join(sorted(unknown))}")
+        columns = [column for column in APPLICATION_FORM_FIELDS if column in form]
+        column_list = ''.join(f', {column}' for column in columns)
+        placeholders = ', ?' * len(columns)
+        now = datetime.now().isoformat()
+        async with _write() as db:
+            cursor = await db.execute(f'''
+                INSERT INTO applications (user_id, status, created_at, edit_count{column_list})
+                VALUES (?, 'pending', ?, 0{placeholders})
+            ''', (user_id, now, *(form[column] for column in columns)))
+            application_id = cursor.lastrowid
+            await db.executemany('''
+                INSERT INTO application_media (application_id, file_id, media_type, media_category)
+                VALUES (?, ?, ?, ?)
+            ''', [(application_id, file_id, media_type, category) for file_id, media_type, category in media])
+        _has_application_cache.invalidate(user_id)
+        logger.info(f"Заявка #{application_id} от пользователя {user_id} сохранена: {len(columns)} полей, {len(media)} медиа")
+        return application_id
     except Exception as e:
-        logger.error(f"Ошибка при выполнении команды whitelist: {e}")
-        return False
+        logger.error(f"Ошибка при сохранении заявки пользователя {user_id}: {e}")
+        return None
 
 async def get_full_application_data(application_id: int):
     """Получает все данные заявки для отображения админам"""
     try:
-        async with aiosqlite.connect('data/bot.db') as db:
+        async with _read() as db:
             async with db.execute('''
                 SELECT 
                     a.application_id, a.user_id, a.status, a.description, a.comment, a.created_at, a.edit_count,
@@ -542,123 +985,167 @@ async def get_full_application_data(application_id: int):
         logger.error(f"Ошибка при получении полных данных заявки #{application_id}: {e}")
         return None
 
-async def add_skin_media(application_id: int, file_id: str, media_type: str):
-    """Добавляет медиафайл скина игрока"""
-    try:
-        async with aiosqlite.connect('data/bot.db') as db:
-            await db.execute('''
-                INSERT INTO application_media (application_id, file_id, media_type, media_category)
-                VALUES (?, ?, ?, 'skin')
-            ''', (application_id, file_id, media_type))
-            await db.commit()
-            logger.info(f"Медиа скина добавлено для заявки #{application_id}: {media_type}")
-            return True
-    except Exception as e:
-        logger.error(f"Ошибка при добавлении медиа скина для заявки #{application_id}: {e}")
-        return False
-
-async def add_project_media(application_id: int, file_id: str, media_type: str):
-    """Добавляет медиафайл проекта игрока"""
-    try:
-        async with aiosqlite.connect('data/bot.db') as db:
-            await db.execute('''
-                INSERT INTO application_media (application_id, file_id, media_type, media_category)
-                VALUES (?, ?, ?, 'project')
-            ''', (application_id, file_id, media_type))
-            await db.commit()
-            logger.info(f"Медиа проекта добавлено для заявки #{application_id}: {media_type}")
-            return True
-    except Exception as e:
-        logger.error(f"Ошибка при добавлении медиа проекта для заявки #{application_id}: {e}")
-        return False
-
-async def get_application_media_by_category(application_id: int, category: str):
-    """Получает медиафайлы заявки по определенной категории"""
-    try:
-        async with aiosqlite.connect('data/bot.db') as db:
-            async with db.execute('''
-                SELECT media_id, application_id, file_id, media_type
-                FROM application_media
-                WHERE application_id = ? AND media_category = ?
-            ''', (application_id, category)) as cursor:
-                return await cursor.fetchall()
-    except Exception as e:
-        logger.error(f"Ошибка при получении медиа категории {category} для заявки #{application_id}: {e}")
-        return []
-
-async def get_full_application_data(application_id: int):
-    """Получает все данные заявки для отображения админам"""
+async def register_players(application_id: int) -> bool:
+    """
+    Заносит никнеймы заявки в реестр игроков и убирает никнеймы, которых
+    в заявке больше нет. Возвращает True, если реестр изменился
+    """
     try:
-        async with aiosqlite.connect('data/bot.db') as db:
+        async with _write() as db:
             async with db.execute('''
-                SELECT 
-                    a.application_id, a.user_id, a.status, a.description, a.comment, a.created_at, a.edit_count,
-                    a.player_name, a.player_age, a.player_about, a.player_plans, a.player_community,
-                    a.player_platform, a.player_nickname_java, a.player_nickname_bedrock, a.player_referral,
-                    u.username
+                SELECT a.user_id, u.username, a.player_platform, a.player_nickname_java, a.player_nickname_bedrock
                 FROM applications a
-                JOIN users u ON a.user_id = u.user_id
+                LEFT JOIN users u ON u.user_id = a.user_id
                 WHERE a.application_id = ?
             ''', (application_id,)) as cursor:
                 application = await cursor.fetchone()
-                if not application:
-                    logger.warning(f"Заявка #{application_id} не найдена")
-                return application
+            if not application:
+                return False
+            user_id, username, platform, nickname_java, nickname_bedrock = application
+            players = [
+                (nickname.strip(), player_platform)
+                for nickname, player_platform in ((nickname_java, "java"), (nickname_bedrock, "bedrock"))
+                if nickname and nickname.strip() and platform in (player_platform, "both")
+            ]
+            created_at = datetime.now().isoformat()
+            cursor = await db.executemany('''
+                INSERT INTO players (nickname, platform, user_id, username, application_id, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (nickname_normalized, platform) DO UPDATE SET
+                    nickname = excluded.nickname,
+                    user_id = excluded.user_id,
+                    username = excluded.username,
+                    application_id = excluded.application_id
+                WHERE players.nickname IS NOT excluded.nickname
+                   OR players.user_id IS NOT excluded.user_id
+                   OR players.username IS NOT excluded.username
+                   OR players.application_id IS NOT excluded.application_id
+            ''', [(nickname, player_platform, user_id, username, application_id, created_at)
+                  for nickname, player_platform in players])
+            changed = max(cursor.rowcount, 0)
+            keep = "".join(" AND NOT (nickname_normalized = lower(trim(?)) AND platform = ?)" for _ in players)
+            cursor = await db.execute(
+                f"DELETE FROM players WHERE application_id = ?{keep}",
+                (application_id, *[value for player in players for value in player])
+            )
+            changed += max(cursor.rowcount, 0)
+        if changed:
+            logger.info(f"Реестр игроков обновлен по заявке #{application_id}: {changed} изменений")
+        return changed > 0
     except Exception as e:
-        logger.error(f"Ошибка при получении полных данных заявки #{application_id}: {e}")
-        return None
+        logger.error(f"Ошибка при обновлении реестра игроков по заявке #{application_id}: {e}")
+        return False
 
-async def execute_whitelist_command(nickname: str, platform: str):
+async def _release_players(db, application_id: int) -> int:
+    """Освобождает никнеймы отклоненной или удаленной заявки; возвращает число строк"""
+    cursor = await db.execute('DELETE FROM players WHERE application_id = ?', (application_id,))
+    return max(cursor.rowcount, 0)
+
+async def find_nickname_owner(nickname: str, platform: str, user_id: int):
     """
-    Выполняет команду whitelist/fwhitelist через screen
-    
-    :param nickname: Никнейм игрока
-    :param platform: Платформа (java/bedrock)
+    Ищет другого пользователя, который уже использует никнейм на платформе:
+    в реестре игроков или в нерассмотренной либо одобренной заявке.
+    Записи реестра, чья заявка отклонена или удалена, никнейм не занимают.
+    Возвращает его user_id или None
     """
-    import subprocess
-    
+    normalized = NICKNAME_COLUMNS[platform][1]
+    async with _read() as db:
+        async with db.execute(f'''
+            SELECT p.user_id FROM players p
+            JOIN applications a ON a.application_id = p.application_id
+            WHERE p.nickname_normalized = lower(trim(?)) AND p.platform = ? AND p.user_id IS NOT ?
+              AND a.status IN ('pending', 'approved')
+            UNION ALL
+            SELECT user_id FROM applications
+            WHERE {normalized} = lower(trim(?)) AND user_id IS NOT ?
+              AND player_platform IN (?, 'both') AND status IN ('pending', 'approved')
+            LIMIT 1
+        ''', (nickname, platform, user_id, nickname, user_id, platform)) as cursor:
+            row = await cursor.fetchone()
+            return row[0] if row else None
+
+async def get_players():
+    async with _read() as db:
+        async with db.execute('''
+            SELECT p.username, p.platform, p.nickname
+            FROM players p
+            JOIN applications a ON a.application_id = p.application_id
+            WHERE a.status IN ('pending', 'approved')
+            ORDER BY p.player_id
+        ''') as cursor:
+            return await cursor.fetchall()
+
+def _replace_file(path: str, content: str):
+    """Записывает файл целиком через временный файл и rename"""
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".players-", suffix=".tmp")
     try:
-        if platform == "java":
-            command = f"screen -DD -RR server -X stuff 'whitelist add {nickname}\n'"
-        elif platform == "bedrock":
-            command = f"screen -DD -RR server -X stuff 'fwhitelist add {nickname}\n'"
-        else:
-            logger.error(f"Неизвестная платформа для whitelist: {platform}")
-            return False
-        
-        # Выполняем команду
-        result = subprocess.run(command, shell=True, capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            logger.info(f"Успешно выполнена команда whitelist для {nickname} ({platform})")
-            return True
-        else:
-            logger.error(f"Ошибка выполнения команды whitelist: {result.stderr}")
-            return False
-            
-    except Exception as e:
-        logger.error(f"Ошибка при выполнении команды whitelist: {e}")
-        return False
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
 
-async def save_players_to_file(application_id: int):
+_players_export_lock = asyncio.Lock()
+
+async def export_players(path: str = PLAYERS_FILE):
     """
-    Сохраняет никнеймы игроков в файл data/players.txt в формате:
-    username,platform,nickname_java,nickname_bedrock
+    Перегенерирует файл игроков в формате
+    username,platform,nickname_java,nickname_bedrock — по строке на никнейм
     """
-    try:
-        async with aiosqlite.connect('data/bot.db') as db:
-            async with db.execute('''
-                SELECT u.username, a.player_platform, a.player_nickname_java, a.player_nickname_bedrock
-                FROM applications a
-                JOIN users u ON a.user_id = u.user_id
-                WHERE a.application_id = ?
-            ''', (application_id,)) as cursor:
-                player_data = await cursor.fetchone()
-                
-                if player_data:
-                    username, platform, nickname_java, nickname_bedrock = player_data
-                    with open('data/players.txt', 'a', encoding='utf-8') as f:
-                        f.write(f"{username},{platform},{nickname_java or ''},{nickname_bedrock or ''}\n")
-                    logger.info(f"Никнеймы игрока {username} сохранены в файл")
-    except Exception as e:
-        logger.error(f"Ошибка при сохранении никнеймов в файл: {e}")
+    async with _players_export_lock:
+        try:
+            lines = [
+                f"{username or ''},{platform},{nickname if platform == 'java' else ''},{nickname if platform == 'bedrock' else ''}\n"
+                for username, platform, nickname in await get_players()
+            ]
+            await asyncio.to_thread(_replace_file, path, "".join(lines))
+            logger.info(f"Файл игроков {path} обновлен: {len(lines)} никнеймов")
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении никнеймов в файл: {e}")
+
+async def save_players_to_file(application_id: int):
+    """Добавляет никнеймы заявки в реестр и обновляет data/players.txt, если набор изменился"""
+    if await register_players(application_id) or not os.path.exists(PLAYERS_FILE):
+        await export_players()
+
+async def get_fsm_record(key: str):
+    """(state, data JSON, updated_at) записи FSM или None"""
+    async with _read() as db:
+        async with db.execute('''
+            SELECT state, data, updated_at
+            FROM fsm_storage
+            WHERE key = ?
+        ''', (key,)) as cursor:
+            return await cursor.fetchone()
+
+async def save_fsm_record(key: str, state: str, data: str, updated_at: float):
+    async with _write() as db:
+        await db.execute('''
+            INSERT INTO fsm_storage (key, state, data, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (key) DO UPDATE SET
+                state = excluded.state,
+                data = excluded.data,
+                updated_at = excluded.updated_at
+        ''', (key, state, data, updated_at))
+
+async def delete_fsm_record(key: str):
+    async with _write() as db:
+        await db.execute('DELETE FROM fsm_storage WHERE key = ?', (key,))
+
+async def delete_expired_fsm_records(before: float, limit: int = SQL_BATCH_SIZE) -> int:
+    """Удаляет не более limit записей FSM, не обновлявшихся с момента before"""
+    async with _write() as db:
+        cursor = await db.execute('''
+            DELETE FROM fsm_storage
+            WHERE key IN (
+                SELECT key FROM fsm_storage
+                WHERE updated_at < ?
+                LIMIT ?
+            )
+        ''', (before, limit))
+        return cursor.rowcount
\ No newline at end of file
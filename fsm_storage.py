@@ -0,0 +1,141 @@
+"""Хранилище FSM aiogram поверх bot.db"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, Mapping, Optional
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+from cache import TTLCache
+from db import get_fsm_record, save_fsm_record, delete_fsm_record, delete_expired_fsm_records
+
+logger = logging.getLogger(__name__)
+
+# Брошенная анкета или чат удаляются через сутки без активности
+FSM_TTL = 24 * 60 * 60
+FSM_CACHE_SIZE = 2048
+FSM_CACHE_TTL = 300
+FSM_PURGE_INTERVAL = 10 * 60
+FSM_PURGE_BATCH = 500
+EMPTY_DATA = "{}"
+# Число блокировок, по которым распределяются ключи при записи
+FSM_LOCK_STRIPES = 64
+
+class SQLiteStorage(BaseStorage):
+    """
+    FSM-хранилище в таблице fsm_storage.
+
+    Состояние и данные ключа хранятся одной строкой, данные — компактным JSON.
+    Горячие ключи читаются из LRU-кэша, запись идет сразу и в кэш, и в базу.
+    Записи, не менявшиеся дольше ttl секунд, считаются пустыми и удаляются
+    фоновой задачей.
+    """
+
+    def __init__(self, ttl: float = FSM_TTL, cache_size: int = FSM_CACHE_SIZE,
+                 purge_interval: float = FSM_PURGE_INTERVAL):
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self.key_builder = DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self._cache = TTLCache(maxsize=cache_size, ttl=min(FSM_CACHE_TTL, ttl))
+        self._purge_task = None
+        self._locks = [asyncio.Lock() for _ in range(FSM_LOCK_STRIPES)]
+
+    def _lock(self, key: str) -> asyncio.Lock:
+        # Чтение-изменение-запись одного ключа не должно перемежаться, иначе
+        # параллельные update_data (например, из альбома) теряют изменения
+        return self._locks[hash(key) % FSM_LOCK_STRIPES]
+
+    @staticmethod
+    def _dump(data: Mapping[str, Any]) -> str:
+        return json.dumps(dict(data), ensure_ascii=False, separators=(",", ":"))
+
+    def start(self):
+        self._purge_task = asyncio.create_task(self._purge_loop())
+
+    async def close(self) -> None:
+        if self._purge_task is not None:
+            self._purge_task.cancel()
+            try:
+                await self._purge_task
+            except asyncio.CancelledError:
+                pass
+            self._purge_task = None
+        self._cache.clear()
+
+    async def _load(self, key: str):
+        """(state, data JSON) ключа с учетом срока жизни"""
+        record = self._cache.get(key)
+        if record is None:
+            record = await get_fsm_record(key) or (None, EMPTY_DATA, 0)
+            self._cache.set(key, record)
+        state, payload, updated_at = record
+        if updated_at and updated_at < time.time() - self.ttl:
+            return None, EMPTY_DATA
+        return state, payload
+
+    async def _save(self, key: str, state: Optional[str], payload: str):
+        if state is None and payload == EMPTY_DATA:
+            self._cache.set(key, (None, EMPTY_DATA, 0))
+            await delete_fsm_record(key)
+            return
+        updated_at = time.time()
+        self._cache.set(key, (state, payload, updated_at))
+        try:
+            await save_fsm_record(key, state, payload, updated_at)
+        except Exception:
+            # Кэш не должен расходиться с базой
+            self._cache.invalidate(key)
+            raise
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        storage_key = self.key_builder.build(key)
+        async with self._lock(storage_key):
+            _, payload = await self._load(storage_key)
+            await self._save(storage_key, state.state if isinstance(state, State) else state, payload)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state, _ = await self._load(self.key_builder.build(key))
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        storage_key = self.key_builder.build(key)
+        async with self._lock(storage_key):
+            state, _ = await self._load(storage_key)
+            await self._save(storage_key, state, self._dump(data))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        # Кэшируется JSON, поэтому каждый вызов получает собственную копию данных
+        _, payload = await self._load(self.key_builder.build(key))
+        return json.loads(payload)
+
+    async def update_data(self, key: StorageKey, data: Mapping[str, Any]) -> Dict[str, Any]:
+        storage_key = self.key_builder.build(key)
+        async with self._lock(storage_key):
+            state, payload = await self._load(storage_key)
+            current = json.loads(payload)
+            current.update(data)
+            await self._save(storage_key, state, self._dump(current))
+        return current
+
+    async def purge_expired(self) -> int:
+        """Удаляет просроченные записи пачками, не удерживая запись надолго"""
+        before = time.time() - self.ttl
+        total = 0
+        while True:
+            deleted = await delete_expired_fsm_records(before, FSM_PURGE_BATCH)
+            total += deleted
+            if deleted < FSM_PURGE_BATCH:
+                break
+            await asyncio.sleep(0)
+        if total:
+            logger.info(f"Удалено {total} просроченных записей FSM")
+        return total
+
+    async def _purge_loop(self):
+        while True:
+            try:
+                await self.purge_expired()
+            except Exception as e:
+                logger.error(f"Ошибка очистки просроченных записей FSM: {e}")
+            await asyncio.sleep(self.purge_interval)
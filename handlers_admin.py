@@ -4,16 +4,19 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.filters import StateFilter, Command, CommandStart
 from config import ADMIN_IDS
-from db import get_pending_applications, get_application_by_id, update_application_status, get_application_media, get_open_tickets, delete_application, get_ticket_messages, update_application_comment, get_user, get_ticket_by_id, assign_admin_to_ticket, close_ticket, add_ticket_message, add_user
+from db import get_application_by_id, update_application_status, get_application_media, delete_application, get_ticket_messages, update_application_comment, get_user, get_ticket_by_id, assign_admin_to_ticket, close_ticket, add_ticket_message, add_user, get_application_list, get_open_ticket_list, get_full_application_data, split_page, PAGE_NEXT, PAGE_PREV
+from whitelist import application_targets, check_target, queue_whitelist
 import logging
-import aiosqlite
-from keyboards import get_admin_menu, get_application_action_keyboard, get_main_menu, get_admin_ticket_keyboard
+from keyboards import get_admin_menu, get_application_action_keyboard, get_main_menu, get_admin_ticket_keyboard, get_pagination_row
 from aiogram.fsm.storage.base import StorageKey
 from datetime import datetime
-from .utils import translate_status, format_datetime, delete_messages, safe_message_delete, extract_id_from_callback, get_state_data, get_message_content_and_type, send_media_message
+from .utils import translate_status, format_datetime, render_panel, delete_messages, safe_message_delete, extract_id_from_callback, get_state_data, get_message_content_and_type, send_media_message, send_media_batch
 from .constants import *
+from callbacks import CallbackRouter, VIEW_APPLICATION, APPROVE, REJECT, COMMENT, DELETE, APPS_PAGE, TICKETS_PAGE, VIEW_TICKET, CHAT_TICKET, ADMIN_CHAT_TICKET, ADMIN_CLOSE_TICKET
 
 admin_router = Router()
+# Все callback-кнопки админа разбираются одним обработчиком по этой таблице
+admin_callbacks = CallbackRouter("admin")
 
 # Фильтры для админских команд уже установлены в __init__.py
 # admin_router.message.filter(F.from_user.id.in_(ADMIN_IDS))
@@ -35,21 +38,11 @@ def translate_status(status: str) -> str:
     }
     return statuses.get(status, status)
 
-async def get_applications_by_status(status: str):
-    async with aiosqlite.connect('data/bot.db') as db:
-        async with db.execute('''
-            SELECT application_id, user_id, status, description, comment, created_at, edit_count
-            FROM applications
-            WHERE status = ?
-            ORDER BY created_at
-        ''', (status,)) as cursor:
-            return await cursor.fetchall()
-
-@admin_router.callback_query(F.data == "admin_menu")
+@admin_callbacks.route("admin_menu", "back_to_main")
 async def admin_menu(callback: CallbackQuery):
     try:
-        await callback.message.delete()
-        await callback.message.answer(
+        await render_panel(
+            callback,
             "⚙️ Админ-панель: выберите действие:",
             reply_markup=get_admin_menu()
         )
@@ -58,14 +51,14 @@ async def admin_menu(callback: CallbackQuery):
         await callback.message.answer("❌ Произошла ошибка в админ-панели.")
     await callback.answer()
 
-@admin_router.callback_query(F.data == "view_applications")
+@admin_callbacks.route("view_applications")
 async def view_applications_admin(callback: CallbackQuery):
     if callback.from_user.id not in ADMIN_IDS:
         await callback.message.answer("🚫 Доступ к админ-панели запрещён!")
         return
     try:
-        await callback.message.delete()
-        await callback.message.answer(
+        await render_panel(
+            callback,
             "📬 Выберите категорию заявок:",
             reply_markup=InlineKeyboardMarkup(inline_keyboard=[
                 [InlineKeyboardButton(text="⏳ Ожидают", callback_data="view_pending")],
@@ -79,110 +72,89 @@ async def view_applications_admin(callback: CallbackQuery):
         await callback.message.answer("❌ Произошла ошибка при просмотре заявок.")
     await callback.answer()
 
-@admin_router.callback_query(F.data == "view_pending")
-async def view_pending_applications(callback: CallbackQuery):
-    if callback.from_user.id not in ADMIN_IDS:
-        await callback.message.answer("🚫 Доступ к админ-панели запрещён!")
+APPLICATION_LIST_TITLES = {
+    STATUS_PENDING: ("📬 Ожидающие заявки:", "📭 Нет заявок на рассмотрении."),
+    STATUS_APPROVED: ("📬 Одобренные заявки:", "📭 Нет одобренных заявок."),
+    STATUS_REJECTED: ("📬 Отклонённые заявки:", "📭 Нет отклонённых заявок."),
+}
+
+def page_position(direction: str, cursor: int):
+    """Направление и курсор кнопки пагинации; при неизвестном направлении — первая страница"""
+    if direction not in (PAGE_NEXT, PAGE_PREV):
+        logger.error(f"Неизвестное направление пагинации: {direction}")
+        return PAGE_NEXT, None
+    return direction, cursor
+
+async def send_application_page(callback: CallbackQuery, status: str, cursor: int = None, direction: str = PAGE_NEXT):
+    title, empty_text = APPLICATION_LIST_TITLES[status]
+    applications = await get_application_list(status, cursor, direction, PAGE_SIZE + 1)
+    if not applications and cursor is not None:
+        # Граничная заявка могла быть удалена — начинаем с первой страницы
+        cursor, direction = None, PAGE_NEXT
+        applications = await get_application_list(status, limit=PAGE_SIZE + 1)
+    if not applications:
+        await render_panel(
+            callback,
+            empty_text,
+            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
+                [InlineKeyboardButton(text="↩️ Назад", callback_data="view_applications")]
+            ])
+        )
         return
-    try:
-        await callback.message.delete()
-        applications = await get_pending_applications()
-        if not applications:
-            await callback.message.answer(
-                "📭 Нет заявок на рассмотрении.",
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(text="↩️ Назад", callback_data="view_applications")]
-                ])
-            )
-        else:
-            buttons = []
-            for app in applications:
-                user = await get_user(app[1])
-                username = f"@{user[1]}" if user[1] else f"ID {app[1]}"
-                buttons.append([InlineKeyboardButton(text=f"📝 Заявка #{app[0]} от {username}", callback_data=f"view_application_{app[0]}")])
-            buttons.append([InlineKeyboardButton(text="↩️ Назад", callback_data="view_applications")])
-            await callback.message.answer(
-                "📬 Ожидающие заявки:",
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons)
-            )
-    except Exception as e:
-        logger.error(f"Ошибка в view_pending_applications для админа {callback.from_user.id}: {e}")
-        await callback.message.answer("❌ Произошла ошибка при просмотре заявок.")
-    await callback.answer()
+    applications, has_prev, has_next = split_page(applications, cursor, direction, PAGE_SIZE)
+    buttons = []
+    for app in applications:
+        username = f"@{app[2]}" if app[2] else f"ID {app[1]}"
+        buttons.append([InlineKeyboardButton(text=f"📝 Заявка #{app[0]} от {username}", callback_data=VIEW_APPLICATION.pack(app[0]))])
+    pagination = get_pagination_row(APPS_PAGE, applications[0][0], applications[-1][0], has_prev, has_next, status)
+    if pagination:
+        buttons.append(pagination)
+    buttons.append([InlineKeyboardButton(text="↩️ Назад", callback_data="view_applications")])
+    await render_panel(
+        callback,
+        title,
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons)
+    )
 
-@admin_router.callback_query(F.data == "view_approved")
-async def view_approved_applications(callback: CallbackQuery):
+@admin_callbacks.route("view_pending", "view_approved", "view_rejected")
+async def view_applications_by_status(callback: CallbackQuery):
     if callback.from_user.id not in ADMIN_IDS:
         await callback.message.answer("🚫 Доступ к админ-панели запрещён!")
         return
+    status = {"view_pending": STATUS_PENDING, "view_approved": STATUS_APPROVED, "view_rejected": STATUS_REJECTED}[callback.data]
     try:
-        await callback.message.delete()
-        applications = await get_applications_by_status('approved')
-        if not applications:
-            await callback.message.answer(
-                "📭 Нет одобренных заявок.",
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(text="↩️ Назад", callback_data="view_applications")]
-                ])
-            )
-        else:
-            buttons = []
-            for app in applications:
-                user = await get_user(app[1])
-                username = f"@{user[1]}" if user[1] else f"ID {app[1]}"
-                buttons.append([InlineKeyboardButton(text=f"📝 Заявка #{app[0]} от {username}", callback_data=f"view_application_{app[0]}")])
-            buttons.append([InlineKeyboardButton(text="↩️ Назад", callback_data="view_applications")])
-            await callback.message.answer(
-                "📬 Одобренные заявки:",
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons)
-            )
+        await send_application_page(callback, status)
     except Exception as e:
-        logger.error(f"Ошибка в view_approved_applications для админа {callback.from_user.id}: {e}")
+        logger.error(f"Ошибка в view_applications_by_status ({status}) для админа {callback.from_user.id}: {e}")
         await callback.message.answer("❌ Произошла ошибка при просмотре заявок.")
     await callback.answer()
 
-@admin_router.callback_query(F.data == "view_rejected")
-async def view_rejected_applications(callback: CallbackQuery):
+@admin_callbacks.route(APPS_PAGE)
+async def view_applications_page(callback: CallbackQuery, status: str, direction: str, cursor: int):
     if callback.from_user.id not in ADMIN_IDS:
         await callback.message.answer("🚫 Доступ к админ-панели запрещён!")
         return
+    if status not in APPLICATION_LIST_TITLES:
+        await callback.answer(MSG_UNKNOWN_COMMAND)
+        return
+    direction, cursor = page_position(direction, cursor)
     try:
-        await callback.message.delete()
-        applications = await get_applications_by_status('rejected')
-        if not applications:
-            await callback.message.answer(
-                "📭 Нет отклонённых заявок.",
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(text="↩️ Назад", callback_data="view_applications")]
-                ])
-            )
-        else:
-            buttons = []
-            for app in applications:
-                user = await get_user(app[1])
-                username = f"@{user[1]}" if user[1] else f"ID {app[1]}"
-                buttons.append([InlineKeyboardButton(text=f"📝 Заявка #{app[0]} от {username}", callback_data=f"view_application_{app[0]}")])
-            buttons.append([InlineKeyboardButton(text="↩️ Назад", callback_data="view_applications")])
-            await callback.message.answer(
-                "📬 Отклонённые заявки:",
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons)
-            )
+        await send_application_page(callback, status, cursor, direction)
     except Exception as e:
-        logger.error(f"Ошибка в view_rejected_applications для админа {callback.from_user.id}: {e}")
+        logger.error(f"Ошибка в view_applications_page для админа {callback.from_user.id}: {e}")
         await callback.message.answer("❌ Произошла ошибка при просмотре заявок.")
     await callback.answer()
 
-@admin_router.callback_query(F.data.startswith("view_application_"))
-async def view_application(callback: CallbackQuery, state: FSMContext, bot: Bot):
+@admin_callbacks.route(VIEW_APPLICATION)
+async def view_application(callback: CallbackQuery, state: FSMContext, bot: Bot, application_id: int):
     if callback.from_user.id not in ADMIN_IDS:
         await callback.message.answer("🚫 Доступ к админ-панели запрещён!")
         return
     try:
-        await callback.message.delete()
-        application_id = int(callback.data.split("_")[2])
         application = await get_application_by_id(application_id)
         if not application:
-            await callback.message.answer(
+            await render_panel(
+                callback,
                 "📭 Заявка не найдена.",
                 reply_markup=get_admin_menu()
             )
@@ -191,7 +163,8 @@ async def view_application(callback: CallbackQuery, state: FSMContext, bot: Bot)
             username = f"@{user[1]}" if user[1] else f"ID {application[1]}"
             media = await get_application_media(application[0])
             media_count = len(media)
-            message = await callback.message.answer(
+            message = await render_panel(
+                callback,
                 f"📝 Заявка #{application[0]}:\n"
                 f"👤 Пользователь: {username}\n"
                 f"Статус: {translate_status(application[2])}\n"
@@ -201,19 +174,11 @@ async def view_application(callback: CallbackQuery, state: FSMContext, bot: Bot)
                 f"📅 Создано: {format_datetime(application[5])}",
                 reply_markup=get_application_action_keyboard(application[0], application[2])
             )
-            media_message_ids = []
-            for item in media:
-                try:
-                    if item[3] == "photo":
-                        media_message = await bot.send_photo(callback.from_user.id, item[2])
-                    elif item[3] == "video":
-                        media_message = await bot.send_video(callback.from_user.id, item[2])
-                    elif item[3] == "document":
-                        media_message = await bot.send_document(callback.from_user.id, item[2])
-                    media_message_ids.append(media_message.message_id)
-                except Exception as e:
-                    logger.error(f"Ошибка отправки медиа {item[2]} админу {callback.from_user.id}: {e}")
-                    await callback.message.answer("❌ Не удалось отправить одно из медиа.")
+            media_message_ids = await send_media_batch(
+                bot, callback.from_user.id, [(item[3], item[2], None) for item in media]
+            )
+            if len(media_message_ids) < media_count:
+                await callback.message.answer("❌ Не удалось отправить одно из медиа.")
             await state.update_data(
                 message_id=message.message_id,
                 media_message_ids=media_message_ids
@@ -223,62 +188,97 @@ async def view_application(callback: CallbackQuery, state: FSMContext, bot: Bot)
         await callback.message.answer("❌ Произошла ошибка при просмотре заявки.")
     await callback.answer()
 
-@admin_router.callback_query(F.data.startswith("approve_"))
-async def approve_application(callback: CallbackQuery, bot: Bot):
-    application_id = int(callback.data.split("_")[1])
-    application = await get_application_by_id(application_id)
-    
-    if not application:
-        await callback.answer("Заявка не найдена", show_alert=True)
+# Заявки, для которых сейчас выполняются команды whitelist
+approving_applications = set()
+
+def format_whitelist_target(nickname: str, platform: str) -> str:
+    list_name = "whitelist Java" if platform == "java" else "fwhitelist Bedrock"
+    return f"{nickname} ({list_name})"
+
+@admin_callbacks.route(APPROVE)
+async def approve_application(callback: CallbackQuery, bot: Bot, application_id: int):
+    if callback.from_user.id not in ADMIN_IDS:
+        await callback.message.answer("🚫 Доступ к админ-панели запрещён!")
+        return
+    if application_id in approving_applications:
+        await callback.answer("⏳ Заявка уже обрабатывается", show_alert=True)
         return
     
     # Получаем полные данные заявки
     full_data = await get_full_application_data(application_id)
     
     if not full_data:
-        await callback.answer("Не удалось получить данные заявки", show_alert=True)
+        await callback.answer("Заявка не найдена", show_alert=True)
+        return
+    if full_data[2] != STATUS_PENDING:
+        await callback.answer(f"Заявка уже обработана ({translate_status(full_data[2])})", show_alert=True)
         return
     
-    # Добавляем в вайтлист в зависимости от платформы
-    if full_data['player_platform'] in ["java", "both"] and full_data['player_nickname_java']:
-        success = await execute_whitelist_command(full_data['player_nickname_java'], "java")
-        if not success:
-            await callback.answer("Ошибка добавления в whitelist Java", show_alert=True)
-            return
-    
-    if full_data['player_platform'] in ["bedrock", "both"] and full_data['player_nickname_bedrock']:
-        success = await execute_whitelist_command(full_data['player_nickname_bedrock'], "bedrock")
-        if not success:
-            await callback.answer("Ошибка добавления в fwhitelist Bedrock", show_alert=True)
+    # Никнеймы, которые консоль не примет, не стоит одобрять
+    targets = application_targets(full_data[12], full_data[13], full_data[14])
+    for nickname, platform in targets:
+        error = check_target(nickname, platform)
+        if error:
+            await callback.answer(f"Нельзя добавить {format_whitelist_target(nickname, platform)}: {error}", show_alert=True)
             return
     
-    # Обновляем статус заявки
-    await update_application_status(application_id, "approved", "")
-    
-    # Уведомляем пользователя
-    await bot.send_message(
-        application[1],
-        "✅ Ваша заявка одобрена! Теперь вы можете зайти на сервер."
-    )
-    
-    await callback.answer("Заявка одобрена", show_alert=True)
-    await callback.message.edit_reply_markup(
-        reply_markup=get_application_action_keyboard(application_id, "approved")
-    )
+    # Отвечаем сразу: команды консоли выполняются асинхронно и могут занять время
+    await callback.answer("⏳ Одобряю и добавляю в whitelist...")
+    approving_applications.add(application_id)
+    try:
+        # Обновляем статус заявки; whitelist догоняет базу через очередь синхронизации
+        await update_application_status(application_id, STATUS_APPROVED, "")
+        
+        # Уведомляем пользователя
+        try:
+            await bot.send_message(
+                full_data[1],
+                "✅ Ваша заявка одобрена! Теперь вы можете зайти на сервер."
+            )
+        except Exception as e:
+            logger.error(f"Ошибка уведомления пользователя {full_data[1]} об одобрении заявки #{application_id}: {e}")
+        
+        await callback.message.edit_reply_markup(
+            reply_markup=get_application_action_keyboard(application_id, STATUS_APPROVED)
+        )
+        
+        try:
+            results = await queue_whitelist(targets)
+        except Exception as e:
+            # Заявка уже одобрена в базе — админ должен знать, что whitelist отстает
+            logger.error(f"Ошибка добавления в whitelist по заявке #{application_id}: {e}")
+            results = [(False, str(e))] * len(targets)
+        failed = [
+            f"• {format_whitelist_target(nickname, platform)}: {result}"
+            for (nickname, platform), (success, result) in zip(targets, results)
+            if not success
+        ]
+        if failed:
+            await callback.message.answer(
+                f"⚠️ Заявка #{application_id} одобрена, но добавить в whitelist не удалось:\n"
+                + "\n".join(failed)
+                + "\nКоманды будут повторены автоматически."
+            )
+        else:
+            await callback.message.answer(f"✅ Заявка #{application_id} одобрена.")
+    except Exception as e:
+        logger.error(f"Ошибка в approve_application для админа {callback.from_user.id}: {e}")
+        await callback.message.answer("❌ Произошла ошибка при одобрении заявки.")
+    finally:
+        approving_applications.discard(application_id)
 
-@admin_router.callback_query(F.data.startswith("reject_"))
-async def reject_application(callback: CallbackQuery, state: FSMContext, bot: Bot):
+@admin_callbacks.route(REJECT)
+async def reject_application(callback: CallbackQuery, state: FSMContext, bot: Bot, application_id: int):
     if callback.from_user.id not in ADMIN_IDS:
         await callback.message.answer("🚫 Доступ к админ-панели запрещён!")
         return
     try:
-        await callback.message.delete()
         data = await state.get_data()
-        await delete_messages(bot, callback.from_user.id, [data.get("message_id")] + data.get("media_message_ids", []))
-        application_id = int(callback.data.split("_")[1])
+        await delete_messages(bot, callback.from_user.id, [data.get("message_id")] + data.get("media_message_ids", []), keep=callback.message.message_id)
         application = await get_application_by_id(application_id)
         if application[2] != "pending":
-            await callback.message.answer(
+            await render_panel(
+                callback,
                 f"📝 Заявка #{application_id} уже обработана ({translate_status(application[2])}).",
                 reply_markup=get_admin_menu()
             )
@@ -295,7 +295,8 @@ async def reject_application(callback: CallbackQuery, state: FSMContext, bot: Bo
             logger.info(f"Уведомление об отклонении заявки #{application_id} отправлено пользователю {username}")
         except Exception as e:
             logger.error(f"Ошибка уведомления пользователя {username}: {e}")
-        await callback.message.answer(
+        await render_panel(
+            callback,
             f"📝 Заявка #{application_id} от {username} отклонена.",
             reply_markup=get_admin_menu()
         )
@@ -305,18 +306,17 @@ async def reject_application(callback: CallbackQuery, state: FSMContext, bot: Bo
         await callback.message.answer("❌ Произошла ошибка при отклонении заявки.")
     await callback.answer()
 
-@admin_router.callback_query(F.data.startswith("comment_"))
-async def comment_application(callback: CallbackQuery, state: FSMContext, bot: Bot):
+@admin_callbacks.route(COMMENT)
+async def comment_application(callback: CallbackQuery, state: FSMContext, bot: Bot, application_id: int):
     if callback.from_user.id not in ADMIN_IDS:
         await callback.message.answer("🚫 Доступ к админ-панели запрещён!")
         return
     try:
-        await callback.message.delete()
         data = await state.get_data()
-        await delete_messages(bot, callback.from_user.id, [data.get("message_id")] + data.get("media_message_ids", []))
-        application_id = int(callback.data.split("_")[1])
+        await delete_messages(bot, callback.from_user.id, [data.get("message_id")] + data.get("media_message_ids", []), keep=callback.message.message_id)
         await state.update_data(application_id=application_id)
-        message = await callback.message.answer(
+        message = await render_panel(
+            callback,
             f"💬 Введите комментарий для заявки #{application_id}:",
             reply_markup=InlineKeyboardMarkup(inline_keyboard=[
                 [InlineKeyboardButton(text="↩️ Отмена", callback_data="back_to_main")]
@@ -357,16 +357,14 @@ async def process_comment(message: Message, state: FSMContext, bot: Bot):
         logger.error(f"Ошибка в process_comment для админа {message.from_user.id}: {e}")
         await message.answer("❌ Произошла ошибка при сохранении комментария.")
 
-@admin_router.callback_query(F.data.startswith("delete_"))
-async def delete_application_handler(callback: CallbackQuery, state: FSMContext, bot: Bot):
+@admin_callbacks.route(DELETE)
+async def delete_application_handler(callback: CallbackQuery, state: FSMContext, bot: Bot, application_id: int):
     if callback.from_user.id not in ADMIN_IDS:
         await callback.message.answer("🚫 Доступ к админ-панели запрещён!")
         return
     try:
-        await callback.message.delete()
         data = await state.get_data()
-        await delete_messages(bot, callback.from_user.id, [data.get("message_id")] + data.get("media_message_ids", []))
-        application_id = int(callback.data.split("_")[1])
+        await delete_messages(bot, callback.from_user.id, [data.get("message_id")] + data.get("media_message_ids", []), keep=callback.message.message_id)
         user_id = await delete_application(application_id)
         if user_id:
             user = await get_user(user_id)
@@ -379,7 +377,8 @@ async def delete_application_handler(callback: CallbackQuery, state: FSMContext,
                 logger.info(f"Уведомление об удалении заявки #{application_id} отправлено пользователю {username}")
             except Exception as e:
                 logger.error(f"Ошибка уведомления пользователя {username}: {e}")
-        await callback.message.answer(
+        await render_panel(
+            callback,
             f"🗑 Заявка #{application_id} удалена!",
             reply_markup=get_admin_menu()
         )
@@ -389,7 +388,49 @@ async def delete_application_handler(callback: CallbackQuery, state: FSMContext,
         await callback.message.answer("❌ Произошла ошибка при удалении заявки.")
     await callback.answer()
 
-@admin_router.callback_query(F.data == "view_tickets")
+async def send_ticket_page(callback: CallbackQuery, cursor: int = None, direction: str = PAGE_NEXT):
+    tickets = await get_open_ticket_list(cursor, direction, PAGE_SIZE + 1)
+    if not tickets and cursor is not None:
+        # Граничный вопрос мог быть закрыт — начинаем с первой страницы
+        cursor, direction = None, PAGE_NEXT
+        tickets = await get_open_ticket_list(limit=PAGE_SIZE + 1)
+    if not tickets:
+        await render_panel(
+            callback,
+            "📭 Нет активных вопросов.",
+            reply_markup=get_admin_menu()
+        )
+        return
+    tickets, has_prev, has_next = split_page(tickets, cursor, direction, PAGE_SIZE)
+    # Создаем список кнопок для активных вопросов
+    buttons = []
+    for ticket in tickets:
+        username = f"@{ticket[2]}" if ticket[2] else f"ID {ticket[1]}"
+        
+        # Проверяем, назначен ли админ на вопрос
+        admin_assigned = "✓" if ticket[4] else "✗"
+        
+        buttons.append([
+            InlineKeyboardButton(
+                text=f"🆘 #{ticket[0]} от {username} | Админ: {admin_assigned}",
+                callback_data=VIEW_TICKET.pack(ticket[0])
+            )
+        ])
+    
+    pagination = get_pagination_row(TICKETS_PAGE, tickets[0][0], tickets[-1][0], has_prev, has_next)
+    if pagination:
+        buttons.append(pagination)
+    
+    # Добавляем кнопку "Назад"
+    buttons.append([InlineKeyboardButton(text="↩️ Назад", callback_data="admin_menu")])
+    
+    # Отправляем сообщение со списком активных вопросов
+    await render_panel(
+        callback,
+        "🆘 Активные вопросы:",
+        reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons)
+    )
+
 async def view_open_tickets(callback: CallbackQuery):
     if callback.from_user.id not in ADMIN_IDS:
         await callback.message.answer("🚫 Доступ к админ-панели запрещён!")
@@ -399,56 +440,7 @@ async def view_open_tickets(callback: CallbackQuery):
         # Отвечаем на callback сразу, чтобы избежать ошибки с устаревшим запросом
         await callback.answer()
         
-        await callback.message.delete()
-        tickets = await get_open_tickets()
-        if not tickets:
-            await callback.message.answer(
-                "📭 Нет активных вопросов.",
-                reply_markup=get_admin_menu()
-            )
-        else:
-            # Создаем список кнопок для активных вопросов
-            buttons = []
-            for ticket in tickets:
-                # Пропускаем неактивные вопросы
-                is_active = ticket[5] if len(ticket) > 5 else 0
-                if is_active != 1:
-                    continue
-                
-                # Получаем имя пользователя
-                try:
-                    user = await get_user(ticket[1])
-                    username = f"@{user[1]}" if user and len(user) > 1 and user[1] else f"ID {ticket[1]}"
-                except Exception as e:
-                    logger.error(f"Ошибка получения данных пользователя {ticket[1]}: {e}")
-                    username = f"ID {ticket[1]}"
-                
-                # Проверяем, назначен ли админ на вопрос
-                admin_assigned = "✓" if ticket[3] else "✗"
-                
-                buttons.append([
-                    InlineKeyboardButton(
-                        text=f"🆘 #{ticket[0]} от {username} | Админ: {admin_assigned}",
-                        callback_data=f"view_ticket_{ticket[0]}"
-                    )
-                ])
-            
-            # Если после фильтрации активных вопросов список пуст
-            if not buttons:
-                await callback.message.answer(
-                    "📭 Нет активных вопросов.",
-                    reply_markup=get_admin_menu()
-                )
-                return
-            
-            # Добавляем кнопку "Назад"
-            buttons.append([InlineKeyboardButton(text="↩️ Назад", callback_data="admin_menu")])
-            
-            # Отправляем сообщение со списком активных вопросов
-            await callback.message.answer(
-                "🆘 Активные вопросы:",
-                reply_markup=InlineKeyboardMarkup(inline_keyboard=buttons)
-            )
+        await send_ticket_page(callback)
     except Exception as e:
         logger.error(f"Ошибка в view_open_tickets для админа {callback.from_user.id}: {e}")
         await callback.message.answer("❌ Произошла ошибка при просмотре вопросов.")
@@ -458,17 +450,30 @@ async def view_open_tickets(callback: CallbackQuery):
         except Exception:
             pass
 
-@admin_router.callback_query(F.data.startswith("view_ticket_"))
-async def view_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot):
+@admin_callbacks.route(TICKETS_PAGE)
+async def view_open_tickets_page(callback: CallbackQuery, direction: str, cursor: int):
+    if callback.from_user.id not in ADMIN_IDS:
+        await callback.message.answer("🚫 Доступ к админ-панели запрещён!")
+        await callback.answer()
+        return
+    direction, cursor = page_position(direction, cursor)
+    try:
+        await callback.answer()
+        await send_ticket_page(callback, cursor, direction)
+    except Exception as e:
+        logger.error(f"Ошибка в view_open_tickets_page для админа {callback.from_user.id}: {e}")
+        await callback.message.answer("❌ Произошла ошибка при просмотре вопросов.")
+
+@admin_callbacks.route(VIEW_TICKET)
+async def view_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot, ticket_id: int):
     if callback.from_user.id not in ADMIN_IDS:
         await callback.message.answer("🚫 Доступ к админ-панели запрещён!")
         return
     try:
-        await callback.message.delete()
-        ticket_id = int(callback.data.split("_")[2])
         ticket = await get_ticket_by_id(ticket_id)
         if not ticket:
-            await callback.message.answer(
+            await render_panel(
+                callback,
                 "📭 Вопрос не найден.",
                 reply_markup=get_admin_menu()
             )
@@ -504,7 +509,7 @@ async def view_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot):
             ])
         
         # Отправляем информацию о вопросе
-        message = await callback.message.answer(ticket_info, reply_markup=keyboard)
+        message = await render_panel(callback, ticket_info, reply_markup=keyboard)
         
         # Получаем сообщения в вопросе
         messages = await get_ticket_messages(ticket_id)
@@ -520,57 +525,33 @@ async def view_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot):
             history_header = await callback.message.answer("📝 История сообщений:")
             media_message_ids.append(history_header.message_id)
             
-            # Отправляем первые 10 сообщений вопроса
-            count = 0
-            for msg in messages:
-                if count >= 10:  # Ограничиваем количество показываемых сообщений
-                    break
+            # Первые 10 сообщений вопроса: медиа подряд уходят альбомами
+            items = []
+            for msg in messages[:10]:
+                # Подготавливаем данные сообщения
+                msg_type = msg[3] if len(msg) > 3 else "text"
+                msg_content = msg[4] if len(msg) > 4 else ""
+                msg_time = format_datetime(msg[5]) if len(msg) > 5 else "неизвестно"
+                msg_sender_type = msg[6] if len(msg) > 6 else "user"
+                msg_username = msg[7] if len(msg) > 7 else "неизвестно"
                 
-                try:
-                    # Подготавливаем данные сообщения
-                    msg_id = msg[0] 
-                    msg_type = msg[3] if len(msg) > 3 else "text"
-                    msg_content = msg[4] if len(msg) > 4 else ""
-                    msg_time = format_datetime(msg[5]) if len(msg) > 5 else "неизвестно"
-                    msg_sender_type = msg[6] if len(msg) > 6 else "user"
-                    msg_username = msg[7] if len(msg) > 7 else "неизвестно"
-                    
-                    # Формируем заголовок сообщения
-                    sender_prefix = "👤" if msg_sender_type == "user" else "👨‍💼"
-                    sender_name = f"{sender_prefix} {msg_username}"
-                    
-                    # Отправляем сообщение в зависимости от типа
-                    if msg_type == "text":
-                        msg_text = f"{sender_name} ({msg_time}):\n{msg_content}"
-                        media_msg = await callback.message.answer(msg_text)
-                        media_message_ids.append(media_msg.message_id)
-                    elif msg_type == "sticker":
-                        # Отправляем стикер
-                        sticker_msg = await bot.send_sticker(callback.from_user.id, msg_content)
-                        media_message_ids.append(sticker_msg.message_id)
-                        
-                        # Отправляем информацию о стикере
-                        info_msg = await callback.message.answer(f"{sender_name} отправил стикер ({msg_time})")
-                        media_message_ids.append(info_msg.message_id)
-                    else:
-                        # Для медиафайлов - добавляем подпись с информацией
-                        caption = f"{sender_name} ({msg_time})"
-                        
-                        if msg_type == "photo":
-                            media_msg = await bot.send_photo(callback.from_user.id, msg_content, caption=caption)
-                        elif msg_type == "video":
-                            media_msg = await bot.send_video(callback.from_user.id, msg_content, caption=caption)
-                        elif msg_type == "document":
-                            media_msg = await bot.send_document(callback.from_user.id, msg_content, caption=caption)
-                        else:
-                            # Неизвестный тип - отправляем только информацию
-                            media_msg = await callback.message.answer(f"{sender_name} отправил медиафайл ({msg_time})")
-                        
-                        media_message_ids.append(media_msg.message_id)
-                except Exception as e:
-                    logger.error(f"Ошибка при отображении сообщения {msg[0] if len(msg) > 0 else 'unknown'}: {e}")
+                # Формируем заголовок сообщения
+                sender_prefix = "👤" if msg_sender_type == "user" else "👨‍💼"
+                sender_name = f"{sender_prefix} {msg_username}"
                 
-                count += 1
+                if msg_type == "text":
+                    items.append(("text", f"{sender_name} ({msg_time}):\n{msg_content}", None))
+                elif msg_type == "sticker":
+                    # Стикер и информация о нем
+                    items.append(("sticker", msg_content, None))
+                    items.append(("text", f"{sender_name} отправил стикер ({msg_time})", None))
+                elif msg_type in ("photo", "video", "document"):
+                    # Для медиафайлов - добавляем подпись с информацией
+                    items.append((msg_type, msg_content, f"{sender_name} ({msg_time})"))
+                else:
+                    # Неизвестный тип - отправляем только информацию
+                    items.append(("text", f"{sender_name} отправил медиафайл ({msg_time})", None))
+            media_message_ids.extend(await send_media_batch(bot, callback.from_user.id, items))
                 
             # Если сообщений больше 10, добавляем информацию об этом
             if len(messages) > 10:
@@ -587,50 +568,20 @@ async def view_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot):
 
 @admin_router.callback_query()
 async def handle_admin_callbacks(callback: CallbackQuery, state: FSMContext, bot: Bot):
-    """Обрабатывает все админские callback запросы, которые не обработаны другими хендлерами"""
+    """Находит обработчик админского callback в таблице admin_callbacks"""
     try:
-        # Обработка callback для вопросов поддержки (чат)
-        if callback.data.startswith("admin_chat_ticket_"):
-            ticket_id = int(callback.data.split("_")[-1])
-            logger.info(f"Перенаправляю запрос admin_chat_ticket_{ticket_id} на admin_chat_ticket")
-            return await admin_chat_ticket(callback, state, bot)
-        
-        # Обработка callback для закрытия вопросов поддержки
-        elif callback.data.startswith("admin_close_ticket_"):
-            ticket_id = int(callback.data.split("_")[-1])
-            logger.info(f"Перенаправляю запрос admin_close_ticket_{ticket_id} на admin_close_ticket")
-            return await admin_close_ticket(callback, state, bot)
-        
-        # Обычные правила обработки для других callback
-        elif callback.data == "back_to_main":
-            await callback.message.delete()
-            await callback.message.answer(
-                "⚙️ Админ-панель: выберите действие:",
-                reply_markup=get_admin_menu()
-            )
-        elif callback.data == "view_tickets":
-            # Обработка просмотра списка тикетов
-            logger.info(f"Админ {callback.from_user.id} переходит к списку вопросов")
-            await view_open_tickets(callback)
-        elif callback.data == "view_applications":
-            # Обработка просмотра списка заявок
-            logger.info(f"Админ {callback.from_user.id} переходит к списку заявок")
-            await view_applications_admin(callback)
-        else:
-            # Стандартная обработка неизвестных callback
-            logger.warning(f"Неизвестный callback: {callback.data} от админа {callback.from_user.id}")
-            await callback.answer("Эта функция пока не реализована. Выберите другое действие.")
-            await callback.message.answer("Выберите действие:", reply_markup=get_admin_menu())
-    
+        if await admin_callbacks.dispatch(callback, state=state, bot=bot):
+            return
+        logger.warning(f"Неизвестный callback: {callback.data} от админа {callback.from_user.id}")
+        await callback.answer("Эта функция пока не реализована. Выберите другое действие.")
+        await callback.message.answer("Выберите действие:", reply_markup=get_admin_menu())
     except Exception as e:
         logger.error(f"Ошибка при обработке callback {callback.data}: {e}")
         await callback.message.answer(
             "❌ Произошла ошибка при обработке запроса.",
             reply_markup=get_admin_menu()
         )
-    
-    # Всегда отвечаем на callback
-    await callback.answer()
+        await callback.answer()
 
 @admin_router.message()
 async def all_admin_messages(message: Message, state: FSMContext, bot: Bot):
@@ -788,20 +739,13 @@ async def admin_start(message: Message, state: FSMContext):
         logger.error(f"Ошибка в admin_start для админа {message.from_user.id}: {e}")
         await message.answer("❌ Произошла ошибка. Попробуйте снова позже.")
 
-@admin_router.callback_query(F.data.startswith("admin_chat_ticket_"))
-async def admin_chat_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot):
+# chat_ticket_X остается в уведомлениях о вопросах, отправленных раньше
+@admin_callbacks.route(ADMIN_CHAT_TICKET, CHAT_TICKET)
+async def admin_chat_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot, ticket_id: int):
     """Обработчик для входа админа в чат с пользователем"""
     try:
-        # Извлекаем ID вопроса
-        ticket_id = int(callback.data.split("_")[-1])
         logger.info(f"Админ {callback.from_user.id} входит в чат по вопросу #{ticket_id}")
         
-        # Удаляем сообщение с кнопкой
-        try:
-            await callback.message.delete()
-        except Exception as e:
-            logger.warning(f"Не удалось удалить сообщение: {e}")
-            
         # Очищаем предыдущие данные состояния
         data = await state.get_data()
         message_id = data.get("message_id")
@@ -809,7 +753,7 @@ async def admin_chat_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot
         
         # Удаляем предыдущие сообщения если они есть
         if message_id or media_message_ids:
-            await delete_messages(bot, callback.from_user.id, [message_id] + media_message_ids if message_id else media_message_ids)
+            await delete_messages(bot, callback.from_user.id, [message_id] + media_message_ids if message_id else media_message_ids, keep=callback.message.message_id)
         
         # Очищаем текущее состояние, чтобы избежать конфликтов
         await state.clear()
@@ -817,7 +761,8 @@ async def admin_chat_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot
         # Получаем информацию о вопросе
         ticket = await get_ticket_by_id(ticket_id)
         if not ticket:
-            await callback.message.answer(
+            await render_panel(
+                callback,
                 "❌ Вопрос не найден.",
                 reply_markup=get_admin_menu()
             )
@@ -827,7 +772,8 @@ async def admin_chat_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot
         # Проверяем активность вопроса
         is_active = ticket[5] if len(ticket) > 5 else 0
         if is_active == 0:
-            await callback.message.answer(
+            await render_panel(
+                callback,
                 "❌ Вопрос закрыт и недоступен для общения.",
                 reply_markup=get_admin_menu()
             )
@@ -843,7 +789,8 @@ async def admin_chat_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot
         username = f"@{user[1]}" if user and user[1] else f"ID {user_id}"
         
         # Отправляем сообщение о входе в чат
-        message = await callback.message.answer(
+        message = await render_panel(
+            callback,
             f"💬 Вы в чате с {username} (вопрос #{ticket_id}).\n"
             f"Отправляйте сообщения для ответа пользователю:",
             reply_markup=get_admin_ticket_keyboard(ticket_id, in_chat=True)
@@ -872,30 +819,24 @@ async def admin_chat_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot
             history_header = await callback.message.answer("📝 Последние сообщения:")
             media_message_ids.append(history_header.message_id)
             
-            # Отображаем сообщения
+            # Отображаем сообщения, медиа подряд уходят альбомами
+            items = []
             for msg in last_messages:
-                try:
-                    msg_type = msg[3] if len(msg) > 3 else "text"
-                    msg_content = msg[4] if len(msg) > 4 else ""
-                    msg_time = format_datetime(msg[5]) if len(msg) > 5 else "неизвестно"
-                    msg_sender_type = msg[6] if len(msg) > 6 else "user"
-                    msg_username = msg[7] if len(msg) > 7 else "неизвестно"
-                    
-                    sender_prefix = "👤" if msg_sender_type == "user" else "👨‍💼"
-                    sender_name = f"{sender_prefix} {msg_username}"
-                    
-                    if msg_type == "text":
-                        msg_text = f"{sender_name} ({msg_time}):\n{msg_content}"
-                        history_msg = await callback.message.answer(msg_text)
-                        media_message_ids.append(history_msg.message_id)
-                    elif msg_type in ["photo", "video", "document", "sticker"]:
-                        # Отправляем медиафайл с подписью
-                        caption = f"{sender_name} ({msg_time})"
-                        media_msg = await send_media_message(bot, callback.from_user.id, msg_type, msg_content, caption)
-                        if media_msg:
-                            media_message_ids.append(media_msg.message_id)
-                except Exception as e:
-                    logger.error(f"Ошибка при отображении истории сообщений: {e}")
+                msg_type = msg[3] if len(msg) > 3 else "text"
+                msg_content = msg[4] if len(msg) > 4 else ""
+                msg_time = format_datetime(msg[5]) if len(msg) > 5 else "неизвестно"
+                msg_sender_type = msg[6] if len(msg) > 6 else "user"
+                msg_username = msg[7] if len(msg) > 7 else "неизвестно"
+                
+                sender_prefix = "👤" if msg_sender_type == "user" else "👨‍💼"
+                sender_name = f"{sender_prefix} {msg_username}"
+                
+                if msg_type == "text":
+                    items.append(("text", f"{sender_name} ({msg_time}):\n{msg_content}", None))
+                elif msg_type in ["photo", "video", "document", "sticker"]:
+                    # Медиафайл с подписью
+                    items.append((msg_type, msg_content, f"{sender_name} ({msg_time})"))
+            media_message_ids.extend(await send_media_batch(bot, callback.from_user.id, items))
             
             # Разделитель между историей и новыми сообщениями
             separator = await callback.message.answer("➖➖➖➖➖➖➖➖➖➖➖➖")
@@ -921,24 +862,17 @@ async def admin_chat_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot
         await callback.message.answer("❌ Произошла ошибка при входе в чат поддержки.")
         await callback.answer()
 
-@admin_router.callback_query(F.data.startswith("admin_close_ticket_"))
-async def admin_close_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot):
+@admin_callbacks.route(ADMIN_CLOSE_TICKET)
+async def admin_close_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot, ticket_id: int):
     """Обработчик для закрытия тикета администратором"""
     try:
-        # Извлекаем ID вопроса
-        ticket_id = int(callback.data.split("_")[-1])
         logger.info(f"Админ {callback.from_user.id} закрывает вопрос #{ticket_id}")
         
-        # Удаляем сообщение с кнопкой
-        try:
-            await callback.message.delete()
-        except Exception as e:
-            logger.warning(f"Не удалось удалить сообщение: {e}")
-        
         # Получаем информацию о вопросе
         ticket = await get_ticket_by_id(ticket_id)
         if not ticket:
-            await callback.message.answer(
+            await render_panel(
+                callback,
                 "❌ Вопрос не найден.",
                 reply_markup=get_admin_menu()
             )
@@ -948,7 +882,8 @@ async def admin_close_ticket(callback: CallbackQuery, state: FSMContext, bot: Bo
         # Проверяем, активен ли вопрос
         ticket_status = ticket[2] if len(ticket) > 2 else STATUS_CLOSED
         if ticket_status == STATUS_CLOSED:
-            await callback.message.answer(
+            await render_panel(
+                callback,
                 "❌ Вопрос уже закрыт.",
                 reply_markup=get_admin_menu()
             )
@@ -963,7 +898,8 @@ async def admin_close_ticket(callback: CallbackQuery, state: FSMContext, bot: Bo
         # Закрываем вопрос
         success = await close_ticket(ticket_id)
         if not success:
-            await callback.message.answer(
+            await render_panel(
+                callback,
                 "❌ Не удалось закрыть вопрос. Попробуйте позже.",
                 reply_markup=get_admin_menu()
             )
@@ -980,7 +916,7 @@ async def admin_close_ticket(callback: CallbackQuery, state: FSMContext, bot: Bo
             media_message_ids = data.get("media_message_ids", [])
             
             if message_id or media_message_ids:
-                await delete_messages(bot, callback.from_user.id, [message_id] + media_message_ids if message_id else media_message_ids)
+                await delete_messages(bot, callback.from_user.id, [message_id] + media_message_ids if message_id else media_message_ids, keep=callback.message.message_id)
         
         # Очищаем состояние админа
         await state.clear()
@@ -996,7 +932,8 @@ async def admin_close_ticket(callback: CallbackQuery, state: FSMContext, bot: Bo
             logger.error(f"Не удалось отправить уведомление пользователю {user_id}: {e}")
         
         # Отправляем подтверждение админу
-        await callback.message.answer(
+        await render_panel(
+            callback,
             f"✅ Вопрос #{ticket_id} от {username} закрыт.",
             reply_markup=get_admin_menu()
         )
@@ -1009,18 +946,12 @@ async def admin_close_ticket(callback: CallbackQuery, state: FSMContext, bot: Bo
         await callback.message.answer("❌ Произошла ошибка при закрытии вопроса.")
         await callback.answer()
 
-@admin_router.callback_query(F.data == "view_tickets")
+@admin_callbacks.route("view_tickets")
 async def back_to_tickets_list(callback: CallbackQuery, state: FSMContext, bot: Bot):
     """Обработчик для возврата к списку вопросов из чата"""
     try:
         logger.info(f"Админ {callback.from_user.id} возвращается к списку вопросов")
         
-        # Удаляем текущее сообщение
-        try:
-            await callback.message.delete()
-        except Exception as e:
-            logger.warning(f"Не удалось удалить сообщение: {e}")
-        
         # Получаем данные из состояния
         data = await state.get_data()
         ticket_id = data.get("ticket_id")
@@ -1029,7 +960,7 @@ async def back_to_tickets_list(callback: CallbackQuery, state: FSMContext, bot:
         
         # Удаляем все сообщения чата
         if message_id or media_message_ids:
-            await delete_messages(bot, callback.from_user.id, [message_id] + media_message_ids if message_id else media_message_ids)
+            await delete_messages(bot, callback.from_user.id, [message_id] + media_message_ids if message_id else media_message_ids, keep=callback.message.message_id)
         
         # Очищаем состояние
         await state.clear()
@@ -1,3 +1,4 @@
+import asyncio
 from aiogram import Router, F, Bot
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.fsm.context import FSMContext
@@ -5,17 +6,21 @@ from aiogram.fsm.state import State, StatesGroup
 from aiogram.filters import CommandStart, Command, StateFilter
 from aiogram.fsm.storage.base import StorageKey
 from config import ADMIN_IDS
-from db import add_user, get_application_by_user_id, add_application, update_application, add_application_media, get_application_media, add_ticket, add_ticket_message, close_ticket, get_ticket_by_id, get_user, get_open_tickets_by_user, delete_application_media, update_application_field, add_application_with_platform, add_skin_media, add_project_media, get_application_media_by_category
-import aiosqlite
+from db import add_user, get_application_by_user_id, get_application_media, add_ticket, add_ticket_message, close_ticket, get_ticket_by_id, get_user, get_open_tickets_by_user, submit_application, save_players_to_file, find_nickname_owner
+from whitelist import validate_nickname
 import logging
-from keyboards import get_main_menu, get_application_menu, get_user_ticket_keyboard, get_user_tickets_menu, get_back_button, get_support_menu, get_application_description_keyboard, get_application_media_keyboard, get_admin_menu, get_accept_policy_keyboard, get_back_button_keyboard
+from keyboards import get_main_menu, get_application_menu, get_user_ticket_keyboard, get_user_tickets_menu, get_back_button, get_support_menu, get_admin_menu, get_accept_policy_keyboard, get_back_button_keyboard, get_platform_choice_keyboard, get_skip_or_back_keyboard, get_media_continue_keyboard, get_application_review_keyboard
 from datetime import datetime
-from .utils import format_datetime, delete_messages, safe_message_delete, extract_id_from_callback, get_state_data, get_message_content_and_type, send_media_message
+from .utils import translate_status, format_datetime, render_panel, delete_messages, extract_id_from_callback, get_state_data, get_message_content_and_type, send_media_message, send_media_batch
 from .constants import *
-from aiogram.utils.media_group import MediaGroupBuilder
+from notifications import notifier, ticket_digest
+from questions import question_catalog
 from .handlers_admin import admin_chat_ticket, view_ticket, admin_start
+from callbacks import CallbackRouter, VIEW_APPLICATION, VIEW_MY_TICKET, ADMIN_CHAT_TICKET, PLATFORM, CONTINUE_FROM
 
 user_router = Router()
+# Все callback-кнопки пользователя разбираются одним обработчиком по этой таблице
+user_callbacks = CallbackRouter("user")
 logger = logging.getLogger(__name__)
 
 # Для команды /start исключаем фильтрацию, чтобы она работала для всех пользователей
@@ -28,19 +33,6 @@ user_router.message.filter(
 )
 user_router.callback_query.filter(~F.from_user.id.in_(ADMIN_IDS))
 
-class ApplicationStates(StatesGroup):
-    waiting_for_name = State()
-    waiting_for_age = State()
-    waiting_for_about = State()
-    waiting_for_plans = State()
-    waiting_for_community = State()
-    waiting_for_platform = State()
-    waiting_for_java_nickname = State()
-    waiting_for_bedrock_nickname = State()
-    waiting_for_skin = State()
-    waiting_for_projects = State()
-    waiting_for_referral = State()
-
 class TicketStates(StatesGroup):
     waiting_for_message = State()
     chatting = State()
@@ -61,6 +53,256 @@ class ApplicationFormStates(StatesGroup):
     waiting_for_referral = State()  # Откуда узнали о сервере
     review_application = State()  # Просмотр анкеты перед отправкой
 
+# Ограничения ответов анкеты
+MAX_NAME_LENGTH = 64
+MAX_ANSWER_LENGTH = 1000
+MIN_AGE = 7
+MAX_AGE = 99
+# Длина ответа в сводке перед отправкой, чтобы сводка уместилась в одно сообщение
+REVIEW_ANSWER_LENGTH = 300
+# Ответы одного пользователя (например, альбом вложений) обрабатываются по очереди
+FORM_LOCK_STRIPES = 64
+
+PLATFORM_TITLES = {"java": "Java", "bedrock": "Bedrock", "both": "Обе платформы"}
+MEDIA_TYPE_TITLES = {"photo": "фото", "video": "видео", "document": "файл"}
+
+async def check_nickname(nickname: str, platform: str, user_id: int):
+    """
+    Проверяет формат никнейма и что его не занял другой игрок.
+    Возвращает текст ошибки или None, если никнейм подходит
+    """
+    if not validate_nickname(nickname, platform):
+        return (
+            "❌ Никнейм должен содержать от 3 до 16 символов: латинские буквы, цифры и _"
+            + (" (в Bedrock допустимы пробелы внутри)" if platform == "bedrock" else "")
+            + ". Попробуйте снова:"
+        )
+    try:
+        owner = await find_nickname_owner(nickname, platform, user_id)
+    except Exception as e:
+        # Проверка не должна блокировать анкету: конфликт всплывет при рассмотрении
+        logger.error(f"Ошибка проверки никнейма {nickname} ({platform}) для пользователя {user_id}: {e}")
+        return None
+    if owner is not None:
+        return "❌ Этот никнейм уже занят другим игроком. Введите другой никнейм:"
+    return None
+
+async def check_name(name: str, user_id: int):
+    if len(name) > MAX_NAME_LENGTH:
+        return f"❌ Слишком длинное имя: не больше {MAX_NAME_LENGTH} символов. Попробуйте снова:"
+    return None
+
+async def check_age(age: str, user_id: int):
+    if not age.isdigit() or not MIN_AGE <= int(age) <= MAX_AGE:
+        return "❌ Укажите возраст числом, например 16:"
+    return None
+
+async def check_answer_length(answer: str, user_id: int):
+    if len(answer) > MAX_ANSWER_LENGTH:
+        return f"❌ Ответ слишком длинный: не больше {MAX_ANSWER_LENGTH} символов. Попробуйте короче:"
+    return None
+
+async def check_java_nickname(nickname: str, user_id: int):
+    return await check_nickname(nickname, "java", user_id)
+
+async def check_bedrock_nickname(nickname: str, user_id: int):
+    return await check_nickname(nickname, "bedrock", user_id)
+
+def next_after_platform(data: dict) -> str:
+    return "java_nickname" if data.get("platform") in ("java", "both") else "bedrock_nickname"
+
+def next_after_java_nickname(data: dict) -> str:
+    return "bedrock_nickname" if data.get("platform") == "both" else "skin"
+
+class FormStep:
+    """
+    Шаг анкеты: вопрос из questions.md, способ ответа и поле заявки.
+
+    kind — "text" (ответ сообщением), "choice" (выбор платформы кнопками)
+    или "media" (до max_files вложений категории media_category).
+    validator получает очищенный ответ и id пользователя и возвращает текст
+    ошибки или None. next_step по данным анкеты выбирает следующий шаг,
+    по умолчанию — следующий в таблице.
+    """
+
+    def __init__(self, key: str, state: State, label: str, default_question: str, prefix: str = "",
+                 kind: str = "text", column: str = None, validator=None, optional: bool = False,
+                 media_category: str = None, media_types=(), max_files: int = 0, next_step=None):
+        self.key = key
+        self.state = state
+        self.label = label
+        self.default_question = default_question
+        self.prefix = prefix
+        self.kind = kind
+        self.column = column
+        self.validator = validator
+        self.optional = optional
+        self.media_category = media_category
+        self.media_types = media_types
+        self.max_files = max_files
+        self.next_step = next_step
+
+    @property
+    def data_key(self) -> str:
+        """Ключ ответа в данных FSM"""
+        return f"{self.key}_media" if self.kind == "media" else self.key
+
+# Шаги анкеты в порядке вопросов questions.md. Ответы копятся в данных FSM
+# и сохраняются в заявку одной транзакцией при отправке
+FORM_STEPS = {step.key: step for step in (
+    FormStep("name", ApplicationFormStates.waiting_for_name, "👤 Имя",
+             "Как к вам обращаться? (Имя или ник)",
+             column="player_name", validator=check_name),
+    FormStep("age", ApplicationFormStates.waiting_for_age, "🎂 Возраст",
+             "Сколько вам лет?",
+             column="player_age", validator=check_age),
+    FormStep("about", ApplicationFormStates.waiting_for_about, "📝 О себе",
+             "Расскажите немного о себе: (Опыт игры, любимые аспекты Minecraft, участие в жизни сервера, идеи и проекты)",
+             column="player_about", validator=check_answer_length),
+    FormStep("plans", ApplicationFormStates.waiting_for_plans, "🎮 Планы",
+             "Как вы планируете проводить время на HorniMine?\n(Игровой стиль, предпочтения: строительство, приключения, торговля и т.д.)",
+             prefix="🎮 ", column="player_plans", validator=check_answer_length),
+    FormStep("community", ApplicationFormStates.waiting_for_community, "💙 Сообщество",
+             "Что для вас важно в дружелюбном сообществе?\n(Честность, уважение, поддержка, свобода самовыражения и т.п.)",
+             prefix="💙 ", column="player_community", validator=check_answer_length),
+    FormStep("platform", ApplicationFormStates.waiting_for_platform, "🕹 Платформа",
+             "На какой платформе вы играете?",
+             prefix="🎮 ", kind="choice", column="player_platform", next_step=next_after_platform),
+    FormStep("java_nickname", ApplicationFormStates.waiting_for_java_nickname, "⚡ Ник Java",
+             "Введите свой никнейм Java\n(Без пробелов и лишних символов):",
+             prefix="⚡ ", column="player_nickname_java", validator=check_java_nickname,
+             next_step=next_after_java_nickname),
+    FormStep("bedrock_nickname", ApplicationFormStates.waiting_for_bedrock_nickname, "🟢 Ник Bedrock",
+             "Введите свой никнейм Bedrock\n(Без пробелов и лишних символов):",
+             prefix="🟢 ", column="player_nickname_bedrock", validator=check_bedrock_nickname),
+    FormStep("skin", ApplicationFormStates.waiting_for_skin, "🖼 Скин",
+             "📎 Прикрепите изображение своего скина:\n(Скриншот или развёртка. До 2 файлов)",
+             kind="media", media_category="skin",
+             media_types=("photo", "document"), max_files=2),
+    FormStep("projects", ApplicationFormStates.waiting_for_projects, "🏗 Проекты",
+             "📎 Прикрепите изображения или видео своих проектов, игрового опыта:\n(До 5 файлов. Необязательно)",
+             kind="media", optional=True, media_category="project",
+             media_types=("photo", "video", "document"), max_files=5),
+    FormStep("referral", ApplicationFormStates.waiting_for_referral, "📣 Откуда узнали",
+             "Как вы узнали о сервере?\n(Необязательно — друг, TikTok, Telegram, поиск и т.д.)",
+             column="player_referral", validator=check_answer_length, optional=True),
+)}
+FORM_ORDER = list(FORM_STEPS)
+# Вопросы в questions.md пронумерованы в порядке шагов анкеты
+question_catalog.set_steps(FORM_ORDER)
+# Служебные шаги вокруг вопросов: политика перед анкетой и сводка перед отправкой
+POLICY_STEP = "policy"
+REVIEW_STEP = "review"
+FORM_STATES = {
+    POLICY_STEP: ApplicationFormStates.waiting_for_start,
+    **{key: step.state for key, step in FORM_STEPS.items()},
+    REVIEW_STEP: ApplicationFormStates.review_application,
+}
+FORM_STEP_BY_STATE = {state.state: key for key, state in FORM_STATES.items()}
+FORM_INPUT_STATES = [step.state for step in FORM_STEPS.values()]
+FORM_MEDIA_STATES = [step.state for step in FORM_STEPS.values() if step.kind == "media"]
+FORM_OPTIONAL_STATES = [step.state for step in FORM_STEPS.values() if step.optional]
+
+_form_locks = [asyncio.Lock() for _ in range(FORM_LOCK_STRIPES)]
+
+def form_lock(user_id: int) -> asyncio.Lock:
+    return _form_locks[user_id % FORM_LOCK_STRIPES]
+
+def next_form_step(key: str, data: dict) -> str:
+    """Следующий шаг анкеты после key с учетом уже данных ответов"""
+    if key == POLICY_STEP:
+        return FORM_ORDER[0]
+    step = FORM_STEPS[key]
+    if step.next_step:
+        return step.next_step(data)
+    index = FORM_ORDER.index(key) + 1
+    return FORM_ORDER[index] if index < len(FORM_ORDER) else REVIEW_STEP
+
+def form_path(data: dict):
+    """Шаги, которые проходит анкета с текущими ответами, например без ника Java для Bedrock"""
+    path = []
+    key = next_form_step(POLICY_STEP, data)
+    while key != REVIEW_STEP:
+        path.append(key)
+        key = next_form_step(key, data)
+    return path
+
+def collect_application_form(data: dict):
+    """Собирает поля анкеты и медиа из данных состояния для submit_application"""
+    form = {}
+    media = []
+    for key in form_path(data):
+        step = FORM_STEPS[key]
+        value = data.get(step.data_key)
+        if not value:
+            continue
+        if step.kind == "media":
+            media.extend((item["file_id"], item["media_type"], step.media_category) for item in value)
+        else:
+            form[step.column] = value
+    return form, media
+
+def render_form_review(data: dict) -> str:
+    lines = ["📋 Проверьте анкету перед отправкой:", ""]
+    for key in form_path(data):
+        step = FORM_STEPS[key]
+        value = data.get(step.data_key)
+        if step.kind == "media":
+            value = f"файлов: {len(value or [])}"
+        elif step.kind == "choice":
+            value = PLATFORM_TITLES.get(value, value)
+        value = value or "—"
+        if len(value) > REVIEW_ANSWER_LENGTH:
+            value = value[:REVIEW_ANSWER_LENGTH - 1] + "…"
+        lines.append(f"{step.label}: {value}")
+    return "\n".join(lines)
+
+def render_form_step(key: str, data: dict):
+    """Текст и клавиатура шага анкеты"""
+    if key == POLICY_STEP:
+        return question_catalog.policy(), get_accept_policy_keyboard()
+    if key == REVIEW_STEP:
+        return render_form_review(data), get_application_review_keyboard()
+    step = FORM_STEPS[key]
+    text = step.prefix + question_catalog.question(key, step.default_question)
+    if step.kind == "media":
+        count = len(data.get(step.data_key) or [])
+        if count:
+            text += f"\n\n✅ Прикреплено файлов: {count}/{step.max_files}"
+        return text, get_media_continue_keyboard(key, count, step.max_files)
+    if step.kind == "choice":
+        return text, get_platform_choice_keyboard()
+    if step.optional:
+        return text, get_skip_or_back_keyboard()
+    return text, get_back_button_keyboard()
+
+async def show_form_step(bot: Bot, chat_id: int, state: FSMContext, key: str, callback: CallbackQuery = None):
+    """
+    Показывает шаг анкеты: по нажатию кнопки — на месте панели, после ответа
+    сообщением — новым вопросом. Сообщения прошлого шага удаляются
+    """
+    data = await state.get_data()
+    text, keyboard = render_form_step(key, data)
+    if callback:
+        message = await render_panel(callback, text, reply_markup=keyboard)
+    else:
+        message = await bot.send_message(chat_id, text, reply_markup=keyboard)
+    await delete_messages(bot, chat_id, [data.get("message_id")] + data.get("media_message_ids", []), keep=message.message_id)
+    await state.set_state(FORM_STATES[key])
+    await state.update_data(message_id=message.message_id, media_message_ids=[])
+
+async def advance_form(bot: Bot, chat_id: int, state: FSMContext, key: str, callback: CallbackQuery = None):
+    """Переходит от шага key к следующему и запоминает путь для кнопки «Назад»"""
+    data = await state.get_data()
+    await state.update_data(form_history=data.get("form_history", []) + [key])
+    await show_form_step(bot, chat_id, state, next_form_step(key, data), callback)
+
+async def reject_form_answer(message: Message, state: FSMContext, error: str):
+    """Отвечает ошибкой; ответ и ошибка удалятся вместе с шагом"""
+    reply = await message.answer(error)
+    data = await state.get_data()
+    await state.update_data(media_message_ids=data.get("media_message_ids", []) + [message.message_id, reply.message_id])
+
 @user_router.message(CommandStart())
 async def start_command(message: Message, state: FSMContext):
     try:
@@ -75,464 +317,232 @@ async def start_command(message: Message, state: FSMContext):
         logger.error(f"Ошибка в start_command для пользователя {message.from_user.id}: {e}")
         await message.answer("❌ Произошла ошибка. Попробуйте снова позже.")
 
-@user_router.callback_query(F.data == "create_application")
+@user_callbacks.route("create_application")
 async def create_application(callback: CallbackQuery, state: FSMContext, bot: Bot):
-    try:
-        await callback.message.delete()
-    except Exception as e:
-        logger.warning(f"Не удалось удалить сообщение: {e}")
     try:
         application = await get_application_by_user_id(callback.from_user.id)
         if application and application[2] in ["pending", "approved", "rejected"]:
-            await callback.message.answer(
+            await render_panel(
+                callback,
                 f"📝 У вас уже есть заявка (статус: {translate_status(application[2])})!",
                 reply_markup=await get_main_menu(callback.from_user.id in ADMIN_IDS, callback.from_user.id)
             )
         else:
-            # Начинаем процесс поэтапной анкеты
-            await state.set_state(ApplicationFormStates.waiting_for_start)
-            
-            # Загружаем политику конфиденциальности из файла questions.md
-            try:
-                with open('questions.md', 'r', encoding='utf-8') as file:
-                    policy_text = "\n".join(file.read().split('---')[0].strip().split('\n'))
-            except Exception as e:
-                logger.error(f"Ошибка при чтении файла с вопросами: {e}")
-                policy_text = "Перед началом заполнения заявки, пожалуйста, ознакомьтесь с политикой конфиденциальности и правилами сервера."
-
-            message = await callback.message.answer(
-                policy_text,
-                reply_markup=get_accept_policy_keyboard()
-            )
-            await state.update_data(last_message_id=message.message_id)
+            # Начинаем анкету заново, сохранив сообщения прошлой панели для удаления
+            data = await state.get_data()
+            await state.set_data({
+                "message_id": data.get("message_id"),
+                "media_message_ids": data.get("media_message_ids", []),
+                "form_history": []
+            })
+            await show_form_step(bot, callback.from_user.id, state, POLICY_STEP, callback)
     except Exception as e:
         logger.error(f"Ошибка в create_application для пользователя {callback.from_user.id}: {e}")
         await callback.message.answer("❌ Произошла ошибка. Попробуйте снова.")
     await callback.answer()
 
-@user_router.callback_query(F.data == "accept_policy", StateFilter(ApplicationFormStates.waiting_for_start))
+@user_callbacks.route("accept_policy", states=[ApplicationFormStates.waiting_for_start])
 async def process_policy_acceptance(callback: CallbackQuery, state: FSMContext, bot: Bot):
     try:
-        # Удаляем предыдущие сообщения
-        data = await state.get_data()
-        if last_message_id := data.get('last_message_id'):
-            await delete_messages(bot, callback.from_user.id, [last_message_id])
-        await callback.message.delete()
-        
-        # Добавляем нового пользователя в базу и создаем заявку
         await add_user(callback.from_user.id, callback.from_user.username or str(callback.from_user.id))
-        
-        # Переходим к следующему шагу - имя или ник
-        await state.set_state(ApplicationFormStates.waiting_for_name)
-        
-        # Загружаем вопрос из файла questions.md
-        question = "Как к вам обращаться? (Имя или ник)"
-        try:
-            with open('questions.md', 'r', encoding='utf-8') as file:
-                content = file.read().split('---')[1].strip()
-                for line in content.split('\n'):
-                    if "Как к вам обращаться?" in line:
-                        question = line.strip()
-                        break
-        except Exception as e:
-            logger.error(f"Ошибка при чтении вопроса: {e}")
-        
-        message = await callback.message.answer(
-            question,
-            reply_markup=get_back_button_keyboard()
-        )
-        await state.update_data(last_message_id=message.message_id)
+        await advance_form(bot, callback.from_user.id, state, POLICY_STEP, callback)
     except Exception as e:
         logger.error(f"Ошибка в process_policy_acceptance для пользователя {callback.from_user.id}: {e}")
         await callback.message.answer("❌ Произошла ошибка. Пожалуйста, попробуйте позже.")
     await callback.answer()
 
-@user_router.message(StateFilter(ApplicationFormStates.waiting_for_name), F.text)
-async def process_name(message: Message, state: FSMContext, bot: Bot):
-    try:
-        # Удаляем предыдущие сообщения
-        data = await state.get_data()
-        if last_message_id := data.get('last_message_id'):
-            await delete_messages(bot, message.from_user.id, [last_message_id])
-        
-        # Сохраняем имя
-        player_name = message.text.strip()
-        
-        # Проверяем, есть ли у пользователя активная заявка
-        application = await get_application_by_user_id(message.from_user.id)
-        if not application:
-            # Создаем новую заявку
-            await add_application(message.from_user.id)
-            application = await get_application_by_user_id(message.from_user.id)
-            
-        # Сохраняем имя в базе данных
-        if application:
-            await update_application_field(application[0], "player_name", player_name)
-        
-        # Переходим к следующему шагу - возраст
-        await state.set_state(ApplicationFormStates.waiting_for_age)
-        
-        # Загружаем вопрос из файла questions.md
-        question = "Сколько вам лет?"
-        try:
-            with open('questions.md', 'r', encoding='utf-8') as file:
-                content = file.read().split('---')[1].strip()
-                lines = content.split('\n')
-                for i, line in enumerate(lines):
-                    if "Сколько вам лет?" in line:
-                        question = line.strip()
-                        break
-        except Exception as e:
-            logger.error(f"Ошибка при чтении вопроса: {e}")
-        
-        message = await message.answer(
-            question,
-            reply_markup=get_back_button_keyboard()
-        )
-        await state.update_data(last_message_id=message.message_id, application_id=application[0])
-        
-        # Удаляем сообщение пользователя для чистоты чата
-        await safe_message_delete(message)
-    except Exception as e:
-        logger.error(f"Ошибка в process_name для пользователя {message.from_user.id}: {e}")
+@user_router.message(StateFilter(*FORM_INPUT_STATES))
+async def process_form_answer(message: Message, state: FSMContext, bot: Bot):
+    """Принимает ответ на текущий шаг анкеты: текст или вложение"""
+    try:
+        async with form_lock(message.from_user.id):
+            step = FORM_STEPS[FORM_STEP_BY_STATE[await state.get_state()]]
+            if step.kind == "media":
+                await process_form_media(message, state, bot, step)
+                return
+            answer = (message.text or "").strip()
+            if step.kind == "choice":
+                error = "❌ Выберите вариант кнопкой ниже."
+            elif message.text is None:
+                error = "❌ Отправьте ответ текстом."
+            elif not answer:
+                error = "❌ Ответ не может быть пустым."
+            else:
+                error = await step.validator(answer, message.from_user.id) if step.validator else None
+            if error:
+                await reject_form_answer(message, state, error)
+                return
+            data = await state.get_data()
+            await state.update_data({
+                step.data_key: answer,
+                "media_message_ids": data.get("media_message_ids", []) + [message.message_id]
+            })
+            await advance_form(bot, message.chat.id, state, step.key)
+    except Exception as e:
+        logger.error(f"Ошибка в process_form_answer для пользователя {message.from_user.id}: {e}")
         await message.answer("❌ Произошла ошибка. Пожалуйста, попробуйте позже.")
 
-@user_router.message(StateFilter(ApplicationFormStates.waiting_for_age), F.text)
-async def process_age(message: Message, state: FSMContext, bot: Bot):
-    try:
-        # Удаляем предыдущие сообщения
-        data = await state.get_data()
-        if last_message_id := data.get('last_message_id'):
-            await delete_messages(bot, message.from_user.id, [last_message_id])
-        
-        # Сохраняем возраст
-        player_age = message.text.strip()
-        application_id = data.get('application_id')
-        
-        # Сохраняем возраст в базе данных
-        await update_application_field(application_id, "player_age", player_age)
-        
-        # Переходим к следующему шагу - о себе
-        await state.set_state(ApplicationFormStates.waiting_for_about)
-        
-        # Загружаем вопрос из файла questions.md
-        question = "Расскажите немного о себе: (Опыт игры, любимые аспекты Minecraft, участие в жизни сервера, идеи и проекты)"
-        try:
-            with open('questions.md', 'r', encoding='utf-8') as file:
-                content = file.read().split('---')[1].strip()
-                lines = content.split('\n')
-                for i, line in enumerate(lines):
-                    if "Расскажите немного о себе:" in line:
-                        question = line.strip()
-                        if i+1 < len(lines) and lines[i+1].strip():
-                            question += " " + lines[i+1].strip()
-                        break
-        except Exception as e:
-            logger.error(f"Ошибка при чтении вопроса: {e}")
-        
-        message = await message.answer(
-            question,
-            reply_markup=get_back_button_keyboard()
+async def process_form_media(message: Message, state: FSMContext, bot: Bot, step: FormStep):
+    if message.photo:
+        file_id, media_type = message.photo[-1].file_id, "photo"
+    elif message.video:
+        file_id, media_type = message.video.file_id, "video"
+    elif message.document:
+        file_id, media_type = message.document.file_id, "document"
+    else:
+        file_id, media_type = None, None
+    if media_type not in step.media_types:
+        await reject_form_answer(
+            message, state,
+            f"❌ Прикрепите {' или '.join(MEDIA_TYPE_TITLES[item] for item in step.media_types)}."
         )
-        await state.update_data(last_message_id=message.message_id)
-        
-        # Удаляем сообщение пользователя для чистоты чата
-        await safe_message_delete(message)
-    except Exception as e:
-        logger.error(f"Ошибка в process_age для пользователя {message.from_user.id}: {e}")
-        await message.answer("❌ Произошла ошибка. Пожалуйста, попробуйте позже.")
-
-@user_router.callback_query(F.data == "back_to_previous_step")
-async def back_to_previous_step(callback: CallbackQuery, state: FSMContext, bot: Bot):
-    try:
-        current_state = await state.get_state()
-        await callback.message.delete()
-        
-        # Словарь переходов между состояниями
-        state_transitions = {
-            ApplicationFormStates.waiting_for_name: ApplicationFormStates.waiting_for_start,
-            ApplicationFormStates.waiting_for_age: ApplicationFormStates.waiting_for_name,
-            ApplicationFormStates.waiting_for_about: ApplicationFormStates.waiting_for_age,
-            ApplicationFormStates.waiting_for_plans: ApplicationFormStates.waiting_for_about,
-            ApplicationFormStates.waiting_for_community: ApplicationFormStates.waiting_for_plans,
-            ApplicationFormStates.waiting_for_platform: ApplicationFormStates.waiting_for_community,
-            ApplicationFormStates.waiting_for_java_nickname: ApplicationFormStates.waiting_for_platform,
-            ApplicationFormStates.waiting_for_bedrock_nickname: ApplicationFormStates.waiting_for_platform,
-            ApplicationFormStates.waiting_for_skin: ApplicationFormStates.waiting_for_java_nickname,  # В зависимости от предыдущего шага надо корректировать
-            ApplicationFormStates.waiting_for_projects: ApplicationFormStates.waiting_for_skin,
-            ApplicationFormStates.waiting_for_referral: ApplicationFormStates.waiting_for_projects,
-            ApplicationFormStates.review_application: ApplicationFormStates.waiting_for_referral,
-            None: None  # Для случаев, когда состояние неизвестно
-        }
-        
-        # Определяем предыдущее состояние
-        data = await state.get_data()
-        previous_state = state_transitions.get(current_state)
-        
-        # Обработка специальных случаев
-        if current_state == ApplicationFormStates.waiting_for_skin:
-            platform = data.get('platform')
-            previous_state = ApplicationFormStates.waiting_for_java_nickname if platform in ['java', 'both'] else ApplicationFormStates.waiting_for_platform
-        
-        if previous_state is None:
-            # Возвращаемся в главное меню
-            await state.clear()
-            await callback.message.answer(
-                "Заполнение анкеты отменено.",
-                reply_markup=await get_main_menu(callback.from_user.id in ADMIN_IDS, callback.from_user.id)
-            )
-            return
-        
-        # Удаляем сообщения и переходим к предыдущему шагу
-        await state.set_state(previous_state)
-        
-        # Обрабатываем каждое состояние отдельно
-        if previous_state == ApplicationFormStates.waiting_for_start:
-            # Возвращаемся к показу политики
-            try:
-                with open('questions.md', 'r', encoding='utf-8') as file:
-                    policy_text = "\n".join(file.read().split('---')[0].strip().split('\n'))
-            except Exception as e:
-                logger.error(f"Ошибка при чтении файла с вопросами: {e}")
-                policy_text = "Перед началом заполнения заявки, пожалуйста, ознакомьтесь с политикой конфиденциальности и правилами сервера."
-                
-            message = await callback.message.answer(
-                policy_text,
-                reply_markup=get_accept_policy_keyboard()
-            )
-            await state.update_data(last_message_id=message.message_id)
-            
-        elif previous_state == ApplicationFormStates.waiting_for_name:
-            # Возвращаемся к вопросу об имени
-            question = "Как к вам обращаться? (Имя или ник)"
-            try:
-                with open('questions.md', 'r', encoding='utf-8') as file:
-                    content = file.read().split('---')[1].strip()
-                    for line in content.split('\n'):
-                        if "Как к вам обращаться?" in line:
-                            question = line.strip()
-                            break
-            except Exception as e:
-                logger.error(f"Ошибка при чтении вопроса: {e}")
-            
-            message = await callback.message.answer(
-                question,
-                reply_markup=get_back_button_keyboard()
-            )
-            await state.update_data(last_message_id=message.message_id)
-            
-        # Обработка других состояний будет добавлена позже
-        else:
-            await callback.message.answer(
-                "Переход к предыдущему шагу недоступен.",
-                reply_markup=get_back_button_keyboard()
-            )
-            
+        return
+    data = await state.get_data()
+    media = data.get(step.data_key) or []
+    if len(media) >= step.max_files:
+        await reject_form_answer(message, state, f"🚫 Можно прикрепить не более {step.max_files} файлов.")
+        return
+    media.append({"file_id": file_id, "media_type": media_type})
+    data = await state.update_data({
+        step.data_key: media,
+        "media_message_ids": data.get("media_message_ids", []) + [message.message_id]
+    })
+    # Вопрос со счетчиком переносится под вложения, чтобы кнопки были внизу
+    text, keyboard = render_form_step(step.key, data)
+    prompt = await message.answer(text, reply_markup=keyboard)
+    await delete_messages(bot, message.chat.id, [data.get("message_id")])
+    await state.update_data(message_id=prompt.message_id)
+
+@user_callbacks.route(PLATFORM, states=[ApplicationFormStates.waiting_for_platform])
+async def process_platform_choice(callback: CallbackQuery, state: FSMContext, bot: Bot, platform: str):
+    try:
+        if platform in PLATFORM_TITLES:
+            await state.update_data(platform=platform)
+            await advance_form(bot, callback.from_user.id, state, "platform", callback)
     except Exception as e:
-        logger.error(f"Ошибка в back_to_previous_step для пользователя {callback.from_user.id}: {e}")
+        logger.error(f"Ошибка в process_platform_choice для пользователя {callback.from_user.id}: {e}")
         await callback.message.answer("❌ Произошла ошибка. Пожалуйста, попробуйте позже.")
     await callback.answer()
 
-@user_router.callback_query(F.data == "edit_application")
-async def edit_application(callback: CallbackQuery, state: FSMContext, bot: Bot):
+@user_callbacks.route(CONTINUE_FROM, states=FORM_MEDIA_STATES)
+async def continue_form_media(callback: CallbackQuery, state: FSMContext, bot: Bot):
     try:
-        await callback.message.delete()
-        data = await state.get_data()
-        await delete_messages(bot, callback.from_user.id, [data.get("message_id")] + data.get("media_message_ids", []))
-        await start_edit_application(callback, state, bot)
+        async with form_lock(callback.from_user.id):
+            step = FORM_STEPS[FORM_STEP_BY_STATE[await state.get_state()]]
+            data = await state.get_data()
+            if not step.optional and not data.get(step.data_key):
+                await callback.answer("📎 Прикрепите хотя бы один файл.", show_alert=True)
+                return
+            await advance_form(bot, callback.from_user.id, state, step.key, callback)
     except Exception as e:
-        logger.error(f"Ошибка в edit_application для пользователя {callback.from_user.id}: {e}")
-        await callback.message.answer("❌ Произошла ошибка при редактировании заявки.")
+        logger.error(f"Ошибка в continue_form_media для пользователя {callback.from_user.id}: {e}")
+        await callback.message.answer("❌ Произошла ошибка. Пожалуйста, попробуйте позже.")
     await callback.answer()
 
-@user_router.callback_query(F.data == "keep_description")
-async def keep_description(callback: CallbackQuery, state: FSMContext, bot: Bot):
+@user_callbacks.route("skip_step", states=FORM_OPTIONAL_STATES)
+async def skip_form_step(callback: CallbackQuery, state: FSMContext, bot: Bot):
     try:
-        await callback.message.delete()
-        data = await state.get_data()
-        await delete_messages(bot, callback.from_user.id, [data.get("message_id")] + data.get("media_message_ids", []))
-        application = await get_application_by_user_id(callback.from_user.id)
-        if not application:
-            await callback.message.answer(
-                "❌ Заявка не найдена.",
-                reply_markup=await get_main_menu(callback.from_user.id in ADMIN_IDS, callback.from_user.id)
-            )
-            await state.clear()
-            return
-        await state.set_state(ApplicationStates.waiting_for_media)
-        message = await callback.message.answer(
-            "📎 Отправьте новое фото, видео или документы (или выберите действие):",
-            reply_markup=await get_application_media_keyboard(is_edit=True)
-        )
-        await state.update_data(message_id=message.message_id, media_message_ids=[])
+        async with form_lock(callback.from_user.id):
+            step = FORM_STEPS[FORM_STEP_BY_STATE[await state.get_state()]]
+            await state.update_data({step.data_key: None})
+            await advance_form(bot, callback.from_user.id, state, step.key, callback)
     except Exception as e:
-        logger.error(f"Ошибка в keep_description для пользователя {callback.from_user.id}: {e}")
-        await callback.message.answer("❌ Произошла ошибка при редактировании заявки.")
+        logger.error(f"Ошибка в skip_form_step для пользователя {callback.from_user.id}: {e}")
+        await callback.message.answer("❌ Произошла ошибка. Пожалуйста, попробуйте позже.")
     await callback.answer()
 
-@user_router.message(StateFilter(ApplicationFormStates.waiting_for_about), F.text)
-async def process_about(message: Message, state: FSMContext, bot: Bot):
-    try:
-        # Удаляем предыдущие сообщения
-        data = await state.get_data()
-        if last_message_id := data.get('last_message_id'):
-            await delete_messages(bot, message.from_user.id, [last_message_id])
-        
-        # Сохраняем текст 'О себе'
-        about_text = message.text.strip()
-        application_id = data.get('application_id')
-        
-        # Сохраняем в базе данных
-        if application_id:
-            await update_application_field(application_id, "player_about", about_text)
-        
-        # Переходим к следующему шагу - планы на сервере (вопрос 4)
-        await state.set_state(ApplicationFormStates.waiting_for_plans)
-        
-        # Загружаем вопрос из файла questions.md
-        question = "🎮 Как вы планируете проводить время на HorniMine?\n(Игровой стиль, предпочтения: строительство, приключения, торговля и т.д.)"
-        
-        new_message = await message.answer(
-            question,
-            reply_markup=get_back_button_keyboard()
-        )
-        await state.update_data(last_message_id=new_message.message_id)
-        
-        # Удаляем сообщение пользователя для чистоты чата
-        await safe_message_delete(message)
-        
-    except Exception as e:
-        logger.error(f"Ошибка в process_about для пользователя {message.from_user.id}: {e}")
-        await message.answer("❌ Произошла ошибка. Пожалуйста, попробуйте позже.")
-
-@user_router.message(StateFilter(ApplicationStates.waiting_for_skin), F.photo | F.document)
-async def process_skin(message: Message, state: FSMContext, bot: Bot):
+@user_callbacks.route("back_to_previous_step", states=FORM_STATES.values())
+async def back_to_previous_step(callback: CallbackQuery, state: FSMContext, bot: Bot):
     try:
-        data = await state.get_data()
-        media = data.get("skin_media", [])
-        
-        if len(media) >= 2:
-            await message.answer("🚫 Можно прикрепить не более 2 файлов скинов.")
-            return
-        
-        if message.photo:
-            file_id = message.photo[-1].file_id
-            media_type = "photo"
-        else:
-            file_id = message.document.file_id
-            media_type = "document"
-        
-        media.append({"file_id": file_id, "media_type": media_type})
-        await state.update_data(skin_media=media)
-        
-        await message.answer(
-            f"✅ Скин добавлен ({len(media)}/2). Прикрепите ещё или нажмите 'Продолжить'.",
-            reply_markup=get_media_continue_keyboard("skin", len(media), 2)
-        )
+        async with form_lock(callback.from_user.id):
+            history = (await state.get_data()).get("form_history", [])
+            if history:
+                await state.update_data(form_history=history[:-1])
+                await show_form_step(bot, callback.from_user.id, state, history[-1], callback)
     except Exception as e:
-        logger.error(f"Ошибка при обработке скина: {e}")
-        await message.answer("❌ Произошла ошибка при загрузке скина")
+        logger.error(f"Ошибка в back_to_previous_step для пользователя {callback.from_user.id}: {e}")
+        await callback.message.answer("❌ Произошла ошибка. Пожалуйста, попробуйте позже.")
+    await callback.answer()
 
-@user_router.callback_query(F.data == "send_application")
+@user_callbacks.route("send_application", states=[ApplicationFormStates.review_application])
 async def send_application(callback: CallbackQuery, state: FSMContext, bot: Bot):
     try:
-        # Получаем данные из состояния
-        data = await state.get_data()
-        
-        # Сохраняем заявку в БД
-        application_id = await add_application_with_platform(
-            callback.from_user.id,
-            data.get("platform", "unknown")
-        )
-        
-        # Обновляем все поля анкеты
-        fields_mapping = [
-            ("name", "player_name"),
-            ("age", "player_age"),
-            ("about", "player_about"),
-            ("plans", "player_plans"),
-            ("community", "player_community"),
-            ("java_nickname", "player_nickname_java"),
-            ("bedrock_nickname", "player_nickname_bedrock"),
-            ("referral", "player_referral")
-        ]
-        
-        for state_field, db_field in fields_mapping:
-            if state_field in data:
-                await update_application_field(
-                    application_id, 
-                    db_field, 
-                    data[state_field]
-                )
-        
-        # Сохраняем медиафайлы
-        for media_type in ["skin", "projects"]:
-            media_key = f"{media_type}_media"
-            if media_key in data and data[media_key]:
-                for media in data[media_key]:
-                    await add_application_media(
-                        application_id,
-                        media["file_id"],
-                        media["media_type"],
-                        media_type
-                    )
-        
+        async with form_lock(callback.from_user.id):
+            # Повторное нажатие, пока заявка сохранялась, не создает вторую заявку
+            if await state.get_state() != ApplicationFormStates.review_application.state:
+                await callback.answer()
+                return
+            data = await state.get_data()
+
+            # Сохраняем заявку со всеми полями и медиа одной транзакцией
+            form, media = collect_application_form(data)
+            application_id = await submit_application(callback.from_user.id, form, media)
+            if not application_id:
+                await callback.answer("❌ Не удалось отправить заявку. Пожалуйста, попробуйте позже.", show_alert=True)
+                return
+            await state.clear()
+
         # Сохраняем никнеймы в файл
         await save_players_to_file(application_id)
-        
+
         # Отправляем уведомление админам
         admin_message = "🆕 Новая заявка на вайтлист!"
         admin_keyboard = InlineKeyboardMarkup(inline_keyboard=[
             [InlineKeyboardButton(
                 text="🔍 Подробности",
-                callback_data=f"view_application_{application_id}"
+                callback_data=VIEW_APPLICATION.pack(application_id)
             )]
         ])
-        
-        for admin_id in ADMIN_IDS:
-            try:
-                await bot.send_message(
-                    admin_id,
-                    admin_message,
-                    reply_markup=admin_keyboard
-                )
-            except Exception as e:
-                logger.error(f"Ошибка отправки уведомления админу {admin_id}: {e}")
-        
+
+        notifier.notify(
+            ADMIN_IDS,
+            lambda admin_id: bot.send_message(admin_id, admin_message, reply_markup=admin_keyboard),
+            f"уведомление о заявке #{application_id}"
+        )
+
         # Отправляем подтверждение пользователю
-        await callback.message.answer(
+        await delete_messages(bot, callback.from_user.id, data.get("media_message_ids", []))
+        await render_panel(
+            callback,
             "✅ Ваша заявка успешно отправлена на рассмотрение!\n"
             "Ожидайте ответа в течение 24 часов.",
             reply_markup=get_back_button()
         )
-        
     except Exception as e:
         logger.error(f"Ошибка при отправке заявки: {e}")
         await callback.message.answer(
             "❌ Произошла ошибка при отправке заявки. Пожалуйста, попробуйте позже.",
             reply_markup=get_back_button()
         )
-    finally:
-        await state.clear()
-        await callback.answer()
+    await callback.answer()
 
-@user_router.callback_query(F.data == "view_application")
-async def view_my_application(callback: CallbackQuery, state: FSMContext, bot: Bot):
+@user_callbacks.route("edit_application")
+async def edit_application(callback: CallbackQuery, state: FSMContext, bot: Bot):
     try:
         await callback.message.delete()
+        data = await state.get_data()
+        await delete_messages(bot, callback.from_user.id, [data.get("message_id")] + data.get("media_message_ids", []))
+        await start_edit_application(callback, state, bot)
     except Exception as e:
-        logger.warning(f"Не удалось удалить сообщение: {e}")
+        logger.error(f"Ошибка в edit_application для пользователя {callback.from_user.id}: {e}")
+        await callback.message.answer("❌ Произошла ошибка при редактировании заявки.")
+    await callback.answer()
+
+@user_callbacks.route("view_application")
+async def view_my_application(callback: CallbackQuery, state: FSMContext, bot: Bot):
     try:
         application = await get_application_by_user_id(callback.from_user.id)
         if not application:
-            await callback.message.answer(
+            await render_panel(
+                callback,
                 "📭 У вас нет активных заявок.",
                 reply_markup=await get_main_menu(callback.from_user.id in ADMIN_IDS, callback.from_user.id)
             )
         else:
             media = await get_application_media(application[0])
             media_count = len(media)
-            message = await callback.message.answer(
+            message = await render_panel(
+                callback,
                 f"📝 Ваша заявка #{application[0]}:\n"
                 f"Статус: {translate_status(application[2])}\n"
                 f"📄 Описание: {application[3] or 'Отсутствует'}\n"
@@ -542,44 +552,26 @@ async def view_my_application(callback: CallbackQuery, state: FSMContext, bot: B
                 f"✏️ Редактирований: {application[6] or 0}/3",
                 reply_markup=await get_application_menu(application[2], application[6] or 0)
             )
-            media_message_ids = []
-            for item in media:
-                try:
-                    if item[3] == "photo":
-                        media_message = await bot.send_photo(callback.from_user.id, item[2])
-                    elif item[3] == "video":
-                        media_message = await bot.send_video(callback.from_user.id, item[2])
-                    elif item[3] == "document":
-                        media_message = await bot.send_document(callback.from_user.id, item[2])
-                    media_message_ids.append(media_message.message_id)
-                except Exception as e:
-                    logger.error(f"Ошибка отправки медиа {item[2]} пользователю {callback.from_user.id}: {e}")
-                    await callback.message.answer("❌ Не удалось отправить одно из медиа.")
+            media_message_ids = await send_media_batch(
+                bot, callback.from_user.id, [(item[3], item[2], None) for item in media]
+            )
+            if len(media_message_ids) < media_count:
+                await callback.message.answer("❌ Не удалось отправить одно из медиа.")
             await state.update_data(message_id=message.message_id, media_message_ids=media_message_ids)
     except Exception as e:
         logger.error(f"Ошибка в view_my_application для пользователя {callback.from_user.id}: {e}")
         await callback.message.answer("❌ Произошла ошибка при просмотре заявки.")
     await callback.answer()
 
-@user_router.callback_query(F.data.in_(["back_to_main", "cancel"]))
+@user_callbacks.route("back_to_main", "cancel")
 async def back_to_main(callback: CallbackQuery, state: FSMContext, bot: Bot):
-    try:
-        await callback.message.delete()
-    except Exception as e:
-        logger.warning(f"Не удалось удалить сообщение: {e}")
     try:
         data = await state.get_data()
         message_id = data.get("message_id")
         media_message_ids = data.get("media_message_ids", [])
-        await delete_messages(bot, callback.from_user.id, [message_id] + media_message_ids)
-        if await state.get_state() == ApplicationStates.waiting_for_about:
-            application = await get_application_by_user_id(callback.from_user.id)
-            if application and application[6] == 0:
-                async with aiosqlite.connect('data/bot.db') as db:
-                    await db.execute('DELETE FROM applications WHERE application_id = ?', (application[0],))
-                    await db.commit()
-                logger.info(f"Заявка #{application[0]} удалена при отмене")
-        await callback.message.answer(
+        await delete_messages(bot, callback.from_user.id, [message_id] + media_message_ids, keep=callback.message.message_id)
+        await render_panel(
+            callback,
             "↩️ Вернулись в главное меню!",
             reply_markup=await get_main_menu(callback.from_user.id in ADMIN_IDS, callback.from_user.id)
         )
@@ -589,18 +581,15 @@ async def back_to_main(callback: CallbackQuery, state: FSMContext, bot: Bot):
         await callback.message.answer("❌ Произошла ошибка при возврате в меню.")
     await callback.answer()
 
-@user_router.callback_query(F.data == "create_ticket")
+@user_callbacks.route("create_ticket")
 async def create_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot):
     try:
-        await callback.message.delete()
-    except Exception as e:
-        logger.warning(f"Не удалось удалить сообщение: {e}")
-    try:
-        await callback.message.answer(
+        message = await render_panel(
+            callback,
             "🆘 Вы можете написать нам на почту admin@hornimine.fun или задать вопрос здесь:",
             reply_markup=get_support_menu()
         )
-        await state.update_data(message_id=callback.message.message_id, media_message_ids=[])
+        await state.update_data(message_id=message.message_id, media_message_ids=[])
     except Exception as e:
         logger.error(f"Ошибка в create_ticket для пользователя {callback.from_user.id}: {e}")
         await callback.message.answer("❌ Произошла ошибка при открытии поддержки.")
@@ -610,7 +599,8 @@ async def start_new_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot)
     try:
         ticket_id = await add_ticket(callback.from_user.id)
         await state.set_state(TicketStates.waiting_for_message)
-        message = await callback.message.answer(
+        message = await render_panel(
+            callback,
             "🆘 Задайте вопрос (можно прикреплять фото, видео, документ, стикер), поддержка свяжется с вами в ближайшее время:",
             reply_markup=InlineKeyboardMarkup(inline_keyboard=[
                 [InlineKeyboardButton(text="↩️ Отмена", callback_data="cancel")]
@@ -621,16 +611,16 @@ async def start_new_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot)
         logger.error(f"Ошибка в start_new_ticket для пользователя {callback.from_user.id}: {e}")
         await callback.message.answer("❌ Произошла ошибка при создании вопроса.")
 
-@user_router.callback_query(F.data == "new_ticket")
+@user_callbacks.route("new_ticket")
 async def new_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot):
     try:
-        await callback.message.delete()
         tickets = await get_open_tickets_by_user(callback.from_user.id)
         if tickets:
-            message = await callback.message.answer(
+            message = await render_panel(
+                callback,
                 "🆘 У вас есть открытый вопрос. Продолжите общение или создайте новый:",
                 reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                    [InlineKeyboardButton(text="💬 Продолжить чат", callback_data=f"view_my_ticket_{tickets[0][0]}")],
+                    [InlineKeyboardButton(text="💬 Продолжить чат", callback_data=VIEW_MY_TICKET.pack(tickets[0][0]))],
                     [InlineKeyboardButton(text="🆕 Новый вопрос", callback_data="force_new_ticket")],
                     [InlineKeyboardButton(text="↩️ Назад", callback_data="create_ticket")]
                 ])
@@ -643,10 +633,9 @@ async def new_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot):
         await callback.message.answer("❌ Произошла ошибка при создании нового вопроса.")
     await callback.answer()
 
-@user_router.callback_query(F.data == "force_new_ticket")
+@user_callbacks.route("force_new_ticket")
 async def force_new_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot):
     try:
-        await callback.message.delete()
         await start_new_ticket(callback, state, bot)
     except Exception as e:
         logger.error(f"Ошибка в force_new_ticket для пользователя {callback.from_user.id}: {e}")
@@ -701,71 +690,15 @@ async def process_ticket_message(message: Message, state: FSMContext, bot: Bot):
             return
         user = await get_user(message.from_user.id)
         username = f"@{user[1]}" if user and user[1] else f"ID {message.from_user.id}"
-        for admin_id in ADMIN_IDS:
-            try:
-                if message_type == "text":
-                    await bot.send_message(
-                        admin_id,
-                        f"🆘 Новый вопрос #{ticket_id} от {username}:\n{content}",
-                        reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                            [InlineKeyboardButton(text="💬 Перейти в чат", callback_data=f"chat_ticket_{ticket_id}")]
-                        ])
-                    )
-                elif message_type == "sticker":
-                    await bot.send_sticker(
-                        admin_id,
-                        content,
-                        reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                            [InlineKeyboardButton(text="💬 Перейти в чат", callback_data=f"chat_ticket_{ticket_id}")]
-                        ])
-                    )
-                else:
-                    caption = f"🆘 Новый вопрос #{ticket_id} от {username}"
-                    if message.caption:
-                        caption += f"\n{message.caption}"
-                    if message_type == "photo":
-                        await bot.send_photo(admin_id, content, caption=caption, reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                            [InlineKeyboardButton(text="💬 Перейти в чат", callback_data=f"chat_ticket_{ticket_id}")]
-                        ]))
-                    elif message_type == "video":
-                        await bot.send_video(admin_id, content, caption=caption, reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                            [InlineKeyboardButton(text="💬 Перейти в чат", callback_data=f"chat_ticket_{ticket_id}")]
-                        ]))
-                    elif message_type == "document":
-                        await bot.send_document(admin_id, content, caption=caption, reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                            [InlineKeyboardButton(text="💬 Перейти в чат", callback_data=f"chat_ticket_{ticket_id}")]
-                        ]))
-                logger.info(f"Уведомление о вопросе #{ticket_id} отправлено админу {admin_id}")
-            except Exception as e:
-                logger.error(f"Ошибка отправки уведомления админу {admin_id}: {e}")
-        if ticket[3]:
-            try:
-                if message_type == "text":
-                    await bot.send_message(
-                        ticket[3],
-                        f"💬 Новое сообщение в вопросе #{ticket_id} от {username}:\n{content}"
-                    )
-                elif message_type == "sticker":
-                    await bot.send_sticker(
-                        ticket[3],
-                        content,
-                        reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                            [InlineKeyboardButton(text="💬 Перейти в чат", callback_data=f"chat_ticket_{ticket_id}")]
-                        ])
-                    )
-                else:
-                    caption = f"💬 Новое сообщение в вопросе #{ticket_id} от {username}"
-                    if message.caption:
-                        caption += f"\n{message.caption}"
-                    if message_type == "photo":
-                        await bot.send_photo(ticket[3], content, caption=caption)
-                    elif message_type == "video":
-                        await bot.send_video(ticket[3], content, caption=caption)
-                    elif message_type == "document":
-                        await bot.send_document(ticket[3], content, caption=caption)
-                logger.info(f"Уведомление о сообщении в вопросе #{ticket_id} отправлено админу {ticket[3]}")
-            except Exception as e:
-                logger.error(f"Ошибка отправки уведомления админу {ticket[3]}: {e}")
+        chat_keyboard = InlineKeyboardMarkup(inline_keyboard=[
+            [InlineKeyboardButton(text="💬 Перейти в чат", callback_data=ADMIN_CHAT_TICKET.pack(ticket_id))]
+        ])
+        # Альбом или серия сообщений уходит админам одной сводкой
+        recipients = list(ADMIN_IDS) + ([ticket[3]] if ticket[3] else [])
+        ticket_digest.add(
+            bot, ticket_id, recipients, username, f"🆘 Новый вопрос #{ticket_id} от {username}",
+            message_type, content, message.caption, chat_keyboard
+        )
     except Exception as e:
         logger.error(f"Ошибка в process_ticket_message для пользователя {message.from_user.id}: {e}")
         await message.answer("❌ Произошла ошибка при отправке сообщения.")
@@ -825,43 +758,16 @@ async def process_chat_message(message: Message, state: FSMContext, bot: Bot):
             reply_markup=get_user_ticket_keyboard()
         )
         
-        # Если у вопроса назначен администратор, отправляем ему сообщение
+        # Если у вопроса назначен администратор, сообщения за короткое окно
+        # отправляются ему одной сводкой
         admin_id = ticket[3]
         if admin_id:
-            try:
-                # Формируем имя пользователя для админа
-                user = await get_user(message.from_user.id)
-                username = f"@{user[1]}" if user and user[1] else f"ID {message.from_user.id}"
-                
-                # Отправляем сообщение администратору
-                if message_type == "text":
-                    await bot.send_message(
-                        admin_id,
-                        f"💬 Сообщение от {username} (вопрос #{ticket_id}):\n{content}"
-                    )
-                elif message_type == "sticker":
-                    await bot.send_sticker(admin_id, content)
-                    # Доп.сообщение для контекста
-                    await bot.send_message(
-                        admin_id,
-                        f"👤 {username} отправил стикер в вопросе #{ticket_id}"
-                    )
-                else:
-                    # Для медиа-файлов
-                    caption = f"💬 Сообщение от {username} (вопрос #{ticket_id})"
-                    if message.caption:
-                        caption += f"\n{message.caption}"
-                    
-                    if message_type == "photo":
-                        await bot.send_photo(admin_id, content, caption=caption)
-                    elif message_type == "video":
-                        await bot.send_video(admin_id, content, caption=caption)
-                    elif message_type == "document":
-                        await bot.send_document(admin_id, content, caption=caption)
-                
-                logger.info(f"Сообщение от пользователя {message.from_user.id} отправлено админу {admin_id}")
-            except Exception as e:
-                logger.error(f"Ошибка отправки сообщения админу {admin_id}: {e}")
+            user = await get_user(message.from_user.id)
+            username = f"@{user[1]}" if user and user[1] else f"ID {message.from_user.id}"
+            ticket_digest.add(
+                bot, ticket_id, [admin_id], username, f"💬 Сообщение от {username} (вопрос #{ticket_id})",
+                message_type, content, message.caption
+            )
     
     except Exception as e:
         logger.error(f"Ошибка в process_chat_message для пользователя {message.from_user.id}: {e}")
@@ -870,16 +776,10 @@ async def process_chat_message(message: Message, state: FSMContext, bot: Bot):
             reply_markup=await get_main_menu(message.from_user.id in ADMIN_IDS, message.from_user.id)
         )
 
-@user_router.callback_query(F.data == "exit_chat")
+@user_callbacks.route("exit_chat")
 async def exit_chat(callback: CallbackQuery, state: FSMContext, bot: Bot):
     """Выход из чата по вопросу"""
     try:
-        # Удаляем текущее сообщение
-        try:
-            await callback.message.delete()
-        except Exception as e:
-            logger.warning(f"Не удалось удалить сообщение: {e}")
-        
         # Получаем данные из состояния
         data = await state.get_data()
         ticket_id = data.get("ticket_id")
@@ -887,13 +787,14 @@ async def exit_chat(callback: CallbackQuery, state: FSMContext, bot: Bot):
         
         # Удаляем все сообщения чата
         if message_ids:
-            await delete_messages(bot, callback.from_user.id, message_ids)
+            await delete_messages(bot, callback.from_user.id, message_ids, keep=callback.message.message_id)
         
         # Очищаем состояние
         await state.clear()
         
         # Отправляем информацию о выходе из чата
-        await callback.message.answer(
+        await render_panel(
+            callback,
             f"↩️ Вы вышли из чата вопроса #{ticket_id}. Вы можете вернуться к нему позже.",
             reply_markup=await get_main_menu(callback.from_user.id in ADMIN_IDS, callback.from_user.id)
         )
@@ -909,35 +810,32 @@ async def exit_chat(callback: CallbackQuery, state: FSMContext, bot: Bot):
     
     await callback.answer()
 
-@user_router.callback_query(F.data == "close_user_ticket")
+@user_callbacks.route("close_user_ticket")
 async def close_user_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot):
     """Закрытие вопроса пользователем"""
     if callback.from_user.id in ADMIN_IDS:
         # Для админов эта функция обрабатывается в admin_router
         return
-    try:
-        await callback.message.delete()
-    except Exception as e:
-        logger.warning(f"Не удалось удалить сообщение: {e}")
     try:
         data = await state.get_data()
         ticket_id = data.get("ticket_id")
         if not ticket_id:
-            await callback.message.answer("❌ Вопрос не найден.")
+            await render_panel(callback, "❌ Вопрос не найден.")
             await state.clear()
             return
         
         # Получаем информацию о тикете перед закрытием
         ticket = await get_ticket_by_id(ticket_id)
         if not ticket:
-            await callback.message.answer("❌ Вопрос не найден.")
+            await render_panel(callback, "❌ Вопрос не найден.")
             await state.clear()
             return
             
         # Проверяем, открыт ли тикет
         is_active = ticket[5] if len(ticket) > 5 else 0
         if is_active == 0:
-            await callback.message.answer(
+            await render_panel(
+                callback,
                 "❌ Вопрос уже закрыт.",
                 reply_markup=await get_main_menu(callback.from_user.id in ADMIN_IDS, callback.from_user.id)
             )
@@ -947,12 +845,13 @@ async def close_user_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot
         message_id = data.get("message_id")
         media_message_ids = data.get("media_message_ids", [])
         if message_id or media_message_ids:
-            await delete_messages(bot, callback.from_user.id, [message_id] + media_message_ids if message_id else media_message_ids)
+            await delete_messages(bot, callback.from_user.id, [message_id] + media_message_ids if message_id else media_message_ids, keep=callback.message.message_id)
         
         # Закрываем тикет
         success = await close_ticket(ticket_id)
         if not success:
-            await callback.message.answer(
+            await render_panel(
+                callback,
                 "❌ Не удалось закрыть вопрос. Попробуйте позже.",
                 reply_markup=await get_main_menu(callback.from_user.id in ADMIN_IDS, callback.from_user.id)
             )
@@ -962,7 +861,8 @@ async def close_user_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot
         await state.clear()
         
         # Отправляем подтверждение пользователю
-        await callback.message.answer(
+        await render_panel(
+            callback,
             "✅ Вопрос закрыт!",
             reply_markup=await get_main_menu(callback.from_user.id in ADMIN_IDS, callback.from_user.id)
         )
@@ -971,31 +871,13 @@ async def close_user_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot
         user = await get_user(callback.from_user.id)
         username = f"@{user[1]}" if user and user[1] else f"ID {callback.from_user.id}"
         
-        # Уведомляем админа, назначенного на тикет
-        admin_id = ticket[3]
-        if admin_id:
-            try:
-                await bot.send_message(
-                    admin_id,
-                    f"✅ Пользователь {username} закрыл вопрос #{ticket_id}",
-                    reply_markup=get_admin_menu()
-                )
-                logger.info(f"Уведомление о закрытии вопроса #{ticket_id} отправлено админу {admin_id}")
-            except Exception as e:
-                logger.error(f"Ошибка отправки уведомления админу {admin_id}: {e}")
-        
-        # Дополнительно уведомляем остальных админов, если они не назначены на тикет
-        for admin_id in ADMIN_IDS:
-            if admin_id != ticket[3]:  # Не отправляем повторно назначенному админу
-                try:
-                    await bot.send_message(
-                        admin_id,
-                        f"✅ Пользователь {username} закрыл вопрос #{ticket_id}",
-                        reply_markup=get_admin_menu()
-                    )
-                    logger.info(f"Уведомление о закрытии вопроса #{ticket_id} отправлено админу {admin_id}")
-                except Exception as e:
-                    logger.error(f"Ошибка отправки уведомления админу {admin_id}: {e}")
+        # Уведомляем назначенного админа и остальных админов, каждого по одному разу
+        admin_menu = get_admin_menu()
+        notifier.notify(
+            ([ticket[3]] if ticket[3] else []) + list(ADMIN_IDS),
+            lambda admin_id: bot.send_message(admin_id, f"✅ Пользователь {username} закрыл вопрос #{ticket_id}", reply_markup=admin_menu),
+            f"уведомление о закрытии вопроса #{ticket_id}"
+        )
         
         logger.info(f"Вопрос #{ticket_id} закрыт пользователем {callback.from_user.id}")
     except Exception as e:
@@ -1003,21 +885,19 @@ async def close_user_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot
         await callback.message.answer("❌ Произошла ошибка при закрытии вопроса.")
     await callback.answer()
 
-@user_router.callback_query(F.data == "view_my_tickets")
+@user_callbacks.route("view_my_tickets")
 async def view_my_tickets(callback: CallbackQuery, state: FSMContext, bot: Bot):
-    try:
-        await callback.message.delete()
-    except Exception as e:
-        logger.warning(f"Не удалось удалить сообщение: {e}")
     try:
         tickets = await get_open_tickets_by_user(callback.from_user.id)
         if not tickets:
-            await callback.message.answer(
+            await render_panel(
+                callback,
                 "📭 У вас нет открытых вопросов.",
                 reply_markup=get_support_menu()
             )
         else:
-            await callback.message.answer(
+            await render_panel(
+                callback,
                 "📬 Ваши открытые вопросы:",
                 reply_markup=get_user_tickets_menu(tickets)
             )
@@ -1027,23 +907,20 @@ async def view_my_tickets(callback: CallbackQuery, state: FSMContext, bot: Bot):
         await callback.message.answer("❌ Произошла ошибка при просмотре вопросов.")
     await callback.answer()
 
-@user_router.callback_query(F.data.startswith("view_my_ticket_"))
-async def view_my_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot):
+@user_callbacks.route(VIEW_MY_TICKET)
+async def view_my_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot, ticket_id: int):
     try:
-        await callback.message.delete()
-    except Exception as e:
-        logger.warning(f"Не удалось удалить сообщение: {e}")
-    try:
-        ticket_id = int(callback.data.split("_")[3])
         ticket = await get_ticket_by_id(ticket_id)
         if not ticket or ticket[1] != callback.from_user.id:
-            await callback.message.answer(
+            await render_panel(
+                callback,
                 "❌ Вопрос не найден или доступ запрещён.",
                 reply_markup=await get_main_menu(callback.from_user.id in ADMIN_IDS, callback.from_user.id)
             )
             return
         await state.set_state(TicketStates.chatting)
-        message = await callback.message.answer(
+        message = await render_panel(
+            callback,
             "💬 Вы в чате с поддержкой. Отправляйте сообщения или используйте кнопки ниже:",
             reply_markup=get_user_ticket_keyboard()
         )
@@ -1053,14 +930,11 @@ async def view_my_ticket(callback: CallbackQuery, state: FSMContext, bot: Bot):
         await callback.message.answer("❌ Произошла ошибка при просмотре вопроса.")
     await callback.answer()
 
-@user_router.callback_query(F.data == "about_server")
+@user_callbacks.route("about_server")
 async def about_server(callback: CallbackQuery, state: FSMContext, bot: Bot):
     try:
-        await callback.message.delete()
-    except Exception as e:
-        logger.warning(f"Не удалось удалить сообщение: {e}")
-    try:
-        await callback.message.answer(
+        await render_panel(
+            callback,
             "ℹ️ О сервере HorniMine:\n"
             "HorniMine — это крутой Minecraft-сервер для весёлой игры с друзьями!\n"
             "🌍 IP: play.hornimine.fun\n"
@@ -1075,15 +949,18 @@ async def about_server(callback: CallbackQuery, state: FSMContext, bot: Bot):
     await callback.answer()
 
 @user_router.callback_query()
-async def unknown_callback_user(callback: CallbackQuery):
-    """Обработчик неизвестных callback-запросов"""
+async def unknown_callback_user(callback: CallbackQuery, state: FSMContext, bot: Bot):
+    """Находит обработчик callback в таблице user_callbacks, неизвестные отклоняет"""
     try:
         # Проверяем, является ли пользователь админом
         if callback.from_user.id in ADMIN_IDS:
             # Для админов не отвечаем, так как это может быть админский callback
             await callback.answer()
             return
-            
+
+        if await user_callbacks.dispatch(callback, state=state, bot=bot):
+            return
+
         logger.warning(f"Необработанный пользовательский callback: {callback.data} от пользователя {callback.from_user.id}")
         await callback.answer(
             "🤔 Эта функция пока не доступна или у вас нет прав для её использования. Пожалуйста, вернитесь в главное меню.",
@@ -1134,283 +1011,3 @@ async def unknown_message_user(message: Message, state: FSMContext):
     except Exception as e:
         logger.error(f"Ошибка при обработке неизвестного сообщения: {e}")
         await message.answer("❌ Произошла ошибка. Пожалуйста, попробуйте снова использовать /start.")
-
-@user_router.message(F.text == "📝 Подать заявку")
-async def start_application(message: Message, state: FSMContext):
-    await state.clear()
-    await message.answer(
-        "1. Как к вам обращаться? (Имя или ник)",
-        reply_markup=get_back_button_keyboard()
-    )
-    await state.set_state(ApplicationStates.waiting_for_name)
-
-@user_router.message(ApplicationStates.waiting_for_name)
-async def process_name(message: Message, state: FSMContext):
-    await state.update_data(name=message.text)
-    await message.answer(
-        "2. Сколько вам лет?",
-        reply_markup=get_back_button_keyboard()
-    )
-    await state.set_state(ApplicationStates.waiting_for_age)
-
-@user_router.message(ApplicationStates.waiting_for_age)
-async def process_age(message: Message, state: FSMContext):
-    await state.update_data(age=message.text)
-    await message.answer(
-        "3. Расскажите немного о себе: (Опыт игры, любимые аспекты Minecraft, участие в жизни сервера, идеи и проекты)",
-        reply_markup=get_back_button_keyboard()
-    )
-    await state.set_state(ApplicationStates.waiting_for_about)
-
-@user_router.message(StateFilter(ApplicationFormStates.waiting_for_about), F.text)
-async def process_about(message: Message, state: FSMContext, bot: Bot):
-    try:
-        # Удаляем предыдущие сообщения
-        data = await state.get_data()
-        if last_message_id := data.get('last_message_id'):
-            await delete_messages(bot, message.from_user.id, [last_message_id])
-        
-        # Сохраняем текст 'О себе'
-        about_text = message.text.strip()
-        application_id = data.get('application_id')
-        
-        # Сохраняем в базе данных
-        if application_id:
-            await update_application_field(application_id, "player_about", about_text)
-        
-        # Переходим к следующему шагу - планы на сервере (вопрос 4)
-        await state.set_state(ApplicationFormStates.waiting_for_plans)
-        
-        # Загружаем вопрос из файла questions.md
-        question = "🎮 Как вы планируете проводить время на HorniMine?\n(Игровой стиль, предпочтения: строительство, приключения, торговля и т.д.)"
-        
-        new_message = await message.answer(
-            question,
-            reply_markup=get_back_button_keyboard()
-        )
-        await state.update_data(last_message_id=new_message.message_id)
-        
-        # Удаляем сообщение пользователя для чистоты чата
-        await safe_message_delete(message)
-        
-    except Exception as e:
-        logger.error(f"Ошибка в process_about для пользователя {message.from_user.id}: {e}")
-        await message.answer("❌ Произошла ошибка. Пожалуйста, попробуйте позже.")
-
-@user_router.message(StateFilter(ApplicationFormStates.waiting_for_plans), F.text)
-async def process_plans(message: Message, state: FSMContext, bot: Bot):
-    try:
-        # Удаляем предыдущие сообщения
-        data = await state.get_data()
-        if last_message_id := data.get('last_message_id'):
-            await delete_messages(bot, message.from_user.id, [last_message_id])
-        
-        # Сохраняем планы на сервере
-        plans_text = message.text.strip()
-        application_id = data.get('application_id')
-        
-        # Сохраняем в базе данных
-        if application_id:
-            await update_application_field(application_id, "player_plans", plans_text)
-        
-        # Переходим к следующему шагу - вопрос о сообществе (вопрос 5)
-        await state.set_state(ApplicationFormStates.waiting_for_community)
-        
-        # Вопрос 5 из questions.md
-        question = "💙 Что для вас важно в дружелюбном сообществе?\n(Честность, уважение, поддержка, свобода самовыражения и т.п.)"
-        
-        new_message = await message.answer(
-            question,
-            reply_markup=get_back_button_keyboard()
-        )
-        await state.update_data(last_message_id=new_message.message_id)
-        
-        # Удаляем сообщение пользователя для чистоты чата
-        await safe_message_delete(message)
-        
-    except Exception as e:
-        logger.error(f"Ошибка в process_plans для пользователя {message.from_user.id}: {e}")
-        await message.answer("❌ Произошла ошибка. Пожалуйста, попробуйте позже.")
-
-@user_router.message(StateFilter(ApplicationFormStates.waiting_for_community), F.text)
-async def process_community(message: Message, state: FSMContext, bot: Bot):
-    try:
-        # Удаляем предыдущие сообщения
-        data = await state.get_data()
-        if last_message_id := data.get('last_message_id'):
-            await delete_messages(bot, message.from_user.id, [last_message_id])
-        
-        # Сохраняем ответ о сообществе
-        community_text = message.text.strip()
-        application_id = data.get('application_id')
-        
-        # Сохраняем в базе данных
-        if application_id:
-            await update_application_field(application_id, "player_community", community_text)
-        
-        # Переходим к выбору платформы (вопрос 6)
-        await state.set_state(ApplicationFormStates.waiting_for_platform)
-        
-        # Вопрос 6 - выбор платформы с кнопками!
-        question = "🎮 На какой платформе вы играете?"
-        
-        # Импортируем клавиатуру для выбора платформы
-        from keyboards import get_platform_choice_keyboard
-        
-        new_message = await message.answer(
-            question,
-            reply_markup=get_platform_choice_keyboard()
-        )
-        await state.update_data(last_message_id=new_message.message_id)
-        
-        # Удаляем сообщение пользователя для чистоты чата
-        await safe_message_delete(message)
-        
-    except Exception as e:
-        logger.error(f"Ошибка в process_community для пользователя {message.from_user.id}: {e}")
-        await message.answer("❌ Произошла ошибка. Пожалуйста, попробуйте позже.")
-
-@user_router.callback_query(F.data.startswith("platform_"), StateFilter(ApplicationFormStates.waiting_for_platform))
-async def process_platform_choice(callback: CallbackQuery, state: FSMContext, bot: Bot):
-    try:
-        # Удаляем предыдущее сообщение
-        data = await state.get_data()
-        if last_message_id := data.get('last_message_id'):
-            await delete_messages(bot, callback.from_user.id, [last_message_id])
-        await callback.message.delete()
-        
-        # Получаем выбранную платформу из callback_data
-        platform = callback.data.split("_")[1]  # platform_java -> java
-        application_id = data.get('application_id')
-        
-        # Сохраняем платформу в базе данных
-        if application_id:
-            await update_application_field(application_id, "player_platform", platform)
-        
-        # Сохраняем платформу в состоянии для дальнейшего использования
-        await state.update_data(platform=platform)
-        
-        # В зависимости от платформы переходим к разным вопросам
-        if platform in ["java", "both"]:
-            # Если выбрал Java или обе платформы - спрашиваем Java никнейм
-            await state.set_state(ApplicationFormStates.waiting_for_java_nickname)
-            question = "⚡ Введите свой никнейм Java\n(Без пробелов и лишних символов):"
-        else:
-            # Если выбрал только Bedrock - сразу спрашиваем Bedrock никнейм
-            await state.set_state(ApplicationFormStates.waiting_for_bedrock_nickname)
-            question = "🟢 Введите свой никнейм Bedrock\n(Без пробелов и лишних символов):"
-        
-        new_message = await callback.message.answer(
-            question,
-            reply_markup=get_back_button_keyboard()
-        )
-        await state.update_data(last_message_id=new_message.message_id)
-        
-        await callback.answer()
-        
-    except Exception as e:
-        logger.error(f"Ошибка в process_platform_choice для пользователя {callback.from_user.id}: {e}")
-        await callback.message.answer("❌ Произошла ошибка. Пожалуйста, попробуйте позже.")
-        await callback.answer()
-
-@user_router.message(ApplicationStates.waiting_for_java_nickname)
-async def process_java_nickname(message: Message, state: FSMContext):
-    await state.update_data(java_nickname=message.text)
-    await message.answer(
-        "9. Прикрепите фото или документ вашего скина:",
-        reply_markup=get_back_button_keyboard()
-    )
-    await state.set_state(ApplicationStates.waiting_for_skin)
-
-@user_router.message(ApplicationStates.waiting_for_bedrock_nickname)
-async def process_bedrock_nickname(message: Message, state: FSMContext):
-    await state.update_data(bedrock_nickname=message.text)
-    await message.answer(
-        "9. Прикрепите фото или документ вашего скина:",
-        reply_markup=get_back_button_keyboard()
-    )
-    await state.set_state(ApplicationStates.waiting_for_skin)
-
-@user_router.message(ApplicationStates.waiting_for_skin, F.photo | F.document)
-async def process_skin(message: Message, state: FSMContext, bot: Bot):
-    data = await state.get_data()
-    media = data.get("skin_media", [])
-    
-    if len(media) >= 2:
-        await message.answer("Можно прикрепить не более 2 файлов скинов.")
-        return
-    
-    if message.photo:
-        file_id = message.photo[-1].file_id
-        media_type = "photo"
-    else:
-        file_id = message.document.file_id
-        media_type = "document"
-    
-    media.append({"file_id": file_id, "media_type": media_type})
-    await state.update_data(skin_media=media)
-    
-    await message.answer(
-        f"Скин добавлен ({len(media)}/2). Прикрепите ещё или нажмите 'Продолжить'.",
-        reply_markup=get_media_continue_keyboard("skin", len(media), 2)
-    )
-
-@user_router.callback_query(F.data == "send_application")
-async def send_application(callback: CallbackQuery, state: FSMContext, bot: Bot):
-    data = await state.get_data()
-    
-    # Сохраняем заявку в БД
-    application_id = await add_application_with_platform(
-        callback.from_user.id,
-        data.get("platform")
-    )
-    
-    # Обновляем все поля анкеты
-    fields = [
-        ("name", "player_name"),
-        ("age", "player_age"),
-        ("about", "player_about"),
-        ("plans", "player_plans"),
-        ("community", "player_community"),
-        ("java_nickname", "player_nickname_java"),
-        ("bedrock_nickname", "player_nickname_bedrock"),
-        ("referral", "player_referral")
-    ]
-    
-    for state_field, db_field in fields:
-        if state_field in data:
-            await update_application_field(application_id, db_field, data[state_field])
-    
-    # Сохраняем медиафайлы
-    for media_type in ["skin", "projects"]:
-        if f"{media_type}_media" in data:
-            for media in data[f"{media_type}_media"]:
-                await add_application_media(
-                    application_id,
-                    media["file_id"],
-                    media["media_type"],
-                    media_type
-                )
-    
-    # Сохраняем никнеймы в файл
-    await save_players_to_file(application_id)
-    
-    # Отправляем уведомление админам
-    for admin_id in ADMIN_IDS:
-        await bot.send_message(
-            admin_id,
-            "📬 Новая заявка на вайтлист!",
-            reply_markup=InlineKeyboardMarkup(inline_keyboard=[
-                [InlineKeyboardButton(
-                    text="Подробности",
-                    callback_data=f"view_application_{application_id}"
-                )]
-            ])
-        )
-    
-    await callback.message.answer(
-        "✅ Ваша заявка отправлена на рассмотрение!",
-        reply_markup=get_back_button()
-    )
-    await state.clear()
-    await callback.answer()
@@ -1,27 +1,33 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from db import get_application_by_user_id, get_open_tickets_by_user
+from db import has_application, get_open_tickets_by_user, PAGE_NEXT, PAGE_PREV
+from callbacks import CallbackAction, APPROVE, REJECT, COMMENT, DELETE, VIEW_MY_TICKET, ADMIN_CHAT_TICKET, ADMIN_CLOSE_TICKET, CONTINUE_FROM
+
+# Главное меню бывает трех видов, поэтому клавиатуры собираются один раз.
+# Экземпляры общие для всех пользователей — не изменяйте их после получения
+ADMIN_MENU = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="📬 Заявки", callback_data="view_applications")],
+    [InlineKeyboardButton(text="🆘 Активные вопросы", callback_data="view_tickets")]
+])
+MAIN_MENU_WITH_APPLICATION = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="📋 Моя заявка", callback_data="view_application")],
+    [InlineKeyboardButton(text="🆘 Поддержка", callback_data="create_ticket")],
+    [InlineKeyboardButton(text="ℹ️ О сервере", callback_data="about_server")]
+])
+MAIN_MENU_WITHOUT_APPLICATION = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="📝 Подать заявку", callback_data="create_application")],
+    [InlineKeyboardButton(text="🆘 Поддержка", callback_data="create_ticket")],
+    [InlineKeyboardButton(text="ℹ️ О сервере", callback_data="about_server")]
+])
 
 async def get_main_menu(is_admin: bool, user_id: int) -> InlineKeyboardMarkup:
     if is_admin:
-        return InlineKeyboardMarkup(inline_keyboard=[
-            [InlineKeyboardButton(text="📬 Заявки", callback_data="view_applications")],
-            [InlineKeyboardButton(text="🆘 Активные вопросы", callback_data="view_tickets")]
-        ])
-    application = await get_application_by_user_id(user_id)
-    buttons = []
-    if application:
-        buttons.append([InlineKeyboardButton(text="📋 Моя заявка", callback_data="view_application")])
-    else:
-        buttons.append([InlineKeyboardButton(text="📝 Подать заявку", callback_data="create_application")])
-    buttons.append([InlineKeyboardButton(text="🆘 Поддержка", callback_data="create_ticket")])
-    buttons.append([InlineKeyboardButton(text="ℹ️ О сервере", callback_data="about_server")])
-    return InlineKeyboardMarkup(inline_keyboard=buttons)
+        return ADMIN_MENU
+    if await has_application(user_id):
+        return MAIN_MENU_WITH_APPLICATION
+    return MAIN_MENU_WITHOUT_APPLICATION
 
 def get_admin_menu() -> InlineKeyboardMarkup:
-    return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="📬 Заявки", callback_data="view_applications")],
-        [InlineKeyboardButton(text="🆘 Активные вопросы", callback_data="view_tickets")]
-    ])
+    return ADMIN_MENU
 
 async def get_application_menu(status: str, edit_count: int) -> InlineKeyboardMarkup:
     buttons = []
@@ -34,37 +40,16 @@ def get_application_action_keyboard(application_id: int, status: str) -> InlineK
     buttons = []
     if status == "pending":
         buttons.extend([
-            [InlineKeyboardButton(text="✅ Одобрить", callback_data=f"approve_{application_id}")],
-            [InlineKeyboardButton(text="❌ Отклонить", callback_data=f"reject_{application_id}")],
-            [InlineKeyboardButton(text="💬 Добавить комментарий", callback_data=f"comment_{application_id}")]
+            [InlineKeyboardButton(text="✅ Одобрить", callback_data=APPROVE.pack(application_id))],
+            [InlineKeyboardButton(text="❌ Отклонить", callback_data=REJECT.pack(application_id))],
+            [InlineKeyboardButton(text="💬 Добавить комментарий", callback_data=COMMENT.pack(application_id))]
         ])
     buttons.extend([
-        [InlineKeyboardButton(text="🗑 Удалить", callback_data=f"delete_{application_id}")],
+        [InlineKeyboardButton(text="🗑 Удалить", callback_data=DELETE.pack(application_id))],
         [InlineKeyboardButton(text="↩️ Назад", callback_data="back_to_main")]
     ])
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
-def get_application_status_keyboard(action: str) -> InlineKeyboardMarkup:
-    return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="↩️ Отмена", callback_data=action)]
-    ])
-
-async def get_application_description_keyboard(is_edit: bool) -> InlineKeyboardMarkup:
-    buttons = []
-    if is_edit:
-        buttons.append([InlineKeyboardButton(text="📝 Оставить прежнее описание", callback_data="keep_description")])
-    buttons.append([InlineKeyboardButton(text="↩️ Отмена", callback_data="cancel")])
-    return InlineKeyboardMarkup(inline_keyboard=buttons)
-
-async def get_application_media_keyboard(is_edit: bool) -> InlineKeyboardMarkup:
-    buttons = [
-        [InlineKeyboardButton(text="✅ Готово", callback_data="finish_application")],
-    ]
-    if is_edit:
-        buttons.append([InlineKeyboardButton(text="📎 Оставить прежние медиа", callback_data="keep_media")])
-    buttons.append([InlineKeyboardButton(text="↩️ Отмена", callback_data="cancel")])
-    return InlineKeyboardMarkup(inline_keyboard=buttons)
-
 def get_user_ticket_keyboard() -> InlineKeyboardMarkup:
     """Создает клавиатуру для пользователя в чате тикета"""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -74,7 +59,7 @@ def get_user_ticket_keyboard() -> InlineKeyboardMarkup:
 
 def get_user_tickets_menu(tickets: list) -> InlineKeyboardMarkup:
     buttons = [
-        [InlineKeyboardButton(text=f"🆘 Вопрос #{ticket[0]}", callback_data=f"view_my_ticket_{ticket[0]}")]
+        [InlineKeyboardButton(text=f"🆘 Вопрос #{ticket[0]}", callback_data=VIEW_MY_TICKET.pack(ticket[0]))]
         for ticket in tickets
     ]
     buttons.append([InlineKeyboardButton(text="↩️ Назад", callback_data="create_ticket")])
@@ -85,6 +70,18 @@ def get_back_button() -> InlineKeyboardMarkup:
         [InlineKeyboardButton(text="↩️ Назад", callback_data="back_to_main")]
     ])
 
+def get_pagination_row(action: CallbackAction, first_id: int, last_id: int, has_prev: bool, has_next: bool, *args) -> list:
+    """
+    Кнопки перехода между страницами; курсор — id крайней строки текущей страницы.
+    args — аргументы действия перед направлением и курсором, например статус заявок
+    """
+    row = []
+    if has_prev:
+        row.append(InlineKeyboardButton(text="⬅️ Назад", callback_data=action.pack(*args, PAGE_PREV, first_id)))
+    if has_next:
+        row.append(InlineKeyboardButton(text="Вперёд ➡️", callback_data=action.pack(*args, PAGE_NEXT, last_id)))
+    return row
+
 def get_support_menu() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="💬 Задать новый вопрос", callback_data="new_ticket")],
@@ -97,9 +94,9 @@ def get_admin_ticket_keyboard(ticket_id: int, in_chat: bool = False) -> InlineKe
     buttons = []
     
     if not in_chat:
-        buttons.append([InlineKeyboardButton(text="💬 Перейти в чат с пользователем", callback_data=f"admin_chat_ticket_{ticket_id}")])
+        buttons.append([InlineKeyboardButton(text="💬 Перейти в чат с пользователем", callback_data=ADMIN_CHAT_TICKET.pack(ticket_id))])
     
-    buttons.append([InlineKeyboardButton(text="✅ Закрыть вопрос", callback_data=f"admin_close_ticket_{ticket_id}")])
+    buttons.append([InlineKeyboardButton(text="✅ Закрыть вопрос", callback_data=ADMIN_CLOSE_TICKET.pack(ticket_id))])
     
     if in_chat:
         buttons.append([InlineKeyboardButton(text="↩️ Вернуться к списку вопросов", callback_data="view_tickets")])
@@ -141,9 +138,9 @@ def get_media_continue_keyboard(media_type: str, current_count: int, max_count:
     """Клавиатура для добавления медиафайлов с текущим счетчиком"""
     buttons = []
     if current_count >= max_count:
-        buttons.append([InlineKeyboardButton(text="✅ Продолжить", callback_data=f"continue_from_{media_type}")])
+        buttons.append([InlineKeyboardButton(text="✅ Продолжить", callback_data=CONTINUE_FROM.pack(media_type))])
     else:
-        buttons.append([InlineKeyboardButton(text=f"✅ Продолжить ({current_count}/{max_count})", callback_data=f"continue_from_{media_type}")])
+        buttons.append([InlineKeyboardButton(text=f"✅ Продолжить ({current_count}/{max_count})", callback_data=CONTINUE_FROM.pack(media_type))])
     buttons.append([InlineKeyboardButton(text="↩️ Назад", callback_data="back_to_previous_step")])
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
@@ -151,6 +148,6 @@ def get_application_review_keyboard() -> InlineKeyboardMarkup:
     """Клавиатура для просмотра и отправки заявки"""
     return InlineKeyboardMarkup(inline_keyboard=[
         [InlineKeyboardButton(text="✅ Отправить заявку", callback_data="send_application")],
-        [InlineKeyboardButton(text="↩️ Редактировать", callback_data="edit_application_form")],
-        [InlineKeyboardButton(text="❌ Отменить", callback_data="cancel_application")]
+        [InlineKeyboardButton(text="↩️ Назад", callback_data="back_to_previous_step")],
+        [InlineKeyboardButton(text="❌ Отменить", callback_data="cancel")]
     ])
\ No newline at end of file
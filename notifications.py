@@ -0,0 +1,222 @@
+"""Фоновая рассылка уведомлений админам с учетом лимитов Telegram"""
+
+import asyncio
+import logging
+import time
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import InputMediaDocument, InputMediaPhoto, InputMediaVideo
+
+logger = logging.getLogger(__name__)
+
+# Лимиты Bot API: около 30 сообщений в секунду всего и 1 в секунду в один чат
+GLOBAL_RATE = 30
+CHAT_RATE = 1
+MAX_RETRIES = 3
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше capacity про запас"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+class Notifier:
+    """
+    Отправляет уведомления в фоне: все получатели обслуживаются параллельно,
+    сообщения одному чату уходят по порядку. При RetryAfter отправка
+    повторяется после указанной паузы.
+    """
+
+    def __init__(self, global_rate: float = GLOBAL_RATE, chat_rate: float = CHAT_RATE,
+                 max_retries: int = MAX_RETRIES):
+        self.chat_rate = chat_rate
+        self.max_retries = max_retries
+        self._global_bucket = TokenBucket(global_rate)
+        self._chat_buckets = {}
+        self._chat_locks = {}
+        self._tasks = set()
+
+    def notify(self, chat_ids, send, description: str = "уведомление"):
+        """
+        Планирует send(chat_id) для каждого чата и сразу возвращает управление.
+
+        :param send: корутинная функция, выполняющая один вызов Bot API
+        """
+        for chat_id in dict.fromkeys(chat_ids):
+            task = asyncio.create_task(self._deliver(chat_id, send, description))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _deliver(self, chat_id: int, send, description: str):
+        lock = self._chat_locks.setdefault(chat_id, asyncio.Lock())
+        bucket = self._chat_buckets.setdefault(chat_id, TokenBucket(self.chat_rate))
+        async with lock:
+            for attempt in range(self.max_retries + 1):
+                await bucket.acquire()
+                await self._global_bucket.acquire()
+                try:
+                    await send(chat_id)
+                    logger.info(f"{description.capitalize()} отправлено в чат {chat_id}")
+                    return
+                except TelegramRetryAfter as e:
+                    if attempt == self.max_retries:
+                        break
+                    logger.warning(f"Лимит Telegram для чата {chat_id}, повтор через {e.retry_after} с")
+                    await asyncio.sleep(e.retry_after)
+                except Exception as e:
+                    logger.error(f"Ошибка отправки ({description}) в чат {chat_id}: {e}")
+                    return
+            logger.error(f"Не удалось отправить ({description}) в чат {chat_id}: исчерпаны повторы")
+
+    async def drain(self, timeout: float = 10):
+        """Ждет отправки запланированных уведомлений, например перед остановкой"""
+        if self._tasks:
+            await asyncio.wait(set(self._tasks), timeout=timeout)
+
+notifier = Notifier()
+
+# Сообщения тикета, пришедшие в течение окна, отправляются одной сводкой
+TICKET_DIGEST_WINDOW = 3
+MEDIA_GROUP_SIZE = 10
+MAX_MESSAGE_LENGTH = 4096
+
+def ticket_content_sender(bot, message_type: str, content: str, title: str, caption: str = None, reply_markup=None):
+    """
+    Функция отправки сообщения тикета одному чату для notifier.notify:
+    текст приходит вместе с заголовком, медиа — с заголовком в подписи
+    """
+    if caption:
+        media_caption = f"{title}\n{caption}"
+    else:
+        media_caption = title
+
+    async def send(chat_id: int):
+        if message_type == "text":
+            await bot.send_message(chat_id, f"{title}:\n{content}", reply_markup=reply_markup)
+        elif message_type == "sticker":
+            await bot.send_sticker(chat_id, content, reply_markup=reply_markup)
+        elif message_type == "photo":
+            await bot.send_photo(chat_id, content, caption=media_caption, reply_markup=reply_markup)
+        elif message_type == "video":
+            await bot.send_video(chat_id, content, caption=media_caption, reply_markup=reply_markup)
+        elif message_type == "document":
+            await bot.send_document(chat_id, content, caption=media_caption, reply_markup=reply_markup)
+    return send
+
+def plural_messages(count: int) -> str:
+    if count % 10 == 1 and count % 100 != 11:
+        return f"{count} новое сообщение"
+    if 2 <= count % 10 <= 4 and not 12 <= count % 100 <= 14:
+        return f"{count} новых сообщения"
+    return f"{count} новых сообщений"
+
+class TicketDigest:
+    """
+    Копит сообщения тикета в течение window секунд и отправляет получателям
+    одно сообщение: одиночное — как есть, несколько — сводкой с текстами
+    и медиа, собранными в альбомы
+    """
+
+    def __init__(self, notifier: Notifier, window: float = TICKET_DIGEST_WINDOW):
+        self.notifier = notifier
+        self.window = window
+        self._buffers = {}
+
+    def add(self, bot, ticket_id: int, chat_ids, username: str, title: str,
+            message_type: str, content: str, caption: str = None, reply_markup=None):
+        """
+        Добавляет сообщение в буфер тикета. Заголовок и клавиатура берутся
+        из первого сообщения окна, получатели объединяются
+        """
+        buffer = self._buffers.get(ticket_id)
+        if buffer is None:
+            buffer = self._buffers[ticket_id] = {
+                "bot": bot,
+                "username": username,
+                "title": title,
+                "reply_markup": reply_markup,
+                "chat_ids": {},
+                "items": [],
+            }
+            buffer["task"] = asyncio.create_task(self._flush_later(ticket_id))
+        buffer["chat_ids"].update(dict.fromkeys(chat_ids))
+        buffer["items"].append((message_type, content, caption))
+
+    async def _flush_later(self, ticket_id: int):
+        # Отмена не отправляет буфер: при остановке это делает flush_all
+        await asyncio.sleep(self.window)
+        self.flush(ticket_id)
+
+    def flush(self, ticket_id: int):
+        buffer = self._buffers.pop(ticket_id, None)
+        if not buffer or not buffer["chat_ids"]:
+            return
+        bot, items, chat_ids = buffer["bot"], buffer["items"], list(buffer["chat_ids"])
+        description = f"сообщения вопроса #{ticket_id}"
+        if len(items) == 1 and items[0][0] != "sticker":
+            message_type, content, caption = items[0]
+            self.notifier.notify(
+                chat_ids,
+                ticket_content_sender(bot, message_type, content, buffer["title"], caption, buffer["reply_markup"]),
+                description
+            )
+            return
+
+        header = f"💬 {plural_messages(len(items))} в вопросе #{ticket_id} от {buffer['username']}"
+        texts = [content for message_type, content, _ in items if message_type == "text"]
+        if texts:
+            header += "\n\n" + "\n".join(texts)
+        if len(header) > MAX_MESSAGE_LENGTH:
+            header = header[:MAX_MESSAGE_LENGTH - 1] + "…"
+        reply_markup = buffer["reply_markup"]
+        self.notifier.notify(chat_ids, lambda chat_id: bot.send_message(chat_id, header, reply_markup=reply_markup), description)
+
+        # Фото и видео можно смешивать в одном альбоме, документы — только с документами
+        for media_types in (("photo", "video"), ("document",)):
+            media = [item for item in items if item[0] in media_types]
+            for start in range(0, len(media), MEDIA_GROUP_SIZE):
+                chunk = media[start:start + MEDIA_GROUP_SIZE]
+                if len(chunk) == 1:
+                    message_type, content, caption = chunk[0]
+                    sender = ticket_content_sender(bot, message_type, content, f"#{ticket_id}", caption)
+                else:
+                    sender = album_sender(bot, chunk)
+                self.notifier.notify(chat_ids, sender, description)
+        for message_type, content, _ in items:
+            if message_type == "sticker":
+                self.notifier.notify(chat_ids, lambda chat_id, sticker=content: bot.send_sticker(chat_id, sticker), description)
+
+    def flush_all(self):
+        """Отправляет все накопленные буферы сразу, не дожидаясь окна; вызывается перед остановкой"""
+        for ticket_id in list(self._buffers):
+            buffer = self._buffers.get(ticket_id)
+            if buffer:
+                buffer["task"].cancel()
+            self.flush(ticket_id)
+
+def album_sender(bot, items):
+    """Функция отправки нескольких медиа одним альбомом"""
+    builder_types = {
+        "photo": InputMediaPhoto,
+        "video": InputMediaVideo,
+        "document": InputMediaDocument,
+    }
+    media = [builder_types[message_type](media=content, caption=caption) for message_type, content, caption in items]
+
+    async def send(chat_id: int):
+        await bot.send_media_group(chat_id, media)
+    return send
+
+ticket_digest = TicketDigest(notifier)
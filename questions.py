@@ -0,0 +1,127 @@
+"""Каталог вопросов анкеты из questions.md"""
+
+import logging
+import os
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+QUESTIONS_FILE = "questions.md"
+# Как часто проверять mtime файла, секунд
+QUESTIONS_CHECK_INTERVAL = 5
+
+DEFAULT_POLICY = "Перед началом заполнения заявки, пожалуйста, ознакомьтесь с политикой конфиденциальности и правилами сервера."
+
+QUESTION_PATTERN = re.compile(r"^(\d+)\.\s+(.*)$")
+BUTTONS_MARKER = "*Кнопки:*"
+
+def strip_comment(line: str) -> str:
+    """Убирает комментарий для разработчика: строку с # в начале или хвост после ' #'"""
+    if line.lstrip().startswith("#"):
+        return ""
+    return re.sub(r"\s+#.*$", "", line).rstrip()
+
+def parse_questions(text: str, steps):
+    """
+    Разбирает questions.md и возвращает (policy, {шаг: текст вопроса}).
+
+    Политика — все, что стоит до первого вопроса. Вопрос — заголовок
+    с номером и подсказка под ним до списка кнопок; номер N относится
+    к N-му шагу из steps.
+    """
+    policy_lines = []
+    questions = {}
+    number = None
+    question_lines = []
+
+    def flush():
+        if number is None:
+            return
+        if 1 <= number <= len(steps):
+            questions[steps[number - 1]] = "\n".join(question_lines).replace("**", "").strip()
+        else:
+            logger.warning(f"Вопрос {number} из файла не соответствует ни одному шагу анкеты")
+
+    in_buttons = False
+    for raw_line in text.splitlines():
+        line = strip_comment(raw_line)
+        if raw_line.strip() == "---":
+            continue
+        match = QUESTION_PATTERN.match(line.strip())
+        if match:
+            flush()
+            number = int(match.group(1))
+            question_lines = [match.group(2)]
+            in_buttons = False
+            continue
+        if number is None:
+            if line or policy_lines:
+                policy_lines.append(line)
+            continue
+        if line.strip() == BUTTONS_MARKER:
+            in_buttons = True
+        if not in_buttons and line.strip():
+            question_lines.append(line.strip())
+    flush()
+    policy = "\n".join(policy_lines).strip()
+    # Несколько пустых строк подряд после удаления комментариев схлопываются
+    policy = re.sub(r"\n{3,}", "\n\n", policy)
+    return policy, questions
+
+class QuestionCatalog:
+    """
+    Вопросы анкеты, разобранные один раз. Файл перечитывается, только если
+    изменилось его время модификации; mtime проверяется не чаще, чем раз
+    в check_interval секунд.
+    """
+
+    def __init__(self, path: str = QUESTIONS_FILE, check_interval: float = QUESTIONS_CHECK_INTERVAL, steps=()):
+        self.path = path
+        self.check_interval = check_interval
+        self._steps = tuple(steps)
+        self._mtime = None
+        self._checked_at = 0
+        self._policy = DEFAULT_POLICY
+        self._questions = {}
+
+    def set_steps(self, steps):
+        """Задает шаги анкеты в порядке нумерации вопросов; файл будет перечитан"""
+        self._steps = tuple(steps)
+        self._mtime = None
+
+    def refresh(self):
+        """Перечитывает файл, если он изменился"""
+        now = time.monotonic()
+        if self._mtime is not None and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            if mtime == self._mtime:
+                return
+            with open(self.path, "r", encoding="utf-8") as file:
+                policy, questions = parse_questions(file.read(), self._steps)
+        except Exception as e:
+            if self._mtime is None:
+                # Не повторяем чтение на каждом шаге, пока файл не появится
+                self._mtime = 0
+            logger.error(f"Ошибка при чтении файла с вопросами {self.path}: {e}")
+            return
+        self._mtime = mtime
+        self._policy = policy or DEFAULT_POLICY
+        self._questions = questions
+        logger.info(f"Загружено вопросов анкеты: {len(questions)}")
+        missing = [step for step in self._steps if step not in questions]
+        if missing:
+            logger.warning(f"В {self.path} нет вопросов для шагов анкеты: {', '.join(missing)}")
+
+    def policy(self) -> str:
+        self.refresh()
+        return self._policy
+
+    def question(self, step: str, default: str) -> str:
+        self.refresh()
+        return self._questions.get(step, default)
+
+question_catalog = QuestionCatalog()
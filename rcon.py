@@ -0,0 +1,215 @@
+"""Асинхронный клиент Source RCON для консоли Minecraft-сервера"""
+
+import asyncio
+import logging
+import struct
+import time
+
+logger = logging.getLogger(__name__)
+
+RCON_PORT = 25575
+RCON_TIMEOUT = 5
+RCON_MAX_BACKOFF = 30
+
+# Типы пакетов протокола
+SERVERDATA_AUTH = 3
+SERVERDATA_AUTH_RESPONSE = 2
+SERVERDATA_EXECCOMMAND = 2
+SERVERDATA_RESPONSE_VALUE = 0
+
+# Сервер отвечает пакетами до 4096 байт тела, запросы ограничены 1446 байтами
+MAX_PACKET_SIZE = 4096 + 10
+MAX_COMMAND_SIZE = 1446
+# Пакет неизвестного типа: сервер отвечает на него одним пакетом с тем же id
+# уже после всех фрагментов ответа на предыдущую команду
+SENTINEL_PACKET_TYPE = SERVERDATA_RESPONSE_VALUE
+
+class RconError(Exception):
+    """Сервер недоступен или не ответил"""
+
+class RconAuthError(RconError):
+    """Сервер отклонил пароль"""
+
+def encode_packet(request_id: int, packet_type: int, body: str) -> bytes:
+    payload = struct.pack("<ii", request_id, packet_type) + body.encode("utf-8") + b"\x00\x00"
+    return struct.pack("<i", len(payload)) + payload
+
+async def read_packet(reader: asyncio.StreamReader):
+    """Читает один пакет и возвращает (request_id, packet_type, body)"""
+    (length,) = struct.unpack("<i", await reader.readexactly(4))
+    if not 10 <= length <= MAX_PACKET_SIZE:
+        raise RconError(f"некорректная длина пакета {length}")
+    data = await reader.readexactly(length)
+    request_id, packet_type = struct.unpack("<ii", data[:8])
+    return request_id, packet_type, data[8:-2].decode("utf-8", errors="replace")
+
+class RconClient:
+    """
+    Постоянное авторизованное соединение с RCON.
+
+    Команды можно отправлять пачкой без ожидания ответов (commands), ответы
+    сопоставляются с запросами по request_id. Длинный ответ сервер делит на
+    несколько пакетов, поэтому за каждой командой идет пакет-маркер: фрагменты
+    копятся до ответа на маркер и склеиваются. При обрыве соединение
+    восстанавливается при следующей команде; неудачные подключения повторяются
+    не чаще, чем позволяет экспоненциальная задержка.
+    """
+
+    def __init__(self, host: str, port: int = RCON_PORT, password: str = "",
+                 timeout: float = RCON_TIMEOUT, max_backoff: float = RCON_MAX_BACKOFF):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self._reader = None
+        self._writer = None
+        self._reader_task = None
+        self._pending = {}
+        self._fragments = {}
+        self._sentinels = {}
+        self._next_id = 0
+        self._connect_lock = asyncio.Lock()
+        self._backoff = 0
+        self._retry_at = 0
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    def _new_id(self) -> int:
+        # id должен быть положительным: -1 сервер возвращает при ошибке авторизации
+        self._next_id = self._next_id % 0x7FFFFFFF + 1
+        return self._next_id
+
+    async def connect(self):
+        async with self._connect_lock:
+            if self.connected:
+                return
+            delay = self._retry_at - time.monotonic()
+            if delay > 0:
+                raise RconError(f"RCON недоступен, повтор через {delay:.0f} с")
+            try:
+                await self._open()
+            except Exception as e:
+                self._backoff = min(self._backoff * 2 or 1, self.max_backoff)
+                self._retry_at = time.monotonic() + self._backoff
+                await self._drop_connection()
+                logger.error(f"Не удалось подключиться к RCON {self.host}:{self.port}: {e}")
+                if isinstance(e, RconError):
+                    raise
+                raise RconError(str(e)) from e
+            self._backoff = 0
+            self._retry_at = 0
+            logger.info(f"Подключено к RCON {self.host}:{self.port}")
+
+    async def _open(self):
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+        auth_id = self._new_id()
+        self._writer.write(encode_packet(auth_id, SERVERDATA_AUTH, self.password))
+        await self._writer.drain()
+        while True:
+            request_id, packet_type, _ = await asyncio.wait_for(read_packet(self._reader), self.timeout)
+            if packet_type != SERVERDATA_AUTH_RESPONSE:
+                # Часть серверов сначала шлет пустой RESPONSE_VALUE
+                continue
+            if request_id == -1 or request_id != auth_id:
+                raise RconAuthError("неверный пароль RCON")
+            break
+        self._reader_task = asyncio.create_task(self._read_responses(self._reader))
+
+    async def _read_responses(self, reader: asyncio.StreamReader):
+        try:
+            while True:
+                request_id, _, body = await read_packet(reader)
+                if request_id in self._sentinels:
+                    # Ответ на маркер: все фрагменты ответа на команду уже пришли
+                    command_id = self._sentinels.pop(request_id)
+                    future = self._pending.pop(command_id, None)
+                    body = "".join(self._fragments.pop(command_id, ()))
+                    if future and not future.done():
+                        future.set_result(body)
+                elif request_id in self._pending:
+                    self._fragments.setdefault(request_id, []).append(body)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Соединение RCON потеряно: {e!r}")
+        finally:
+            # После переподключения старая задача не должна трогать новое соединение
+            if self._reader is reader:
+                self._reader_task = None
+                self._fail_pending(RconError("соединение RCON потеряно"))
+                await self._drop_connection()
+
+    def _fail_pending(self, error: Exception):
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+        self._fragments.clear()
+        self._sentinels.clear()
+
+    async def _drop_connection(self):
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def commands(self, commands: list) -> list:
+        """Отправляет команды одним пакетом записи и возвращает ответы в том же порядке"""
+        for command in commands:
+            if len(command.encode("utf-8")) > MAX_COMMAND_SIZE:
+                raise RconError(f"команда длиннее {MAX_COMMAND_SIZE} байт")
+        await self.connect()
+        writer = self._writer
+        if writer is None:
+            raise RconError("соединение RCON потеряно")
+        loop = asyncio.get_running_loop()
+        futures = []
+        packets = []
+        for command in commands:
+            request_id = self._new_id()
+            sentinel_id = self._new_id()
+            future = loop.create_future()
+            self._pending[request_id] = future
+            self._sentinels[sentinel_id] = request_id
+            futures.append((request_id, sentinel_id, future))
+            packets.append(encode_packet(request_id, SERVERDATA_EXECCOMMAND, command))
+            packets.append(encode_packet(sentinel_id, SENTINEL_PACKET_TYPE, ""))
+        try:
+            writer.write(b"".join(packets))
+            await writer.drain()
+            return list(await asyncio.wait_for(
+                asyncio.gather(*(future for _, _, future in futures)), self.timeout
+            ))
+        except asyncio.TimeoutError:
+            raise RconError(f"RCON не ответил за {self.timeout} с")
+        except OSError as e:
+            raise RconError(f"ошибка отправки команды RCON: {e}")
+        finally:
+            for request_id, sentinel_id, future in futures:
+                self._pending.pop(request_id, None)
+                self._fragments.pop(request_id, None)
+                self._sentinels.pop(sentinel_id, None)
+                if future.done() and not future.cancelled():
+                    future.exception()
+
+    async def command(self, command: str) -> str:
+        return (await self.commands([command]))[0]
+
+    async def close(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._reader_task = None
+        self._fail_pending(RconError("клиент RCON закрыт"))
+        await self._drop_connection()
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+# Модули бота лежат в корне репозитория и импортируются как верхнеуровневые
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import db  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Путь к чистой базе; кэши модуля db сбрасываются между тестами"""
+    db._user_cache.clear()
+    db._has_application_cache.clear()
+    yield str(tmp_path / "bot.db")
+    db._user_cache.clear()
+    db._has_application_cache.clear()
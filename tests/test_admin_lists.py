@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+import db
+
+PAGE_SIZE = 10
+REPEATS = 50
+
+
+async def _fill(rows: int):
+    async with db._write() as connection:
+        await connection.executemany(
+            'INSERT INTO users (user_id, username, created_at) VALUES (?, ?, ?)',
+            [(user_id, f"user{user_id}", "2024-01-01") for user_id in range(1, rows + 1)]
+        )
+        await connection.executemany(
+            'INSERT INTO applications (user_id, status, created_at, edit_count) VALUES (?, ?, ?, 0)',
+            [(user_id, "pending", f"2024-01-01T{user_id // 3600 % 24:02d}:{user_id // 60 % 60:02d}:{user_id % 60:02d}")
+             for user_id in range(1, rows + 1)]
+        )
+        await connection.executemany(
+            'INSERT INTO tickets (user_id, status, created_at) VALUES (?, ?, ?)',
+            [(user_id, "open", "2024-01-01") for user_id in range(1, rows + 1)]
+        )
+
+
+async def _render_pages() -> float:
+    started = time.perf_counter()
+    for _ in range(REPEATS):
+        page = await db.get_application_list("pending", limit=PAGE_SIZE)
+        await db.get_application_list("pending", page[-1][0], db.PAGE_NEXT, PAGE_SIZE)
+        await db.get_open_ticket_list(limit=PAGE_SIZE)
+    return time.perf_counter() - started
+
+
+def _measure(path: str, rows: int) -> float:
+    async def scenario():
+        await db.init_db(path)
+        try:
+            await _fill(rows)
+            return await _render_pages()
+        finally:
+            await db.close_db()
+
+    return asyncio.run(scenario())
+
+
+def test_list_page_cost_is_flat(tmp_path):
+    small = _measure(str(tmp_path / "small.db"), 100)
+    large = _measure(str(tmp_path / "large.db"), 10000)
+    print(f"Страница списка: 100 строк {small / REPEATS * 1000:.2f} мс, 10000 строк {large / REPEATS * 1000:.2f} мс")
+    # При полном проходе таблицы разница была бы на два порядка
+    assert large < small * 5
+
+
+def test_list_rows_carry_usernames(db_path):
+    async def scenario():
+        await db.init_db(db_path)
+        try:
+            await _fill(3)
+            return await db.get_application_list("pending")
+        finally:
+            await db.close_db()
+
+    rows = asyncio.run(scenario())
+    assert [(row[0], row[2]) for row in rows] == [(1, "user1"), (2, "user2"), (3, "user3")]
@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+import aiosqlite
+
+import db
+
+QUERIES = 300
+
+
+async def _per_call_lookups(path: str, user_id: int):
+    # Так база работала до пула: новое соединение на каждый запрос
+    for _ in range(QUERIES):
+        async with aiosqlite.connect(path) as connection:
+            async with connection.execute(
+                'SELECT user_id, username, created_at FROM users WHERE user_id = ?', (user_id,)
+            ) as cursor:
+                await cursor.fetchone()
+
+
+async def _pooled_lookups(user_id: int):
+    for _ in range(QUERIES):
+        async with db._read() as connection:
+            async with connection.execute(
+                'SELECT user_id, username, created_at FROM users WHERE user_id = ?', (user_id,)
+            ) as cursor:
+                await cursor.fetchone()
+
+
+def test_pool_reuses_connections(db_path):
+    async def scenario():
+        await db.init_db(db_path, readers=2)
+        try:
+            pool = db._get_pool()
+            seen = set()
+            for _ in range(10):
+                async with db._read() as connection:
+                    seen.add(id(connection))
+            assert len(seen) <= pool.readers
+        finally:
+            await db.close_db()
+
+    asyncio.run(scenario())
+
+
+def test_pool_faster_than_connection_per_call(db_path):
+    async def scenario():
+        await db.init_db(db_path)
+        try:
+            await db.add_user(1, "player")
+            started = time.perf_counter()
+            await _per_call_lookups(db_path, 1)
+            per_call = time.perf_counter() - started
+            started = time.perf_counter()
+            await _pooled_lookups(1)
+            pooled = time.perf_counter() - started
+        finally:
+            await db.close_db()
+        return per_call, pooled
+
+    per_call, pooled = asyncio.run(scenario())
+    print(f"{QUERIES} запросов: соединение на вызов {per_call:.3f} c, пул {pooled:.3f} c")
+    assert pooled < per_call
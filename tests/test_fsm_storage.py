@@ -0,0 +1,123 @@
+import asyncio
+import time
+
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+import db
+import fsm_storage
+from fsm_storage import SQLiteStorage
+
+READS = 2000
+
+
+def _key(user_id: int) -> StorageKey:
+    return StorageKey(bot_id=1, chat_id=user_id, user_id=user_id)
+
+
+def _run(db_path, scenario):
+    async def run():
+        await db.init_db(db_path)
+        try:
+            return await scenario()
+        finally:
+            await db.close_db()
+    return asyncio.run(run())
+
+
+def test_state_survives_restart(db_path):
+    async def fill():
+        storage = SQLiteStorage()
+        await storage.set_state(_key(1), "ApplicationFormStates:age")
+        await storage.update_data(_key(1), {"name": "Стив", "form_history": ["name"]})
+        await storage.close()
+
+    async def restore():
+        storage = SQLiteStorage()
+        try:
+            return await storage.get_state(_key(1)), await storage.get_data(_key(1))
+        finally:
+            await storage.close()
+
+    _run(db_path, fill)
+    assert _run(db_path, restore) == ("ApplicationFormStates:age", {"name": "Стив", "form_history": ["name"]})
+
+
+def test_abandoned_form_expires(db_path, monkeypatch):
+    async def scenario():
+        storage = SQLiteStorage(ttl=60)
+        await storage.set_state(_key(1), "ApplicationFormStates:about")
+        await storage.set_state(_key(2), "ApplicationFormStates:age")
+        storage._cache.clear()
+        now = time.time()
+        async with db._write() as connection:
+            await connection.execute(
+                'UPDATE fsm_storage SET updated_at = ? WHERE key LIKE ?', (now - 120, "%:1:1:%")
+            )
+        expired = await storage.get_state(_key(1))
+        purged = await storage.purge_expired()
+        fresh = await storage.get_state(_key(2))
+        await storage.close()
+        return expired, purged, fresh
+
+    assert _run(db_path, scenario) == (None, 1, "ApplicationFormStates:age")
+
+
+def test_parallel_updates_are_not_lost(db_path):
+    async def scenario():
+        storage = SQLiteStorage()
+        await asyncio.gather(*(storage.update_data(_key(1), {f"media_{i}": i}) for i in range(50)))
+        storage._cache.clear()
+        data = await storage.get_data(_key(1))
+        await storage.close()
+        return data
+
+    assert _run(db_path, scenario) == {f"media_{i}": i for i in range(50)}
+
+
+async def _read_latency(storage) -> float:
+    started = time.perf_counter()
+    for _ in range(READS):
+        await storage.get_state(_key(1))
+        await storage.get_data(_key(1))
+    return (time.perf_counter() - started) / READS
+
+
+def test_hot_reads_compared_to_memory_storage(db_path, monkeypatch):
+    data = {"name": "Стив", "age": "16", "about": "строю фермы" * 10, "form_history": ["name", "age", "about"]}
+
+    async def scenario():
+        memory = MemoryStorage()
+        await memory.set_state(_key(1), "ApplicationFormStates:plans")
+        await memory.set_data(_key(1), data)
+        memory_latency = await _read_latency(memory)
+
+        storage = SQLiteStorage()
+        await storage.set_state(_key(1), "ApplicationFormStates:plans")
+        await storage.set_data(_key(1), data)
+        storage._cache.clear()
+        started = time.perf_counter()
+        await storage.get_state(_key(1))
+        cold_latency = time.perf_counter() - started
+
+        lookups = 0
+        load = fsm_storage.get_fsm_record
+
+        async def counting_load(key):
+            nonlocal lookups
+            lookups += 1
+            return await load(key)
+
+        monkeypatch.setattr(fsm_storage, "get_fsm_record", counting_load)
+        hot_latency = await _read_latency(storage)
+        await storage.close()
+        return memory_latency, cold_latency, hot_latency, lookups
+
+    memory_latency, cold_latency, hot_latency, lookups = _run(db_path, scenario)
+    print(
+        f"get_state+get_data: MemoryStorage {memory_latency * 1e6:.1f} мкс, "
+        f"SQLiteStorage из кэша {hot_latency * 1e6:.1f} мкс, с чтением из базы {cold_latency * 1e6:.1f} мкс"
+    )
+    # Горячие ключи не обращаются к базе
+    assert lookups == 0
+    assert hot_latency < cold_latency
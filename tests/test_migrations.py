@@ -0,0 +1,153 @@
+import asyncio
+import sqlite3
+import time
+
+import db
+
+# Схема из самой первой версии бота, до edit_count и полей анкеты
+BASELINE_SCHEMA = '''
+    CREATE TABLE users (
+        user_id INTEGER PRIMARY KEY,
+        username TEXT NOT NULL
+    );
+    CREATE TABLE applications (
+        application_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        status TEXT DEFAULT 'pending',
+        description TEXT,
+        comment TEXT,
+        created_at TIMESTAMP
+    );
+    CREATE TABLE application_media (
+        media_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        application_id INTEGER,
+        file_id TEXT NOT NULL,
+        media_type TEXT NOT NULL
+    );
+    CREATE TABLE tickets (
+        ticket_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        status TEXT DEFAULT 'open',
+        admin_id INTEGER,
+        created_at TIMESTAMP
+    );
+    CREATE TABLE ticket_messages (
+        message_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ticket_id INTEGER,
+        user_id INTEGER,
+        telegram_message_id INTEGER,
+        message_type TEXT,
+        content TEXT,
+        username TEXT,
+        created_at TIMESTAMP
+    );
+'''
+
+
+def _create_baseline(path: str, applications: int = 3):
+    connection = sqlite3.connect(path)
+    connection.executescript(BASELINE_SCHEMA)
+    connection.executemany(
+        'INSERT INTO users (user_id, username) VALUES (?, ?)',
+        [(user_id, f"user{user_id}") for user_id in range(1, applications + 1)]
+    )
+    connection.executemany(
+        'INSERT INTO applications (user_id, status, description, created_at) VALUES (?, ?, ?, ?)',
+        [(user_id, "approved", f"Player{user_id}", f"2024-01-01T00:00:{user_id % 60:02d}")
+         for user_id in range(1, applications + 1)]
+    )
+    connection.execute(
+        'INSERT INTO ticket_messages (ticket_id, user_id, message_type, content) VALUES (1, 1, "text", "привет")'
+    )
+    connection.commit()
+    connection.close()
+
+
+def _columns(connection, table: str):
+    return {row[1] for row in connection.execute(f'PRAGMA table_xinfo({table})')}
+
+
+def test_baseline_database_migrates_to_latest(db_path):
+    _create_baseline(db_path)
+
+    async def scenario():
+        await db.init_db(db_path)
+        await db.close_db()
+
+    asyncio.run(scenario())
+
+    connection = sqlite3.connect(db_path)
+    try:
+        versions = [row[0] for row in connection.execute('SELECT version FROM schema_version ORDER BY version')]
+        assert versions == [version for version, _, _ in db.MIGRATIONS]
+        assert versions[-1] == db.MIGRATIONS[-1][0]
+        assert {'created_at'} <= _columns(connection, 'users')
+        assert {'edit_count', 'player_platform', 'player_nickname_java_normalized'} <= _columns(connection, 'applications')
+        assert 'media_category' in _columns(connection, 'application_media')
+        assert connection.execute('SELECT sender_type FROM ticket_messages').fetchone() == ('user',)
+        # Старые заявки сохранились вместе с данными
+        assert connection.execute('SELECT COUNT(*), MIN(edit_count) FROM applications').fetchone() == (3, 0)
+        tables = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert {'players', 'fsm_storage', 'schema_version'} <= tables
+    finally:
+        connection.close()
+
+
+def test_failed_migration_is_rolled_back(db_path, monkeypatch):
+    _create_baseline(db_path)
+
+    async def broken(connection):
+        raise RuntimeError("сбой миграции")
+
+    monkeypatch.setattr(db, "MIGRATIONS", db.MIGRATIONS[:2] + [(3, "broken", broken)])
+
+    async def scenario():
+        try:
+            await db.init_db(db_path)
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("ошибка миграции не дошла до init_db")
+        finally:
+            await db.close_db()
+
+    asyncio.run(scenario())
+
+    connection = sqlite3.connect(db_path)
+    try:
+        tables = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert 'schema_version' not in tables
+        assert 'edit_count' not in _columns(connection, 'applications')
+    finally:
+        connection.close()
+
+
+def test_restart_on_current_schema_runs_no_ddl(db_path):
+    _create_baseline(db_path, applications=20000)
+
+    async def first_start():
+        await db.init_db(db_path)
+        await db.close_db()
+
+    async def restart():
+        await db.init_db(db_path, readers=1)
+        try:
+            statements = []
+            for connection in db._get_pool()._connections:
+                await connection.set_trace_callback(statements.append)
+            # Повторная проверка версии та же, что при старте
+            started = time.perf_counter()
+            await db.init_db(db_path)
+            elapsed = time.perf_counter() - started
+        finally:
+            await db.close_db()
+        return statements, elapsed
+
+    started = time.perf_counter()
+    asyncio.run(first_start())
+    migration_time = time.perf_counter() - started
+    statements, elapsed = asyncio.run(restart())
+    print(f"Миграция 20000 заявок: {migration_time:.3f} c, старт на актуальной схеме: {elapsed * 1000:.2f} мс")
+    assert len(statements) == 1
+    assert statements[0].lstrip().upper().startswith("SELECT")
+
@@ -0,0 +1,54 @@
+import asyncio
+
+from notifications import TicketDigest
+
+
+class RecordingNotifier:
+    def __init__(self):
+        self.sent = []
+
+    def notify(self, chat_ids, sender, description):
+        self.sent.append((list(chat_ids), description))
+
+
+def test_window_sends_one_digest():
+    async def scenario():
+        notifier = RecordingNotifier()
+        digest = TicketDigest(notifier, window=0.01)
+        digest.add(None, 7, [1], "@steve", "Сообщение", "text", "привет")
+        digest.add(None, 7, [1, 2], "@steve", "Сообщение", "text", "есть кто?")
+        await asyncio.sleep(0.05)
+        return notifier.sent
+
+    assert asyncio.run(scenario()) == [([1, 2], "сообщения вопроса #7")]
+
+
+def test_cancelled_digest_sends_nothing_and_stays_cancelled():
+    async def scenario():
+        notifier = RecordingNotifier()
+        digest = TicketDigest(notifier, window=60)
+        digest.add(None, 7, [1], "@steve", "Сообщение", "text", "привет")
+        task = digest._buffers[7]["task"]
+        await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.wait([task])
+        return task.cancelled(), notifier.sent
+
+    assert asyncio.run(scenario()) == (True, [])
+
+
+def test_flush_all_sends_pending_buffers_once():
+    async def scenario():
+        notifier = RecordingNotifier()
+        digest = TicketDigest(notifier, window=60)
+        digest.add(None, 7, [1], "@steve", "Сообщение", "text", "привет")
+        digest.add(None, 8, [2], "@alex", "Сообщение", "text", "здравствуйте")
+        tasks = [buffer["task"] for buffer in digest._buffers.values()]
+        await asyncio.sleep(0)
+        digest.flush_all()
+        await asyncio.wait(tasks)
+        return notifier.sent, digest._buffers
+
+    sent, buffers = asyncio.run(scenario())
+    assert sent == [([1], "сообщения вопроса #7"), ([2], "сообщения вопроса #8")]
+    assert buffers == {}
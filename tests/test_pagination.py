@@ -0,0 +1,88 @@
+import asyncio
+
+import db
+
+PAGE_SIZE = 10
+
+
+async def _seed(rows: int):
+    """Заявки со статусами вперемешку; у части одинаковое время создания"""
+    async with db._write() as connection:
+        await connection.executemany(
+            'INSERT INTO users (user_id, username, created_at) VALUES (?, ?, ?)',
+            [(user_id, f"user{user_id}", "2024-01-01") for user_id in range(1, rows + 1)]
+        )
+        await connection.executemany(
+            'INSERT INTO applications (user_id, status, created_at, edit_count) VALUES (?, ?, ?, 0)',
+            [(user_id, "approved" if user_id % 4 == 0 else "pending",
+              f"2024-01-01T00:{user_id // 3:02d}:00") for user_id in range(1, rows + 1)]
+        )
+    async with db._read() as connection:
+        async with connection.execute(
+            "SELECT application_id FROM applications WHERE status = 'pending' ORDER BY created_at, application_id"
+        ) as cursor:
+            return [row[0] for row in await cursor.fetchall()]
+
+
+async def _page(cursor=None, direction=db.PAGE_NEXT):
+    rows = await db.get_application_list("pending", cursor, direction, PAGE_SIZE + 1)
+    rows, has_prev, has_next = db.split_page(rows, cursor, direction, PAGE_SIZE)
+    return [row[0] for row in rows], has_prev, has_next
+
+
+def _run(scenario, db_path):
+    async def run():
+        await db.init_db(db_path, readers=1)
+        try:
+            return await scenario()
+        finally:
+            await db.close_db()
+    return asyncio.run(run())
+
+
+def test_walk_forward_and_back(db_path):
+    async def scenario():
+        expected = await _seed(45)
+        forward = [await _page()]
+        while forward[-1][2]:
+            forward.append(await _page(forward[-1][0][-1], db.PAGE_NEXT))
+        backward = [forward[-1]]
+        while backward[-1][1]:
+            backward.append(await _page(backward[-1][0][0], db.PAGE_PREV))
+        return expected, forward, backward
+
+    expected, forward, backward = _run(scenario, db_path)
+    assert len(expected) > 3 * PAGE_SIZE
+    # Вперед: все заявки по порядку, без повторов и пропусков
+    assert [app_id for ids, _, _ in forward for app_id in ids] == expected
+    assert all(len(ids) == PAGE_SIZE for ids, _, _ in forward[:-1])
+    assert forward[0][1:] == (False, True)
+    assert forward[-1][1:] == (True, False)
+    assert all(page[1:] == (True, True) for page in forward[1:-1])
+    # Назад: те же страницы в обратном порядке
+    assert [ids for ids, _, _ in backward] == [ids for ids, _, _ in reversed(forward)]
+    assert backward[-1][1:] == (False, True)
+
+
+def test_deleted_rows_between_page_loads(db_path):
+    async def scenario():
+        expected = await _seed(45)
+        first = await _page()
+        second = await _page(first[0][-1], db.PAGE_NEXT)
+        # Пока админ смотрит вторую страницу, заявки с первой и третьей удаляют
+        await db.delete_application(first[0][3])
+        await db.delete_application(expected[2 * PAGE_SIZE + 1])
+        third = await _page(second[0][-1], db.PAGE_NEXT)
+        back = await _page(second[0][0], db.PAGE_PREV)
+        # Граничная заявка страницы удалена: курсор больше не находит строк
+        await db.delete_application(third[0][-1])
+        stale = await db.get_application_list("pending", third[0][-1], db.PAGE_NEXT, PAGE_SIZE + 1)
+        return expected, first, second, third, back, stale
+
+    expected, first, second, third, back, stale = _run(scenario, db_path)
+    assert third[0] == expected[2 * PAGE_SIZE:2 * PAGE_SIZE + 1] + expected[2 * PAGE_SIZE + 2:3 * PAGE_SIZE + 1]
+    assert third[1:] == (True, True)
+    assert back[0] == [app_id for app_id in first[0] if app_id != first[0][3]]
+    assert back[1:] == (False, True)
+    assert not set(third[0]) & set(second[0])
+    assert stale == []
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+import db
+
+
+@pytest.fixture
+def exports(monkeypatch):
+    """Вместо записи data/players.txt запоминает выгрузки реестра"""
+    calls = []
+
+    async def export_players(path: str = db.PLAYERS_FILE):
+        calls.append(await db.get_players())
+
+    monkeypatch.setattr(db, "export_players", export_players)
+    return calls
+
+
+async def _submit(user_id: int, nickname: str) -> int:
+    await db.add_user(user_id, f"user{user_id}")
+    application_id = await db.submit_application(user_id, {
+        "player_platform": "java",
+        "player_nickname_java": nickname,
+    }, [])
+    await db.save_players_to_file(application_id)
+    return application_id
+
+
+def _run(db_path, scenario):
+    async def run():
+        await db.init_db(db_path)
+        try:
+            return await scenario()
+        finally:
+            await db.close_db()
+    return asyncio.run(run())
+
+
+def test_pending_application_reserves_nickname(db_path, exports):
+    async def scenario():
+        await _submit(1, "Steve")
+        return await db.find_nickname_owner(" steve ", "java", 2), await db.find_nickname_owner("Steve", "java", 1)
+
+    assert _run(db_path, scenario) == (1, None)
+
+
+@pytest.mark.parametrize("release", ["reject", "delete"])
+def test_rejected_or_deleted_application_frees_nickname(db_path, exports, release):
+    async def scenario():
+        application_id = await _submit(1, "Steve")
+        if release == "reject":
+            await db.update_application_status(application_id, "rejected", "")
+        else:
+            await db.delete_application(application_id)
+        owner = await db.find_nickname_owner("Steve", "java", 2)
+        # Настоящий владелец может подать заявку с этим ником
+        await _submit(2, "Steve")
+        return owner, await db.get_players()
+
+    owner, players = _run(db_path, scenario)
+    assert owner is None
+    assert players == [("user2", "java", "Steve")]
+    # Выгрузка после освобождения уже не содержит ник
+    assert exports[1] == []
+
+
+def test_stale_registry_rows_do_not_reserve_nickname(db_path, exports):
+    async def scenario():
+        application_id = await _submit(1, "Steve")
+        # Так выглядят базы, где заявку отклонили до этого исправления
+        async with db._write() as connection:
+            await connection.execute(
+                "UPDATE applications SET status = 'rejected' WHERE application_id = ?", (application_id,)
+            )
+        return await db.find_nickname_owner("Steve", "java", 2), await db.get_players()
+
+    assert _run(db_path, scenario) == (None, [])
@@ -0,0 +1,116 @@
+import asyncio
+import re
+
+import db
+
+# Таблицы, которые растут вместе с сервером и не должны читаться целиком
+LARGE_TABLES = ("applications", "tickets", "ticket_messages", "application_media")
+# Размер синтетической базы: заметный, но быстрый для тестов
+USERS = 5000
+MESSAGES_PER_TICKET = 5
+MEDIA_PER_APPLICATION = 2
+
+
+async def _seed():
+    """Синтетическая база сервера с историей: в основном одобренные заявки и закрытые тикеты"""
+    users = range(1, USERS + 1)
+    async with db._write() as connection:
+        await connection.executemany(
+            'INSERT INTO users (user_id, username, created_at) VALUES (?, ?, ?)',
+            [(user_id, f"user{user_id}", "2024-01-01") for user_id in users]
+        )
+        await connection.executemany(
+            'INSERT INTO applications (user_id, status, created_at, edit_count, player_name, '
+            'player_platform, player_nickname_java) VALUES (?, ?, ?, 0, ?, ?, ?)',
+            [(user_id, "pending" if user_id % 20 == 0 else "approved",
+              f"2024-01-01T{user_id // 3600:02d}:{user_id // 60 % 60:02d}:{user_id % 60:02d}",
+              f"Игрок {user_id}", "java", f"Player{user_id}") for user_id in users]
+        )
+        await connection.executemany(
+            'INSERT INTO application_media (application_id, file_id, media_type, media_category) VALUES (?, ?, ?, ?)',
+            [(user_id, f"file{user_id}_{number}", "photo", "skin" if number else "project")
+             for user_id in users for number in range(MEDIA_PER_APPLICATION)]
+        )
+        await connection.executemany(
+            'INSERT INTO tickets (user_id, status, created_at) VALUES (?, ?, ?)',
+            [(user_id, "open" if user_id % 25 == 0 else "closed", "2024-01-02") for user_id in users]
+        )
+        await connection.executemany(
+            'INSERT INTO ticket_messages (ticket_id, user_id, message_type, content, sender_type, created_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            [(user_id, user_id, "text", "привет", "user", f"2024-01-02T00:00:{number:02d}")
+             for user_id in users for number in range(MESSAGES_PER_TICKET)]
+        )
+        # Статистика, по которой планировщик выбирает планы как на рабочей базе
+        await connection.execute('ANALYZE')
+
+
+async def _hot_queries():
+    await db.get_application_by_user_id(5)
+    await db.has_application(6)
+    await db.get_application_list("pending")
+    await db.get_application_list("pending", 20, db.PAGE_NEXT, 10)
+    await db.get_application_list("pending", 400, db.PAGE_PREV, 10)
+    await db.get_open_ticket_list()
+    await db.get_open_ticket_list(25, db.PAGE_NEXT, 10)
+    await db.get_open_tickets_by_user(7)
+    await db.get_ticket_by_id(4)
+    await db.get_ticket_messages(4)
+    await db.get_application_media(4)
+    await db.find_nickname_owner("player9", "java", 1)
+
+
+SQL_KEYWORDS = {"WHERE", "LEFT", "INNER", "JOIN", "ON", "GROUP", "ORDER", "LIMIT"}
+
+
+def _large_table_names(sql):
+    """Большие таблицы запроса вместе с их псевдонимами"""
+    names = set()
+    pattern = rf"\b(?:FROM|JOIN)\s+({'|'.join(LARGE_TABLES)})\b(?:\s+(?:AS\s+)?(\w+))?"
+    for table, alias in re.findall(pattern, sql, re.IGNORECASE):
+        names.add(table)
+        if alias and alias.upper() not in SQL_KEYWORDS:
+            names.add(alias)
+    return names
+
+
+def _table_scans(sql, plan):
+    """Полные проходы по большим таблицам; подзапросы с LIMIT не в счёт"""
+    names = _large_table_names(sql)
+    scans = []
+    for row in plan:
+        detail = row[-1]
+        match = re.match(r"SCAN (\w+)", detail)
+        if match and match.group(1) in names and "INDEX" not in detail:
+            scans.append(detail)
+    return scans
+
+
+def test_hot_queries_use_indexes(db_path):
+    async def scenario():
+        await db.init_db(db_path, readers=1)
+        try:
+            await _seed()
+            db._user_cache.clear()
+            db._has_application_cache.clear()
+            statements = []
+            async with db._read() as connection:
+                await connection.set_trace_callback(statements.append)
+            await _hot_queries()
+            async with db._read() as connection:
+                await connection.set_trace_callback(None)
+                selects = [sql for sql in statements if sql.lstrip().upper().startswith("SELECT")]
+                assert selects, "запросы на чтение не перехвачены"
+                problems = []
+                for sql in selects:
+                    async with connection.execute(f"EXPLAIN QUERY PLAN {sql}") as cursor:
+                        plan = await cursor.fetchall()
+                    scans = _table_scans(sql, plan)
+                    if scans:
+                        problems.append((" ".join(sql.split()), scans))
+            return problems
+        finally:
+            await db.close_db()
+
+    problems = asyncio.run(scenario())
+    assert not problems, "\n".join(f"{sql}\n  -> {scans}" for sql, scans in problems)
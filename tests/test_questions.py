@@ -0,0 +1,35 @@
+import logging
+
+from questions import QuestionCatalog, parse_questions
+
+TEXT = """Политика сервера.
+# комментарий для разработчика
+
+1. **Как к вам обращаться?**
+Можно ник. # подсказка для разработчика
+
+2. **Сколько вам лет?**
+*Кнопки:*
+- 18+
+
+3. **Лишний вопрос**
+"""
+
+
+def test_questions_follow_given_steps(caplog):
+    with caplog.at_level(logging.WARNING):
+        policy, questions = parse_questions(TEXT, ("name", "age"))
+    assert policy == "Политика сервера."
+    assert questions == {"name": "Как к вам обращаться?\nМожно ник.", "age": "Сколько вам лет?"}
+    assert "Вопрос 3" in caplog.text
+
+
+def test_catalog_reports_steps_without_questions(tmp_path, caplog):
+    path = tmp_path / "questions.md"
+    path.write_text(TEXT, encoding="utf-8")
+    catalog = QuestionCatalog(str(path), steps=("name",))
+    assert catalog.question("age", "по умолчанию") == "по умолчанию"
+    with caplog.at_level(logging.WARNING):
+        catalog.set_steps(("name", "age", "about", "plans"))
+        assert catalog.question("age", "по умолчанию") == "Сколько вам лет?"
+    assert "plans" in caplog.text
@@ -0,0 +1,203 @@
+import asyncio
+
+import pytest
+
+import rcon
+import whitelist
+from rcon import RconAuthError, RconClient, RconError, encode_packet, read_packet
+
+PASSWORD = "secret"
+# Как и ванильный сервер, тело ответа делится на пакеты по 4096 байт
+FRAGMENT_SIZE = 4096
+
+
+class FakeRconServer:
+    """Локальный Source RCON сервер с консолью whitelist"""
+
+    def __init__(self, password: str = PASSWORD):
+        self.password = password
+        self.whitelist = ["Alex"]
+        self.commands = []
+        self.connections = 0
+        self._server = None
+        self._writers = []
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.drop_clients()
+        self._server.close()
+        await self._server.wait_closed()
+
+    def drop_clients(self):
+        for writer in self._writers:
+            writer.close()
+        self._writers.clear()
+
+    def reply(self, command: str) -> str:
+        if command == "whitelist list":
+            return f"There are {len(self.whitelist)} whitelisted player(s): {', '.join(self.whitelist)}"
+        action, _, name = command.partition(" add ")
+        if action in ("whitelist", "fwhitelist"):
+            name = name.strip('"')
+            if name.startswith("Ghost"):
+                return "That player does not exist"
+            if name in self.whitelist:
+                return "Player is already whitelisted"
+            self.whitelist.append(name)
+            return f"Added {name} to the whitelist"
+        return f"Unknown command: {command}"
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        self._writers.append(writer)
+        try:
+            request_id, _, password = await read_packet(reader)
+            # Как и ванильный сервер, сначала шлем пустой RESPONSE_VALUE
+            writer.write(encode_packet(request_id, rcon.SERVERDATA_RESPONSE_VALUE, ""))
+            if password != self.password:
+                writer.write(encode_packet(-1, rcon.SERVERDATA_AUTH_RESPONSE, ""))
+                await writer.drain()
+                return
+            writer.write(encode_packet(request_id, rcon.SERVERDATA_AUTH_RESPONSE, ""))
+            await writer.drain()
+            while True:
+                request_id, packet_type, command = await read_packet(reader)
+                if packet_type != rcon.SERVERDATA_EXECCOMMAND:
+                    writer.write(encode_packet(request_id, rcon.SERVERDATA_RESPONSE_VALUE,
+                                               f"Unknown request {packet_type:x}"))
+                    await writer.drain()
+                    continue
+                self.commands.append(command)
+                reply = self.reply(command)
+                for start in range(0, max(len(reply), 1), FRAGMENT_SIZE):
+                    writer.write(encode_packet(request_id, rcon.SERVERDATA_RESPONSE_VALUE,
+                                               reply[start:start + FRAGMENT_SIZE]))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def _with_server(scenario, password: str = PASSWORD):
+    async def run():
+        server = FakeRconServer()
+        port = await server.start()
+        client = RconClient("127.0.0.1", port, password, timeout=2)
+        try:
+            return await scenario(server, client)
+        finally:
+            await client.close()
+            await server.stop()
+    return asyncio.run(run())
+
+
+def test_pipelined_commands_share_one_connection():
+    async def scenario(server, client):
+        replies = await client.commands(["whitelist add Steve", "fwhitelist add \"Big Alex\"", "whitelist add Alex"])
+        listed = await client.command("whitelist list")
+        return replies, listed, server.connections
+
+    replies, listed, connections = _with_server(scenario)
+    assert replies == [
+        "Added Steve to the whitelist",
+        "Added Big Alex to the whitelist",
+        "Player is already whitelisted",
+    ]
+    assert listed == "There are 3 whitelisted player(s): Alex, Steve, Big Alex"
+    assert connections == 1
+
+
+def test_long_reply_is_reassembled_from_fragments():
+    async def scenario(server, client):
+        server.whitelist = [f"Player{number:04d}" for number in range(1000)]
+        replies = await client.commands(["whitelist list", "whitelist add Steve"])
+        return replies, await client.command("whitelist list")
+
+    (listed, added), relisted = _with_server(scenario)
+    names = [f"Player{number:04d}" for number in range(1000)]
+    assert len(listed) > FRAGMENT_SIZE
+    assert listed == f"There are 1000 whitelisted player(s): {', '.join(names)}"
+    # Хвост длинного ответа не достался следующей команде
+    assert added == "Added Steve to the whitelist"
+    assert relisted.endswith("Player0999, Steve")
+    assert whitelist.parse_whitelist_list(relisted) == {name.lower() for name in names + ["Steve"]}
+
+
+def test_wrong_password_is_rejected():
+    async def scenario(server, client):
+        with pytest.raises(RconAuthError):
+            await client.command("whitelist list")
+        assert not client.connected
+
+    _with_server(scenario, password="wrong")
+
+
+def test_client_reconnects_after_server_drops_connection():
+    async def scenario(server, client):
+        await client.command("whitelist add Steve")
+        server.drop_clients()
+        # Ждем, пока клиент заметит обрыв
+        for _ in range(100):
+            if not client.connected:
+                break
+            await asyncio.sleep(0.01)
+        reply = await client.command("whitelist add Notch")
+        return reply, server.connections
+
+    reply, connections = _with_server(scenario)
+    assert reply == "Added Notch to the whitelist"
+    assert connections == 2
+
+
+def test_unreachable_server_backs_off():
+    async def scenario():
+        server = FakeRconServer()
+        port = await server.start()
+        await server.stop()
+        client = RconClient("127.0.0.1", port, PASSWORD, timeout=1)
+        try:
+            with pytest.raises(RconError):
+                await client.command("whitelist list")
+            with pytest.raises(RconError, match="повтор через"):
+                await client.command("whitelist list")
+        finally:
+            await client.close()
+
+    asyncio.run(scenario())
+
+
+def test_whitelist_results_follow_server_replies(monkeypatch):
+    async def scenario(server, client):
+        monkeypatch.setattr(whitelist, "_rcon", client)
+        return await whitelist.execute_whitelist_commands([
+            ("Steve", "java"), ("Ghost123", "java"), ("bad nick!", "java"), ("Alex", "java"),
+        ])
+
+    results = _with_server(scenario)
+    assert results == [
+        (True, "Added Steve to the whitelist"),
+        (False, "That player does not exist"),
+        (False, "недопустимый никнейм 'bad nick!'"),
+        (True, "Player is already whitelisted"),
+    ]
+
+
+def test_reconcile_queues_only_missing_players(monkeypatch):
+    async def approved():
+        return [("java", "Alex", None), ("both", "Steve", "Big Alex")]
+
+    async def scenario(server, client):
+        monkeypatch.setattr(whitelist, "_rcon", client)
+        monkeypatch.setattr(whitelist, "get_approved_nicknames", approved)
+        server.whitelist.append(".Big_Alex")
+        queue = whitelist.WhitelistSyncQueue(interval=0.01)
+        queued = await queue.reconcile()
+        return queued, sorted(queue._entries)
+
+    queued, entries = _with_server(scenario)
+    assert queued == 1
+    assert entries == [("java", "steve")]
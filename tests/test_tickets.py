@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+import db
+
+PARALLEL_TICKETS = 200
+
+
+@pytest.mark.parametrize("profile", sorted(db.STORAGE_PROFILES))
+def test_parallel_add_ticket_returns_own_ids(db_path, profile):
+    async def scenario():
+        await db.init_db(db_path, profile=profile)
+        try:
+            await db.add_user(1, "player")
+            await db.add_user(2, "other")
+            # Большинство тикетов от одного пользователя, часть — от другого,
+            # чтобы проверить, что каждый вызов получил id своей строки
+            owners = [2 if i % 10 == 0 else 1 for i in range(PARALLEL_TICKETS)]
+            ids = await asyncio.gather(*(db.add_ticket(user_id) for user_id in owners))
+            async with db._read() as connection:
+                async with connection.execute(
+                    'SELECT ticket_id, user_id, status FROM tickets ORDER BY ticket_id'
+                ) as cursor:
+                    rows = await cursor.fetchall()
+        finally:
+            await db.close_db()
+        return owners, ids, rows
+
+    owners, ids, rows = asyncio.run(scenario())
+    assert None not in ids
+    assert len(set(ids)) == PARALLEL_TICKETS
+    assert sorted(ids) == [row[0] for row in rows]
+    stored = {ticket_id: (user_id, status) for ticket_id, user_id, status in rows}
+    assert [stored[ticket_id] for ticket_id in ids] == [(user_id, "open") for user_id in owners]
@@ -0,0 +1,101 @@
+import asyncio
+
+import whitelist
+
+
+def test_dispatch_error_resolves_waiters_and_retries(monkeypatch):
+    calls = []
+
+    async def flaky(targets):
+        calls.append(list(targets))
+        if len(calls) == 1:
+            raise RuntimeError("консоль недоступна")
+        return [(True, "ok")] * len(targets)
+
+    monkeypatch.setattr(whitelist, "execute_whitelist_commands", flaky)
+
+    async def scenario():
+        queue = whitelist.WhitelistSyncQueue(interval=0.01)
+        monkeypatch.setattr(whitelist, "_sync_queue", queue)
+        queue.start()
+        try:
+            first = await asyncio.wait_for(whitelist.queue_whitelist([("Steve", "java")]), timeout=2)
+            # Запись осталась в очереди и прошла со второй попытки
+            for _ in range(200):
+                if not queue._entries:
+                    break
+                await asyncio.sleep(0.01)
+            return first, dict(queue._entries)
+        finally:
+            await queue.stop()
+
+    first, entries = asyncio.run(scenario())
+    assert first == [(False, "консоль недоступна")]
+    assert entries == {}
+    assert calls == [[("Steve", "java")], [("Steve", "java")]]
+
+
+def test_cancelled_queue_resolves_waiters(monkeypatch):
+    async def never(targets):
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(whitelist, "execute_whitelist_commands", never)
+
+    async def scenario():
+        queue = whitelist.WhitelistSyncQueue(interval=0.01)
+        queue.start()
+        futures = queue.add([("Steve", "java")])
+        await asyncio.sleep(0.05)
+        # Задача очереди снята посреди отправки команд
+        queue._task.cancel()
+        results = await asyncio.wait_for(asyncio.gather(*futures), timeout=2)
+        assert not queue.running
+        await queue.stop()
+        return results
+
+    assert asyncio.run(scenario()) == [(False, "синхронизация whitelist остановлена")]
+
+
+def test_failed_reconcile_does_not_stop_queue(monkeypatch):
+    class BrokenRcon:
+        async def command(self, command):
+            raise OSError("сеть недоступна")
+
+        async def commands(self, commands):
+            return [f"Added {command.split()[-1]} to the whitelist" for command in commands]
+
+    monkeypatch.setattr(whitelist, "_rcon", BrokenRcon())
+
+    async def scenario():
+        queue = whitelist.WhitelistSyncQueue(interval=0.01)
+        monkeypatch.setattr(whitelist, "_sync_queue", queue)
+        queue.start()
+        try:
+            await asyncio.sleep(0.02)
+            assert queue.running
+            return await asyncio.wait_for(whitelist.queue_whitelist([("Steve", "java")]), timeout=2)
+        finally:
+            await queue.stop()
+
+    assert asyncio.run(scenario()) == [(True, "Added Steve to the whitelist")]
+
+
+def test_truncated_whitelist_list_queues_nobody(monkeypatch):
+    class TruncatingRcon:
+        async def command(self, command):
+            # Сервер перечислил не всех игроков, которых посчитал
+            return "There are 3 whitelisted player(s): Alex, Steve"
+
+    async def approved():
+        return [("java", "Alex", None), ("java", "Steve", None), ("java", "Notch", None)]
+
+    monkeypatch.setattr(whitelist, "_rcon", TruncatingRcon())
+    monkeypatch.setattr(whitelist, "get_approved_nicknames", approved)
+
+    async def scenario():
+        queue = whitelist.WhitelistSyncQueue(interval=0.01)
+        return await queue.reconcile(), dict(queue._entries)
+
+    assert asyncio.run(scenario()) == (None, {})
+    assert whitelist.parse_whitelist_list("There are 0 whitelisted player(s):") == set()
+    assert whitelist.parse_whitelist_list("There are no whitelisted players") == set()
@@ -0,0 +1,99 @@
+import asyncio
+import stat
+import time
+
+import pytest
+
+import whitelist
+
+# Подменный screen: записывает свои аргументы, по одному в строке, и ведет
+# себя в зависимости от FAKE_SCREEN_MODE
+FAKE_SCREEN = '''#!/bin/sh
+for arg in "$@"; do
+    printf '%s\\n' "$arg" >> "{log}"
+done
+printf -- '---\\n' >> "{log}"
+case "$FAKE_SCREEN_MODE" in
+    fail) echo "No screen session found." >&2; exit 1 ;;
+    hang) sleep 30 ;;
+esac
+exit 0
+'''
+
+
+@pytest.fixture
+def fake_screen(tmp_path, monkeypatch):
+    log = tmp_path / "screen.log"
+    script = tmp_path / "screen"
+    script.write_text(FAKE_SCREEN.format(log=log))
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setitem(whitelist._settings, "binary", str(script))
+    monkeypatch.setitem(whitelist._settings, "session", "server")
+    monkeypatch.setitem(whitelist._settings, "timeout", 1)
+    monkeypatch.setattr(whitelist, "_rcon", None)
+    monkeypatch.setattr(whitelist, "_console_lock", None)
+
+    def calls():
+        if not log.exists():
+            return []
+        return [call.strip("\n").split("\n") for call in log.read_bytes().decode().split("---\n") if call.strip("\n")]
+
+    return calls
+
+
+def _run(coroutine):
+    async def scenario():
+        # Блокировка консоли привязывается к циклу событий теста
+        whitelist._console_lock = asyncio.Lock()
+        return await coroutine
+    return asyncio.run(scenario())
+
+
+def test_screen_receives_command_as_single_argument(fake_screen):
+    results = _run(whitelist.execute_whitelist_commands([("Steve", "java"), ("Big Alex", "bedrock")]))
+    assert [ok for ok, _ in results] == [True, True]
+    assert fake_screen() == [
+        ["-S", "server", "-p", "0", "-X", "stuff", "whitelist add Steve\r"],
+        ["-S", "server", "-p", "0", "-X", "stuff", 'fwhitelist add "Big Alex"\r'],
+    ]
+
+
+def test_injected_nickname_never_reaches_screen(fake_screen):
+    ok, error = _run(whitelist.execute_whitelist_command("Steve\rop Evil", "java"))
+    assert not ok
+    assert "недопустимый никнейм" in error
+    assert fake_screen() == []
+
+
+def test_screen_error_is_reported(fake_screen, monkeypatch):
+    monkeypatch.setenv("FAKE_SCREEN_MODE", "fail")
+    ok, error = _run(whitelist.execute_whitelist_command("Steve", "java"))
+    assert not ok
+    assert error == "No screen session found."
+
+
+def test_hanging_screen_times_out_without_blocking_loop(fake_screen, monkeypatch):
+    monkeypatch.setenv("FAKE_SCREEN_MODE", "hang")
+
+    async def scenario():
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.05)
+                ticks += 1
+
+        beating = asyncio.create_task(heartbeat())
+        started = time.monotonic()
+        result = await whitelist.execute_whitelist_command("Steve", "java")
+        elapsed = time.monotonic() - started
+        beating.cancel()
+        return result, elapsed, ticks
+
+    (ok, error), elapsed, ticks = _run(scenario())
+    assert not ok
+    assert error.startswith("таймаут")
+    assert elapsed < 5
+    # Пока screen висел, цикл событий продолжал обслуживать другие задачи
+    assert ticks >= 10
@@ -0,0 +1,93 @@
+import asyncio
+
+import db
+
+
+async def _write_user(user_id: int):
+    async with db._write() as connection:
+        await connection.execute(
+            'INSERT OR REPLACE INTO users (user_id, username, created_at) VALUES (?, ?, ?)',
+            (user_id, f"user{user_id}", "2024-01-01")
+        )
+
+
+def test_cancelled_writers_do_not_stall_queue(db_path):
+    async def scenario():
+        await db.init_db(db_path, profile="wal")
+        try:
+            for delay in range(8):
+                tasks = [asyncio.create_task(_write_user(i)) for i in range(20)]
+                for _ in range(delay):
+                    await asyncio.sleep(0)
+                for task in tasks[::2]:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+            # Очередь жива: следующая запись проходит
+            await asyncio.wait_for(_write_user(1000), timeout=5)
+            async with db._read() as connection:
+                async with connection.execute('SELECT 1 FROM users WHERE user_id = 1000') as cursor:
+                    assert await cursor.fetchone() is not None
+        finally:
+            await db.close_db()
+
+    asyncio.run(scenario())
+
+
+class _FailingConnection:
+    """Соединение, у которого ломается RELEASE savepoint"""
+
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, sql, *args):
+        self.statements.append(sql)
+        if sql.startswith("RELEASE"):
+            raise RuntimeError("disk I/O error")
+
+
+def test_failed_job_does_not_kill_writer():
+    async def scenario():
+        connection = _FailingConnection()
+        queue = db.WriteQueue(connection)
+        queue.start()
+        try:
+            for _ in range(3):
+                try:
+                    async with queue.transaction():
+                        pass
+                except RuntimeError as e:
+                    assert "disk I/O error" in str(e)
+                else:
+                    raise AssertionError("ошибка RELEASE не дошла до вызывающего")
+            assert not queue._task.done()
+            assert connection.statements.count("ROLLBACK") == 3
+        finally:
+            await queue.stop()
+
+    asyncio.run(scenario())
+
+
+def test_stopped_writer_fails_queued_jobs():
+    async def scenario():
+        connection = _FailingConnection()
+        queue = db.WriteQueue(connection)
+        queue.start()
+        holder = asyncio.Event()
+
+        async def blocking_job():
+            async with queue.transaction():
+                await holder.wait()
+
+        first = asyncio.create_task(blocking_job())
+        await asyncio.sleep(0.01)
+        waiting = asyncio.create_task(blocking_job())
+        await asyncio.sleep(0.01)
+        queue._task.cancel()
+        holder.set()
+        results = await asyncio.wait_for(
+            asyncio.gather(first, waiting, return_exceptions=True), timeout=5
+        )
+        for result in results:
+            assert isinstance(result, RuntimeError)
+
+    asyncio.run(scenario())
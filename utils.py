@@ -1,12 +1,22 @@
+import asyncio
 from aiogram import Bot
 from datetime import datetime
 import logging
 from typing import List, Optional, Tuple, Union
-from aiogram.types import Message, CallbackQuery
+from aiogram.types import Message, CallbackQuery, InputMediaPhoto, InputMediaVideo, InputMediaDocument
 from aiogram.fsm.context import FSMContext
+from aiogram.exceptions import TelegramBadRequest
 
 logger = logging.getLogger(__name__)
 
+# Telegram принимает в альбоме от 2 до 10 медиа
+MEDIA_GROUP_SIZE = 10
+ALBUM_MEDIA = {
+    "photo": InputMediaPhoto,
+    "video": InputMediaVideo,
+    "document": InputMediaDocument,
+}
+
 def translate_status(status: str) -> str:
     """Переводит статусы на русский язык"""
     statuses = {
@@ -26,22 +36,36 @@ def format_datetime(timestamp) -> str:
         logger.error(f"Ошибка форматирования времени {timestamp}: {e}")
         return str(timestamp)
 
-async def delete_messages(bot: Bot, user_id: int, message_ids: List[Optional[int]]) -> None:
-    """Безопасно удаляет сообщения"""
+# deleteMessages принимает не больше 100 ID за вызов
+DELETE_BATCH_SIZE = 100
+# Ссылки на фоновые удаления, чтобы задачи не собрал сборщик мусора
+_deletion_tasks = set()
+
+async def delete_messages(bot: Bot, user_id: int, message_ids: List[Optional[int]], keep: Optional[int] = None) -> None:
+    """
+    Безопасно удаляет сообщения пачками в фоне, не задерживая обработчик
+
+    :param keep: ID панели, которую нужно сохранить, даже если она есть в списке
+    """
+    message_ids = list(dict.fromkeys(msg_id for msg_id in message_ids or [] if msg_id and msg_id != keep))
     if not message_ids:
         return
-    
-    for msg_id in message_ids:
-        if not msg_id:
-            continue
+    task = asyncio.create_task(_delete_message_batches(bot, user_id, message_ids))
+    _deletion_tasks.add(task)
+    task.add_done_callback(_deletion_tasks.discard)
+
+async def _delete_message_batches(bot: Bot, user_id: int, message_ids: List[int]) -> None:
+    for start in range(0, len(message_ids), DELETE_BATCH_SIZE):
+        batch = message_ids[start:start + DELETE_BATCH_SIZE]
         try:
-            await bot.delete_message(user_id, msg_id)
+            # Уже удаленные сообщения deleteMessages пропускает сам
+            await bot.delete_messages(user_id, batch)
         except Exception as e:
             # Игнорируем ошибки для уже удаленных сообщений
             if "message to delete not found" in str(e) or "message can't be deleted" in str(e):
                 pass
             else:
-                logger.warning(f"Не удалось удалить сообщение {msg_id}: {e}")
+                logger.warning(f"Не удалось удалить сообщения {batch}: {e}")
 
 async def safe_message_delete(message: Message) -> None:
     """Безопасно удаляет одно сообщение"""
@@ -54,6 +78,60 @@ async def safe_message_delete(message: Message) -> None:
         else:
             logger.warning(f"Не удалось удалить сообщение: {e}")
 
+# Старая навигация всегда удаляла сообщение и отправляла новое
+LEGACY_CALLS_PER_NAVIGATION = 2
+
+class NavigationStats:
+    """Счетчик вызовов Bot API на переход между экранами"""
+
+    def __init__(self):
+        self.navigations = 0
+        self.edits = 0
+        self.api_calls = 0
+
+    def record(self, api_calls: int, edited: bool):
+        self.navigations += 1
+        self.api_calls += api_calls
+        if edited:
+            self.edits += 1
+
+    def summary(self) -> str:
+        average = self.api_calls / self.navigations if self.navigations else 0
+        return (
+            f"Переходов: {self.navigations}, из них правкой на месте: {self.edits}, "
+            f"вызовов API: {self.api_calls} (в среднем {average:.2f} на переход, "
+            f"при удалении и отправке было бы {LEGACY_CALLS_PER_NAVIGATION})"
+        )
+
+navigation_stats = NavigationStats()
+
+async def render_panel(callback: CallbackQuery, text: str, reply_markup=None) -> Message:
+    """
+    Показывает экран в сообщении, на кнопке которого нажали: текстовое сообщение
+    редактируется на месте, медиа и недоступные сообщения удаляются, а экран
+    отправляется заново
+    """
+    panel = callback.message
+    api_calls = 0
+    if isinstance(panel, Message) and panel.text is not None:
+        api_calls += 1
+        try:
+            edited = await panel.edit_text(text, reply_markup=reply_markup)
+            navigation_stats.record(api_calls, True)
+            return edited if isinstance(edited, Message) else panel
+        except TelegramBadRequest as e:
+            if "message is not modified" in str(e):
+                navigation_stats.record(api_calls, True)
+                return panel
+            logger.warning(f"Не удалось отредактировать панель {panel.message_id}: {e}")
+    if isinstance(panel, Message):
+        api_calls += 1
+        await safe_message_delete(panel)
+    api_calls += 1
+    message = await panel.answer(text, reply_markup=reply_markup)
+    navigation_stats.record(api_calls, False)
+    return message
+
 async def extract_id_from_callback(callback: CallbackQuery, prefix: str) -> Optional[int]:
     """Безопасно извлекает ID из callback данных"""
     try:
@@ -108,4 +186,47 @@ async def send_media_message(bot, chat_id, message_type, content, caption=None):
             return await bot.send_message(chat_id, "Неподдерживаемый тип медиа")
     except Exception as e:
         logger.error(f"Ошибка отправки медиа {message_type} пользователю {chat_id}: {e}")
-        return None 
\ No newline at end of file
+        return None
+
+def album_kind(message_type: str) -> Optional[str]:
+    """Фото и видео можно смешивать в одном альбоме, документы — только между собой"""
+    if message_type in ("photo", "video"):
+        return "visual"
+    if message_type == "document":
+        return "document"
+    return None
+
+async def send_media_batch(bot, chat_id, items) -> List[int]:
+    """
+    Отправляет сообщения по порядку: подряд идущие медиа собираются в альбомы
+    до MEDIA_GROUP_SIZE штук, текст и стикеры уходят по одному.
+
+    :param items: последовательность (message_type, content, caption)
+    :return: ID отправленных сообщений; если часть не отправилась, их меньше, чем items
+    """
+    items = list(items)
+    message_ids = []
+    start = 0
+    while start < len(items):
+        kind = album_kind(items[start][0])
+        end = start + 1
+        while end < len(items) and end - start < MEDIA_GROUP_SIZE and kind and album_kind(items[end][0]) == kind:
+            end += 1
+        chunk = items[start:end]
+        start = end
+        if len(chunk) > 1:
+            try:
+                messages = await bot.send_media_group(chat_id, [
+                    ALBUM_MEDIA[message_type](media=content, caption=caption)
+                    for message_type, content, caption in chunk
+                ])
+                message_ids.extend(message.message_id for message in messages)
+                continue
+            except Exception as e:
+                # Один битый file_id не должен терять весь альбом
+                logger.warning(f"Не удалось отправить альбом пользователю {chat_id}, отправляю по одному: {e}")
+        for message_type, content, caption in chunk:
+            message = await send_media_message(bot, chat_id, message_type, content, caption)
+            if message:
+                message_ids.append(message.message_id)
+    return message_ids
@@ -0,0 +1,358 @@
+"""Добавление игроков в whitelist сервера через RCON или консоль screen"""
+
+import asyncio
+import logging
+import os
+import re
+import signal
+import time
+from rcon import RconClient, RconError, RCON_PORT
+from db import get_approved_nicknames
+
+logger = logging.getLogger(__name__)
+
+SCREEN_BINARY = "screen"
+SCREEN_SESSION = "server"
+COMMAND_TIMEOUT = 10
+# Очередь синхронизации: период сброса, размер пачки и число попыток
+SYNC_INTERVAL = 2
+SYNC_BATCH_SIZE = 50
+SYNC_MAX_ATTEMPTS = 5
+# Префикс, с которым Floodgate записывает игроков Bedrock в whitelist.json
+BEDROCK_PREFIX = "."
+
+# Команды консоли для каждой платформы
+WHITELIST_COMMANDS = {
+    "java": "whitelist add",
+    "bedrock": "fwhitelist add",
+}
+
+# Ник Java: 3-16 символов из латиницы, цифр и "_"; gamertag Bedrock может
+# содержать пробелы, но не по краям. Перевод строки в нике выполнил бы
+# в консоли произвольную команду, поэтому всё остальное отклоняется
+NICKNAME_PATTERNS = {
+    "java": re.compile(r"[A-Za-z0-9_]{3,16}"),
+    "bedrock": re.compile(r"[A-Za-z0-9_](?:[A-Za-z0-9_ ]{1,14})[A-Za-z0-9_]"),
+}
+
+_settings = {
+    "binary": SCREEN_BINARY,
+    "session": SCREEN_SESSION,
+    "timeout": COMMAND_TIMEOUT,
+    "bedrock_prefix": BEDROCK_PREFIX,
+}
+# Ответы консоли, означающие, что игрок есть в whitelist:
+# "Added Steve to the whitelist", "Player is already whitelisted"
+SUCCESS_REPLY_PATTERN = re.compile(r"^added\b|\balready whitelisted\b", re.IGNORECASE)
+# Число игроков в начале ответа whitelist list
+LIST_COUNT_PATTERN = re.compile(r"^There are (\d+)\b", re.IGNORECASE)
+_rcon = None
+_sync_queue = None
+# screen вставляет текст в консоль посимвольно — команды не должны перемешиваться
+_console_lock = asyncio.Lock()
+
+def init_whitelist(binary: str = SCREEN_BINARY, session: str = SCREEN_SESSION, timeout: float = COMMAND_TIMEOUT,
+                   rcon_host: str = None, rcon_port: int = RCON_PORT, rcon_password: str = "",
+                   sync_interval: float = SYNC_INTERVAL, bedrock_prefix: str = BEDROCK_PREFIX):
+    """
+    Задает параметры выполнения команд и запускает очередь синхронизации.
+    Если указан rcon_host, команды идут через постоянное RCON-соединение,
+    иначе — через screen
+    """
+    global _rcon, _sync_queue
+    _settings.update(binary=binary, session=session, timeout=timeout, bedrock_prefix=bedrock_prefix)
+    if rcon_host:
+        _rcon = RconClient(rcon_host, rcon_port, rcon_password, timeout=timeout)
+    _sync_queue = WhitelistSyncQueue(interval=sync_interval)
+    _sync_queue.start()
+
+async def close_whitelist():
+    global _rcon, _sync_queue
+    if _sync_queue is not None:
+        await _sync_queue.stop()
+        _sync_queue = None
+    if _rcon is not None:
+        await _rcon.close()
+        _rcon = None
+
+def validate_nickname(nickname: str, platform: str) -> bool:
+    pattern = NICKNAME_PATTERNS.get(platform)
+    return bool(pattern and nickname and pattern.fullmatch(nickname))
+
+def build_console_command(nickname: str, platform: str) -> str:
+    """Строка для консоли сервера; ник с пробелами берется в кавычки"""
+    if " " in nickname:
+        nickname = f'"{nickname}"'
+    return f"{WHITELIST_COMMANDS[platform]} {nickname}"
+
+def application_targets(platform: str, nickname_java: str, nickname_bedrock: str) -> list:
+    """Пары (никнейм, платформа), которые нужно добавить в whitelist по заявке"""
+    targets = []
+    if platform in ("java", "both") and nickname_java:
+        targets.append((nickname_java, "java"))
+    if platform in ("bedrock", "both") and nickname_bedrock:
+        targets.append((nickname_bedrock, "bedrock"))
+    return targets
+
+def whitelist_name(nickname: str, platform: str) -> str:
+    """Имя игрока в том виде, в каком его показывает whitelist list"""
+    if platform == "bedrock":
+        return f"{_settings['bedrock_prefix']}{nickname.replace(' ', '_')}"
+    return nickname
+
+def parse_whitelist_list(reply: str) -> set:
+    """
+    Разбирает ответ whitelist list: "There are 2 whitelisted player(s): Steve, Alex".
+    Возвращает множество имен в нижнем регистре. Если имен меньше или больше,
+    чем сервер указал в начале ответа (ответ обрезан), бросает ValueError
+    """
+    names = []
+    if ":" in reply:
+        names = [name.strip().lower() for name in reply.split(":", 1)[1].split(",") if name.strip()]
+    match = LIST_COUNT_PATTERN.search(reply.strip())
+    if match and int(match.group(1)) != len(names):
+        raise ValueError(f"в ответе whitelist list {len(names)} имен из {match.group(1)}")
+    return set(names)
+
+def parse_whitelist_reply(reply: str) -> bool:
+    return bool(SUCCESS_REPLY_PATTERN.search(reply.strip()))
+
+def check_target(nickname: str, platform: str):
+    """Возвращает описание ошибки или None, если команду можно отправлять"""
+    if platform not in WHITELIST_COMMANDS:
+        logger.error(f"Неизвестная платформа для whitelist: {platform}")
+        return f"неизвестная платформа {platform}"
+    if not validate_nickname(nickname, platform):
+        logger.error(f"Недопустимый никнейм для whitelist: {nickname!r} ({platform})")
+        return f"недопустимый никнейм {nickname!r}"
+    return None
+
+async def execute_whitelist_commands(targets: list) -> list:
+    """
+    Добавляет пары (никнейм, платформа) в whitelist.
+
+    Через RCON все команды отправляются одной пачкой, и успех определяется
+    по ответу сервера; через screen они выполняются по очереди. Возвращает
+    список (успех, описание результата) в порядке targets.
+    """
+    results = [None] * len(targets)
+    commands = []
+    for i, (nickname, platform) in enumerate(targets):
+        error = check_target(nickname, platform)
+        if error:
+            results[i] = (False, error)
+        else:
+            commands.append((i, nickname, platform, build_console_command(nickname, platform)))
+    if not commands:
+        return results
+
+    if _rcon is None:
+        for i, nickname, platform, command in commands:
+            results[i] = await run_screen_command(command, nickname, platform)
+        return results
+
+    try:
+        replies = await _rcon.commands([command for *_, command in commands])
+    except RconError as e:
+        logger.error(f"Ошибка при выполнении команд whitelist через RCON: {e}")
+        for i, *_ in commands:
+            results[i] = (False, str(e))
+        return results
+    for (i, nickname, platform, _), reply in zip(commands, replies):
+        reply = reply.strip()
+        if parse_whitelist_reply(reply):
+            logger.info(f"Успешно выполнена команда whitelist для {nickname} ({platform}): {reply}")
+            results[i] = (True, reply)
+        else:
+            logger.error(f"Сервер отклонил команду whitelist для {nickname} ({platform}): {reply}")
+            results[i] = (False, reply or "пустой ответ сервера")
+    return results
+
+async def execute_whitelist_command(nickname: str, platform: str):
+    """Добавляет одного игрока в whitelist; возвращает (успех, описание результата)"""
+    return (await execute_whitelist_commands([(nickname, platform)]))[0]
+
+async def run_screen_command(command: str, nickname: str, platform: str):
+    """
+    Вставляет команду в консоль сервера через screen, не блокируя event loop.
+
+    Процесс запускается без shell, команда передается отдельным аргументом.
+    """
+    args = [_settings["binary"], "-S", _settings["session"], "-p", "0", "-X", "stuff", f"{command}\r"]
+    try:
+        async with _console_lock:
+            process = await asyncio.create_subprocess_exec(
+                *args,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True
+            )
+            try:
+                _, stderr = await asyncio.wait_for(process.communicate(), _settings["timeout"])
+            except asyncio.TimeoutError:
+                # Завершаем всю группу процессов, иначе дочерние процессы
+                # держат открытыми pipe и wait() не вернется
+                os.killpg(process.pid, signal.SIGKILL)
+                await process.wait()
+                logger.error(f"Таймаут команды whitelist для {nickname} ({platform})")
+                return False, f"таймаут {_settings['timeout']} с"
+    except Exception as e:
+        logger.error(f"Ошибка при выполнении команды whitelist: {e}")
+        return False, str(e)
+
+    if process.returncode == 0:
+        logger.info(f"Успешно выполнена команда whitelist для {nickname} ({platform})")
+        return True, command
+    error = stderr.decode(errors="replace").strip() or f"код выхода {process.returncode}"
+    logger.error(f"Ошибка выполнения команды whitelist: {error}")
+    return False, error
+
+class _SyncEntry:
+    def __init__(self, nickname: str, platform: str):
+        self.nickname = nickname
+        self.platform = platform
+        self.attempts = 0
+        self.next_at = 0
+        self.waiters = []
+
+class WhitelistSyncQueue:
+    """
+    Очередь добавления игроков в whitelist.
+
+    Никнеймы копятся и отправляются пачками раз в interval секунд; повторное
+    добавление того же ника до отправки не создает новую команду. Неудачные
+    команды повторяются с растущей задержкой до max_attempts раз. При запуске
+    через RCON выполняется сверка: одобренные в базе игроки, которых нет
+    в whitelist сервера, ставятся в очередь.
+    """
+
+    def __init__(self, interval: float = SYNC_INTERVAL, batch_size: int = SYNC_BATCH_SIZE,
+                 max_attempts: int = SYNC_MAX_ATTEMPTS):
+        self.interval = interval
+        self.batch_size = max(1, batch_size)
+        self.max_attempts = max(1, max_attempts)
+        self._entries = {}
+        self._stopping = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopping.set()
+        await asyncio.wait([self._task])
+        if not self._task.cancelled() and self._task.exception() is not None:
+            logger.error(f"Очередь синхронизации whitelist завершилась с ошибкой: {self._task.exception()}")
+        self._task = None
+        self._entries.clear()
+
+    def add(self, targets: list) -> list:
+        """
+        Ставит пары (никнейм, платформа) в очередь. Возвращает futures с
+        результатом первой попытки для каждой пары
+        """
+        loop = asyncio.get_running_loop()
+        futures = []
+        for nickname, platform in targets:
+            key = (platform, nickname.lower())
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _SyncEntry(nickname, platform)
+            future = loop.create_future()
+            entry.waiters.append(future)
+            futures.append(future)
+        return futures
+
+    @staticmethod
+    def _notify(entry, result):
+        for future in entry.waiters:
+            if not future.done():
+                future.set_result(result)
+        entry.waiters.clear()
+
+    async def _run(self):
+        try:
+            if _rcon is not None:
+                try:
+                    await self.reconcile()
+                except Exception as e:
+                    logger.error(f"Ошибка сверки whitelist: {e}")
+            while not self._stopping.is_set():
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), self.interval)
+                except asyncio.TimeoutError:
+                    pass
+                try:
+                    await self.flush()
+                except Exception as e:
+                    logger.error(f"Ошибка синхронизации whitelist: {e}")
+        finally:
+            # Никто не должен ждать первой попытки от остановленной очереди
+            for entry in self._entries.values():
+                self._notify(entry, (False, "синхронизация whitelist остановлена"))
+
+    async def flush(self):
+        now = time.monotonic()
+        due = [entry for entry in self._entries.values() if entry.next_at <= now]
+        for start in range(0, len(due), self.batch_size):
+            batch = due[start:start + self.batch_size]
+            try:
+                results = await execute_whitelist_commands([(entry.nickname, entry.platform) for entry in batch])
+            except Exception as e:
+                # Ожидающие получают неудачу, а записи уходят на повтор
+                logger.error(f"Ошибка отправки команд whitelist: {e}")
+                results = [(False, str(e))] * len(batch)
+            for entry, result in zip(batch, results):
+                self._notify(entry, result)
+                key = (entry.platform, entry.nickname.lower())
+                if result[0]:
+                    self._entries.pop(key, None)
+                    continue
+                entry.attempts += 1
+                if entry.attempts >= self.max_attempts or check_target(entry.nickname, entry.platform):
+                    logger.error(f"Не удалось добавить {entry.nickname} ({entry.platform}) в whitelist "
+                                 f"за {entry.attempts} попыток: {result[1]}")
+                    self._entries.pop(key, None)
+                else:
+                    entry.next_at = time.monotonic() + self.interval * 2 ** entry.attempts
+
+    async def reconcile(self):
+        """
+        Сверяет одобренных в базе игроков со списком whitelist сервера и ставит
+        в очередь только отсутствующих. Возвращает число добавленных в очередь
+        или None, если список сервера получить не удалось
+        """
+        if _rcon is None:
+            logger.error("Сверка whitelist недоступна без RCON")
+            return None
+        try:
+            listed = parse_whitelist_list(await _rcon.command("whitelist list"))
+        except (RconError, ValueError) as e:
+            logger.error(f"Не удалось получить whitelist сервера: {e}")
+            return None
+        missing = []
+        for platform, nickname_java, nickname_bedrock in await get_approved_nicknames():
+            for nickname, target_platform in application_targets(platform, nickname_java, nickname_bedrock):
+                if whitelist_name(nickname, target_platform).lower() not in listed:
+                    missing.append((nickname, target_platform))
+        self.add(missing)
+        logger.info(f"Сверка whitelist: в whitelist {len(listed)} игроков, в очередь поставлено {len(missing)}")
+        return len(missing)
+
+async def queue_whitelist(targets: list) -> list:
+    """
+    Добавляет игроков в whitelist через очередь синхронизации и ждет первой
+    попытки; неудачные команды очередь повторит сама. Ожидание всегда
+    завершается результатом (успех, описание), в том числе при ошибке
+    отправки. Без запущенной очереди команды выполняются сразу
+    """
+    if _sync_queue is None or not _sync_queue.running:
+        return await execute_whitelist_commands(targets)
+    return list(await asyncio.gather(*_sync_queue.add(targets)))